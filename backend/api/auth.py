@@ -7,12 +7,16 @@ from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+import secrets
 from .storage import get_user
+from .jobs import run_db
 from .schemas import TokenData
 from backend.database.model import User
 import os
 
 # Initialization
+# bearer token GET /metrics requires (the endpoint is disabled while it is unset)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
 SECRET_KEY = os.getenv("SECRET_KEY")
 if not SECRET_KEY:
     raise ValueError("SECRET_KEY environment variable is required. Please set it in your .env file.")
@@ -66,7 +70,8 @@ async def get_current_user(token: str = Depends(oauth_2_scheme)):
         token_data = TokenData(username=username)
     except JWTError:
         raise credential_exception
-    user = get_user(username=token_data.username)
+    # the lookup blocks, so it runs off the event loop like the endpoints' own database calls
+    user = await run_db(get_user, username=token_data.username)
     if not user:
         raise credential_exception
     return user
@@ -75,4 +80,13 @@ async def get_current_user(token: str = Depends(oauth_2_scheme)):
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
     if current_user.disabled:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+# [verify_metrics_token] only lets requests carrying METRICS_TOKEN as their bearer token through (user access tokens
+# don't grant access to metrics)
+def verify_metrics_token(token: str = Depends(oauth_2_scheme)):
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not secrets.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
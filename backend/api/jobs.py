@@ -1,81 +1,587 @@
 import os
-import boto3
 import uuid
+import functools
+import hashlib
+import anyio
+from datetime import datetime, timedelta, timezone
 from typing import List
 from uuid import UUID
-from backend.database.model import Job
+from backend.database.model import Job, UploadSession, Batch
+from sqlalchemy import func
 from fastapi import HTTPException, status, UploadFile, Depends
 from backend.database.database import SessionLocal, get_db
+from backend.database import transcript_cache
+from backend.database import segments as job_segments
+from backend.database import outbox
+from backend.celery.queues import queue_for
+from backend.celery.whisper_config import (
+    DECODING_PRESETS,
+    MODEL_TIERS,
+    batches_clip,
+    decode_path,
+    supported_language,
+    transcription_params,
+)
+from backend.objectstore import StorageNotSupported, get_storage
+from .probe import PROBE_BYTES, ProbeError, ProbeResult, probe_audio
 
-s3 = boto3.client("s3")
-UPLOAD_DIR = os.environ["S3_BUCKET"]
+# Storage drivers are synchronous, so every storage call runs in a worker thread. The driver's max_concurrency bounds
+# the number of threads in flight (and, for S3, the client's connection pool), so a burst of uploads can't exhaust either.
+storage = get_storage()
+_storage_limiter = anyio.CapacityLimiter(storage.max_concurrency)
+# Database calls (and the metrics they record in Redis) block as well, so the async endpoints run them in worker threads
+# too, at most API_DB_CONCURRENCY at a time (SQLAlchemy's default pool: 5 connections plus 10 overflow).
+API_DB_CONCURRENCY = int(os.getenv("API_DB_CONCURRENCY", 15))
+_db_limiter = anyio.CapacityLimiter(API_DB_CONCURRENCY)
 
 
-MAX_FILE_SIZE_BYTES = 5 * 1024 * 1024  # 5MB
+# Uploads are streamed to storage in fixed-size parts, so the API never holds more than one part per upload in memory
+MAX_FILE_SIZE_BYTES = int(os.getenv("MAX_FILE_SIZE_BYTES", 500 * 1024 * 1024))  # 500MB
+# S3 requires every multipart part except the last to be at least 5MB
+S3_MIN_PART_SIZE_BYTES = 5 * 1024 * 1024
+UPLOAD_CHUNK_SIZE_BYTES = max(int(os.getenv("UPLOAD_CHUNK_SIZE_BYTES", 8 * 1024 * 1024)), S3_MIN_PART_SIZE_BYTES)
 ALLOWED_CONTENT_PREFIX = "audio/"
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", 500))
+BATCH_UPLOAD_CONCURRENCY = int(os.getenv("BATCH_UPLOAD_CONCURRENCY", 8))
+MAX_AUDIO_DURATION_SECONDS = float(os.getenv("MAX_AUDIO_DURATION_SECONDS", 4 * 60 * 60))  # 4 hours
+# How long a presigned upload URL (and its pending upload session) stays valid
+PRESIGNED_URL_EXPIRES_SECONDS = int(os.getenv("PRESIGNED_URL_EXPIRES_SECONDS", 15 * 60))
 
 job_ids: list[str] = []
 
-# [create_job] validates the uploaded file and returns a Job object.
-async def create_job(owner: UUID, file: UploadFile, db: SessionLocal = Depends(get_db)) -> dict:
-    from backend.celery.transcribe import transcribe_audio
-   
-    if not file.content_type or not file.content_type.startswith(ALLOWED_CONTENT_PREFIX):
+# [job_progress] returns how far [job]'s transcription is, in percent (None while it is queued or its duration is unknown)
+def job_progress(job: Job) -> float | None:
+    if job.status == "completed":
+        return 100.0
+    if job.chunks_total:
+        return round(100 * (job.chunks_completed or 0) / job.chunks_total, 1)
+    if job.decoded_seconds and job.duration_seconds:
+        return round(min(100.0, 100 * job.decoded_seconds / job.duration_seconds), 1)
+    return None
+
+# [job_to_dict] converts a Job row into the dict returned by the job endpoints. While a job is processing,
+# [transcript] holds the text decoded so far.
+def job_to_dict(job: Job) -> dict:
+    return {
+        "job_id": str(job.id),
+        "filename": job.filename,
+        "status": job.status,
+        "transcript": job.transcript,
+        "owner": str(job.owner),
+        "stored_filename": job.stored_filename,
+        "error_message": job.error_message,
+        "duration_seconds": job.duration_seconds,
+        "model_tier": job.model_tier,
+        "vad_filter": job.vad_filter,
+        "vad_skipped_seconds": job.vad_skipped_seconds,
+        "language": job.language,
+        "detected_language": job.detected_language,
+        "language_probability": job.language_probability,
+        "decoding_preset": job.decoding_preset,
+        "chunks_total": job.chunks_total,
+        "chunks_completed": job.chunks_completed,
+        "progress": job_progress(job),
+    }
+
+# [check_content_type] rejects anything that isn't declared as audio
+def check_content_type(content_type: str | None):
+    if not content_type or not content_type.startswith(ALLOWED_CONTENT_PREFIX):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported file type: {content_type}. Please upload an audio file.",
+        )
+
+# [check_model_tier] rejects model tiers that aren't configured in MODEL_TIERS (None selects the default tier)
+def check_model_tier(model_tier: str | None):
+    if model_tier is not None and model_tier not in MODEL_TIERS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Unsupported file type: {file.content_type}. Please upload an audio file.",
+            detail=f"Unknown model tier: {model_tier}. Available tiers: {', '.join(MODEL_TIERS)}.",
         )
-    
-    # check if file is too large 
-    if file.size > MAX_FILE_SIZE_BYTES:
+
+# [check_language] rejects language codes Whisper doesn't know (None means detect the language)
+def check_language(language: str | None):
+    if language is not None and not supported_language(language):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File is too large. Please upload a file smaller than 5MB.",
+            detail=f"Unsupported language: {language}. Use a Whisper language code such as 'en' or 'fr'.",
         )
 
+# [check_decoding_preset] rejects decoding presets that aren't configured in DECODING_PRESETS (None selects the default)
+def check_decoding_preset(decoding_preset: str | None):
+    if decoding_preset is not None and decoding_preset not in DECODING_PRESETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown decoding preset: {decoding_preset}. Available presets: {', '.join(DECODING_PRESETS)}.",
+        )
+
+# [probe_or_reject] checks the first bytes of an upload ([head]) and rejects files that aren't decodable audio
+# or whose probed duration exceeds MAX_AUDIO_DURATION_SECONDS. [total_size] is the file size, if known.
+def probe_or_reject(head: bytes, total_size: int | None) -> ProbeResult:
+    try:
+        probed = probe_audio(head, total_size)
+    except ProbeError as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+    if probed.duration_seconds is not None and probed.duration_seconds > MAX_AUDIO_DURATION_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Audio is too long. Please upload a recording shorter than {MAX_AUDIO_DURATION_SECONDS / 3600:g} hours.",
+        )
+    return probed
+
+# [stored_filename_for] builds the storage key for a job from its id and the original file's extension
+def stored_filename_for(job_id: str, original_name: str) -> str:
+    extension = os.path.splitext(original_name)[1]
+    return f"{job_id}{extension}"
+
+# [transcription_signature] builds the Celery signature that transcribes [job]. Signatures are plain data, so they
+# can be built before a commit expires the Job objects. Short clips go through cross-job batching when it is enabled;
+# other jobs go to the queue for their duration.
+def transcription_signature(job: Job):
+    if batches_clip(job.duration_seconds):
+        from backend.celery.clip_batching import batch_short_clips
+        return batch_short_clips.s(job.model_tier, str(job.id), str(job.stored_filename))
+    from backend.celery.transcribe import transcribe_audio
+    return transcribe_audio.s(str(job.id), str(job.stored_filename)).set(queue=queue_for(job.duration_seconds))
+
+# [enqueue_transcription] stages [job]'s transcription task in the outbox, in the caller's transaction. Once that
+# commits, the dispatcher (backend/dispatcher.py) publishes it through the fair scheduler; the request itself never
+# waits on the broker.
+def enqueue_transcription(db, job: Job):
+    """ Queue the job for transcription, which runs asynchronously on the Celery workers.
+    Do not wait for the transcription to complete, return the job record immediately 
+    to avoid blocking. When the transcription is complete, the worker writes the transcript 
+    to the job row (no Celery result is kept).
+    """
+    outbox.add(db, job, transcription_signature(job))
+
+# [file_too_large] returns the HTTPException raised when an upload exceeds MAX_FILE_SIZE_BYTES
+def file_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File is too large. Please upload a file smaller than {MAX_FILE_SIZE_BYTES // (1024 * 1024)}MB.",
+    )
+
+# [run_storage] runs a blocking storage driver call ([func] with [args] and [kwargs]) off the event loop
+async def run_storage(func, *args, **kwargs):
+    return await anyio.to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=_storage_limiter)
+
+# [run_db] runs blocking database work ([func] with [args] and [kwargs]), including the metrics it records, off the
+# event loop
+async def run_db(func, *args, **kwargs):
+    return await anyio.to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=_db_limiter)
+
+# [stream_to_storage] reads [file] in UPLOAD_CHUNK_SIZE_BYTES chunks and pipes them into a multipart upload under [key],
+# hashing the audio as it goes. Files that fit in a single chunk are stored with one put call.
+# Returns the number of bytes uploaded and the sha256 hex digest of the file.
+async def stream_to_storage(file: UploadFile, key: str) -> tuple[int, str]:
+    digest = hashlib.sha256()
+    chunk = await file.read(UPLOAD_CHUNK_SIZE_BYTES)
+    if not chunk:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is empty.")
+    if len(chunk) > MAX_FILE_SIZE_BYTES:
+        raise file_too_large()
+
+    # small file: skip the multipart round trips
+    if len(chunk) < UPLOAD_CHUNK_SIZE_BYTES:
+        digest.update(chunk)
+        await run_storage(storage.put, key, chunk, file.content_type)
+        return len(chunk), digest.hexdigest()
+
+    upload_id = await run_storage(storage.create_multipart, key, file.content_type)
+    parts = []
+    total = 0
+    try:
+        while chunk:
+            total += len(chunk)
+            if total > MAX_FILE_SIZE_BYTES:
+                raise file_too_large()
+            part_number = len(parts) + 1
+            etag = await run_storage(storage.upload_part, key, upload_id, part_number, chunk)
+            parts.append({"PartNumber": part_number, "ETag": etag})
+            # hashlib releases the GIL on large buffers, so hashing in a thread keeps the event loop free
+            await anyio.to_thread.run_sync(digest.update, chunk)
+            chunk = await file.read(UPLOAD_CHUNK_SIZE_BYTES)
+
+        await run_storage(storage.complete_multipart, key, upload_id, parts)
+    except BaseException:
+        # don't leave orphaned parts behind (they are billed until aborted)
+        # shielded so a client disconnect (cancellation) still aborts the upload
+        with anyio.CancelScope(shield=True):
+            await run_storage(storage.abort_multipart, key, upload_id)
+        raise
+    return total, digest.hexdigest()
+
+# [hash_stored] returns the sha256 hex digest of the stored object [key] ([size] bytes), read back in
+# UPLOAD_CHUNK_SIZE_BYTES ranges. Presigned and resumable uploads never pass through one request whole, so this is how
+# their audio gets the hash the transcript cache is keyed by. Returns None if the object can't be read: the worker
+# hashes the audio when it downloads it.
+async def hash_stored(key: str, size: int) -> str | None:
+    digest = hashlib.sha256()
+    try:
+        for start in range(0, size, UPLOAD_CHUNK_SIZE_BYTES):
+            chunk = await run_storage(storage.read_range, key, start, min(UPLOAD_CHUNK_SIZE_BYTES, size - start))
+            await anyio.to_thread.run_sync(digest.update, chunk)
+    except Exception as e:
+        print(f"Failed to hash {key}, leaving it to the worker: {e}")
+        return None
+    return digest.hexdigest()
+
+# [save_job] inserts the new [job] and commits. If identical audio was already transcribed with the same parameters,
+# the job completes from the transcript cache without touching the queue; otherwise its transcription is staged in the
+# outbox in the same transaction. [upload], the session the job was created from, is deleted with it. Blocks, so the
+# endpoints call it through run_db.
+def save_job(db, job: Job, upload: UploadSession | None = None) -> dict:
+    cached = None
+    if job.audio_sha256:
+        params = transcription_params(
+            job.model_tier, job.vad_filter, job.language, job.decoding_preset, decode_path(job.duration_seconds)
+        )
+        cached = transcript_cache.lookup(db, transcript_cache.cache_key(job.audio_sha256, params))
+    if cached is not None:
+        job.status = "completed"
+        job.transcript = cached
+
+    # add the job to the database
+    db.add(job)
+    if job.status == "uploaded":
+        db.flush() # assigns the job id
+        enqueue_transcription(db, job)
+    if upload is not None:
+        db.delete(upload)
+    # commit the transaction (the job and its outbox row together)
+    db.commit()
+    # After db.commit(), SQLAlchemy expires in‑memory objects, so refresh the job object to get the id
+    db.refresh(job)
+    return job_to_dict(job)
+
+# [validate_upload] checks the declared type and size of [file] and probes its first bytes, before anything is
+# stored or queued
+async def validate_upload(file: UploadFile) -> ProbeResult:
+    check_content_type(file.content_type)
+
+    # check if file is too large (size is unknown for chunked request bodies, so stream_to_storage checks again)
+    if file.size is not None and file.size > MAX_FILE_SIZE_BYTES:
+        raise file_too_large()
+
+    head = await file.read(PROBE_BYTES)
+    await file.seek(0)
+    return probe_or_reject(head, file.size)
+
+# [create_job] validates the uploaded file and returns a Job object.
+async def create_job(
+    owner: UUID,
+    file: UploadFile,
+    db: SessionLocal = Depends(get_db),
+    model_tier: str | None = None,
+    vad_filter: bool | None = None,
+    language: str | None = None,
+    decoding_preset: str | None = None,
+) -> dict:
+    check_model_tier(model_tier)
+    check_language(language)
+    check_decoding_preset(decoding_preset)
+    probed = await validate_upload(file)
+
     # generate job ID, file's original name, extension, and stored filename
-    contents = await file.read()
     job_id = str(uuid.uuid4())
     original_name = file.filename or "audio-file"
-    extension = os.path.splitext(original_name)[1]
-    stored_filename = f"{job_id}{extension}"
+    stored_filename = stored_filename_for(job_id, original_name)
 
-    # Upload to S3
-    s3.put_object(Bucket=UPLOAD_DIR, Key=stored_filename, Body=contents)
+    # Stream to storage without reading the whole file into memory
+    _, audio_sha256 = await stream_to_storage(file, stored_filename)
 
     job = Job(
         filename=original_name,
         status="uploaded",
         transcript="Transcription pending…",
         owner=owner,
-        stored_filename=stored_filename
+        stored_filename=stored_filename,
+        audio_sha256=audio_sha256,
+        duration_seconds=probed.duration_seconds,
+        model_tier=model_tier,
+        vad_filter=vad_filter,
+        language=language,
+        decoding_preset=decoding_preset,
     )
+    return await run_db(save_job, db, job)
 
-    # add the job to the database
-    db.add(job)
-    # commit the transaction
-    db.commit()
-    # After db.commit(), SQLAlchemy expires in‑memory objects, so refresh the job object to get the id
-    db.refresh(job)
-    job_id = str(job.id)
-    
-    """ Add job_id into Celery queue, which uses Redis as the broker. 
-    delay() schedules the job to be executed asynchronously.
-    Returns AsyncResult object that can be used to get the result of the job. 
-    Do not wait for the transcription to complete, return the job record immediately 
-    to avoid blocking. When the transcription is complete, the result will be updated 
-    in the Redis result backend by the worker.
-    """
-    transcribe_audio.delay(job_id, str(stored_filename)) 
+# [create_batch] uploads many files as one batch: files are streamed to storage concurrently, every Job row is inserted
+# in a single transaction, along with the outbox rows of their transcription tasks.
+async def create_batch(
+    owner: UUID,
+    files: List[UploadFile],
+    db: SessionLocal = Depends(get_db),
+    model_tier: str | None = None,
+    vad_filter: bool | None = None,
+    language: str | None = None,
+    decoding_preset: str | None = None,
+) -> dict:
+    if not files:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No files were uploaded.")
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many files. A batch may contain at most {MAX_BATCH_FILES} files.",
+        )
+    check_model_tier(model_tier)
+    check_language(language)
+    check_decoding_preset(decoding_preset)
+
+    # validate everything up front so a bad file rejects the batch before anything is uploaded
+    probes = []
+    for file in files:
+        try:
+            probes.append(await validate_upload(file))
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail=f"{file.filename}: {e.detail}")
+
+    batch = Batch(id=uuid.uuid4(), owner=owner)
+    jobs = [
+        Job(
+            id=uuid.uuid4(),
+            batch_id=batch.id,
+            filename=file.filename or "audio-file",
+            status="uploaded",
+            transcript="Transcription pending…",
+            owner=owner,
+            duration_seconds=probed.duration_seconds,
+            model_tier=model_tier,
+            vad_filter=vad_filter,
+            language=language,
+            decoding_preset=decoding_preset,
+        )
+        for file, probed in zip(files, probes)
+    ]
+    for job in jobs:
+        job.stored_filename = stored_filename_for(str(job.id), job.filename)
+
+    # stream BATCH_UPLOAD_CONCURRENCY files at a time; each holds at most one chunk in memory
+    limiter = anyio.Semaphore(BATCH_UPLOAD_CONCURRENCY)
+    uploaded = []
+
+    async def upload(file: UploadFile, job: Job):
+        async with limiter:
+            try:
+                _, job.audio_sha256 = await stream_to_storage(file, job.stored_filename)
+            except HTTPException as e:
+                raise HTTPException(status_code=e.status_code, detail=f"{file.filename}: {e.detail}")
+            uploaded.append(job.stored_filename)
+
+    try:
+        async with anyio.create_task_group() as tg:
+            for file, job in zip(files, jobs):
+                tg.start_soon(upload, file, job)
+    except BaseException as exc:
+        with anyio.CancelScope(shield=True):
+            for key in uploaded:
+                await run_storage(storage.delete, key)
+        # the task group wraps a failed upload in an ExceptionGroup, which would reach the client as a 500
+        http_errors = exc.subgroup(HTTPException) if isinstance(exc, BaseExceptionGroup) else None
+        if http_errors:
+            while isinstance(http_errors, BaseExceptionGroup):
+                http_errors = http_errors.exceptions[0]
+            raise http_errors from exc
+        raise
+
+    def save() -> dict:
+        # one query for every cache lookup
+        keys = {
+            job.id: transcript_cache.cache_key(
+                job.audio_sha256,
+                transcription_params(
+                    model_tier, vad_filter, language, decoding_preset, decode_path(job.duration_seconds)
+                ),
+            )
+            for job in jobs
+        }
+        cached = transcript_cache.lookup_many(db, list(keys.values()))
+        for job in jobs:
+            transcript = cached.get(keys[job.id])
+            if transcript is not None:
+                job.status = "completed"
+                job.transcript = transcript
 
+        # build everything needed from the rows before the commit expires them, so no per-row refresh is needed
+        response = {"batch_id": str(batch.id), "jobs": [job_to_dict(job) for job in jobs]}
+
+        db.add(batch)
+        db.add_all(jobs)  # flushed as one multi-row INSERT
+        for job in jobs:
+            if job.status == "uploaded":
+                enqueue_transcription(db, job)
+        db.commit()
+        return response
+
+    return await run_db(save)
+
+# [get_batch_progress] returns aggregate status counts for the owner's batch [batch_id]
+def get_batch_progress(owner: UUID, batch_id: str, db: SessionLocal = Depends(get_db)) -> dict:
+    try:
+        batch_uuid = UUID(batch_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid batch ID format")
+    batch = db.query(Batch).filter(Batch.id == batch_uuid, Batch.owner == owner).first()
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    counts = dict(
+        db.query(Job.status, func.count(Job.id))
+        .filter(Job.batch_id == batch_uuid)
+        .group_by(Job.status)
+        .all()
+    )
+    total = sum(counts.values())
+    finished = counts.get("completed", 0) + counts.get("failed", 0)
+    return {
+        "batch_id": batch_id,
+        "total": total,
+        "uploaded": counts.get("uploaded", 0),
+        "processing": counts.get("processing", 0),
+        "completed": counts.get("completed", 0),
+        "failed": counts.get("failed", 0),
+        "progress": finished / total if total else 1.0,
+    }
+
+# [create_upload_url] starts a direct-to-bucket upload: stores a pending upload session and returns a presigned PUT
+# URL for it. The session id is the id the job will get once complete_upload is called.
+async def create_upload_url(
+    owner: UUID,
+    filename: str,
+    content_type: str,
+    db: SessionLocal = Depends(get_db),
+    model_tier: str | None = None,
+    vad_filter: bool | None = None,
+    language: str | None = None,
+    decoding_preset: str | None = None,
+) -> dict:
+    check_content_type(content_type)
+    check_model_tier(model_tier)
+    check_language(language)
+    check_decoding_preset(decoding_preset)
+
+    upload = UploadSession(
+        id=uuid.uuid4(),
+        owner=owner,
+        filename=filename or "audio-file",
+        content_type=content_type,
+        model_tier=model_tier,
+        vad_filter=vad_filter,
+        language=language,
+        decoding_preset=decoding_preset,
+        expires_at=datetime.now(timezone.utc) + timedelta(seconds=PRESIGNED_URL_EXPIRES_SECONDS),
+    )
+    upload.stored_filename = stored_filename_for(str(upload.id), upload.filename)
+
+    try:
+        upload_url = await run_storage(
+            storage.presigned_put_url, upload.stored_filename, content_type, PRESIGNED_URL_EXPIRES_SECONDS
+        )
+    except StorageNotSupported as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+
+    # the id is read before the commit expires the row
+    response = {
+        "job_id": str(upload.id),
+        "upload_url": upload_url,
+        "method": "PUT",
+        "headers": {"Content-Type": content_type},
+        "expires_in": PRESIGNED_URL_EXPIRES_SECONDS,
+    }
+    db.add(upload)
+    await run_db(db.commit)
+    return response
+
+# [complete_upload] checks that the object for upload session [job_id] landed in the bucket with a sane size and
+# type, then creates the Job row and enqueues transcription (or completes it from the transcript cache).
+async def complete_upload(owner: UUID, job_id: str, db: SessionLocal = Depends(get_db)) -> dict:
+    try:
+        job_uuid = UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid job ID format")
+
+    upload = await run_db(
+        db.query(UploadSession)
+        .filter(UploadSession.id == job_uuid, UploadSession.owner == owner, UploadSession.upload_id.is_(None))
+        .first
+    )
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if upload.expires_at < datetime.now(timezone.utc):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Upload URL has expired. Please request a new one.")
+
+    head = await run_storage(storage.head, upload.stored_filename)
+    if head is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="File has not been uploaded yet. PUT the file to upload_url first.",
+        )
+
+    # the object is ours to validate; delete it on rejection so it doesn't linger in the bucket
+    try:
+        if head["size"] == 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is empty.")
+        if head["size"] > MAX_FILE_SIZE_BYTES:
+            raise file_too_large()
+        check_content_type(head["content_type"])
+        probed = probe_or_reject(await run_storage(storage.read_range, upload.stored_filename, 0, PROBE_BYTES), head["size"])
+    except HTTPException:
+        await run_storage(storage.delete, upload.stored_filename)
+        db.delete(upload)
+        await run_db(db.commit)
+        raise
+    audio_sha256 = await hash_stored(upload.stored_filename, head["size"])
+
+    job = Job(
+        id=upload.id,
+        filename=upload.filename,
+        status="uploaded",
+        transcript="Transcription pending…",
+        owner=owner,
+        stored_filename=upload.stored_filename,
+        audio_sha256=audio_sha256,
+        duration_seconds=probed.duration_seconds,
+        model_tier=upload.model_tier,
+        vad_filter=upload.vad_filter,
+        language=upload.language,
+        decoding_preset=upload.decoding_preset,
+    )
+    return await run_db(save_job, db, job, upload)
+
+# [get_job_segments] returns a page of the owner's job [job_id] segments, optionally limited to those overlapping
+# [start, end) seconds. Jobs completed from the transcript cache have no per-segment timing, so their transcript is
+# returned as a single segment spanning the whole recording, if that overlaps the range.
+def get_job_segments(
+    owner: UUID,
+    job_id: str,
+    start: float | None,
+    end: float | None,
+    limit: int,
+    offset: int,
+    db: SessionLocal = Depends(get_db),
+) -> dict:
+    try:
+        job_uuid = UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid job ID format")
+    job = db.query(Job).filter(Job.id == job_uuid, Job.owner == owner).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    # one extra row tells whether there is a next page
+    rows = job_segments.read(db, job.id, start, end, limit + 1, offset)
+    segments = [
+        {"start": row.start_ms / 1000, "end": row.end_ms / 1000, "text": row.text, "avg_logprob": row.avg_logprob}
+        for row in rows[:limit]
+    ]
+    if not rows and not offset and job.status == "completed" and job.transcript:
+        duration = job.duration_seconds
+        if (start is None or duration is None or start < duration) and (end is None or end > 0):
+            segments = [{"start": 0.0, "end": duration or 0.0, "text": job.transcript}]
     return {
         "job_id": job_id,
-        "filename": original_name,
-        "status": job.status,
-        "transcript": job.transcript,
-        "owner": str(job.owner),
-        "stored_filename": job.stored_filename,
-        "error_message": job.error_message,
+        "segments": segments,
+        "next_offset": offset + limit if len(rows) > limit else None,
     }
 
 # [list_jobs] returns all jobs that belong to the given owner
@@ -87,18 +593,7 @@ def list_jobs(owner: UUID, db: SessionLocal = Depends(get_db)) -> List[dict]:
         .all()
     )
 
-    return [
-        {
-            "job_id": str(job.id),
-            "filename": job.filename,
-            "status": job.status,
-            "transcript": job.transcript,
-            "owner": str(job.owner),
-            "stored_filename": job.stored_filename,
-            "error_message": job.error_message,
-        }
-        for job in jobs
-    ]
+    return [job_to_dict(job) for job in jobs]
 
 def get_job(job_id: str) -> dict:
     db = SessionLocal()
@@ -111,14 +606,6 @@ def get_job(job_id: str) -> dict:
         if not job:
             raise HTTPException(status_code=404, detail="Job not found")
 
-        return {
-            "job_id": str(job.id),
-            "filename": job.filename,
-            "status": job.status,
-            "transcript": job.transcript,
-            "owner": str(job.owner),
-            "stored_filename": job.stored_filename,
-            "error_message": job.error_message,
-        }
+        return job_to_dict(job)
     finally:
         db.close()
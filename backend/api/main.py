@@ -6,13 +6,16 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+import redis
 import uvicorn
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 
 from .routers import authentication, users
 from .middleware import AuthMiddleware
+from .auth import verify_metrics_token
 from backend.database.database import Base, engine
+from backend import metrics
 
 # Initialize FastAPI object
 app = FastAPI()
@@ -41,5 +44,15 @@ app.add_middleware(AuthMiddleware)
 def health_check():
     return {"status": "healthy"}
 
+# Counters and timings recorded by the API and the workers (e.g. transcript cache hits/misses), for whoever holds
+# METRICS_TOKEN
+@app.get("/metrics", dependencies=[Depends(verify_metrics_token)])
+def read_metrics():
+    try:
+        return metrics.snapshot()
+    except redis.RedisError as e:
+        print(f"Failed to read metrics: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Metrics are unavailable")
+
 if __name__ == "__main__":
     uvicorn.run(app, port=8000)
\ No newline at end of file
@@ -0,0 +1,257 @@
+"""
+Fast audio probe on the first bytes of an upload
+
+Identifies the container/codec from magic bytes and reads the duration from the header where the format
+allows it (WAV, AIFF, FLAC, MP3, MP4/M4A, Ogg Vorbis, WMA/ASF, CAF, AU/SND). Unrecognized or malformed input raises
+ProbeError, so corrupt and non-audio files are rejected before they are stored or queued.
+"""
+
+import os
+import struct
+from typing import NamedTuple
+
+# enough for every header parsed below (MP4 files with the moov atom at the end report no duration)
+PROBE_BYTES = int(os.getenv("PROBE_BYTES", 64 * 1024))
+
+class ProbeError(ValueError):
+    pass
+
+class ProbeResult(NamedTuple):
+    container: str
+    codec: str
+    duration_seconds: float | None
+
+# MPEG audio bitrates (kbps) indexed by [version is MPEG-1][layer][bitrate index]
+_MP3_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+_ASF_HEADER = bytes.fromhex("3026b2758e66cf11a6d900aa0062ce6c")
+_ASF_FILE_PROPERTIES = bytes.fromhex("a1dcab8c47a9cf118ee400c00c205365")
+
+# AU/SND encodings: codec name and bytes per sample
+_AU_ENCODINGS = {
+    1: ("mulaw", 1), 2: ("pcm-s8", 1), 3: ("pcm-s16", 2), 4: ("pcm-s24", 3), 5: ("pcm-s32", 4),
+    6: ("float32", 4), 7: ("float64", 8), 27: ("alaw", 1),
+}
+
+# [_wav] reads the fmt and data chunks of a RIFF/WAVE header
+def _wav(head: bytes, total_size: int | None) -> ProbeResult:
+    position, byte_rate, codec = 12, None, None
+    while position + 8 <= len(head):
+        chunk_id, chunk_size = struct.unpack_from("<4sI", head, position)
+        body = position + 8
+        if chunk_id == b"fmt ":
+            if body + 16 > len(head):
+                break
+            audio_format, channels, sample_rate, byte_rate = struct.unpack_from("<HHII", head, body)
+            if channels == 0 or sample_rate == 0 or byte_rate == 0:
+                raise ProbeError("WAV header has no channels or sample rate.")
+            codec = "pcm" if audio_format in (1, 0xFFFE) else f"wav-format-{audio_format}"
+        elif chunk_id == b"data":
+            if codec is None:
+                raise ProbeError("WAV data chunk appears before its fmt chunk.")
+            # streamed WAVs leave the size as 0 or 0xFFFFFFFF; fall back to the file size
+            if chunk_size in (0, 0xFFFFFFFF) and total_size:
+                chunk_size = total_size - body
+            return ProbeResult("wav", codec, chunk_size / byte_rate)
+        position = body + chunk_size + (chunk_size & 1)
+    if codec is None:
+        raise ProbeError("WAV file has no fmt chunk.")
+    return ProbeResult("wav", codec, None)
+
+# [_aiff] reads the COMM chunk of a FORM/AIFF header (sample rate is an 80-bit extended float)
+def _aiff(head: bytes) -> ProbeResult:
+    position = 12
+    while position + 8 <= len(head):
+        chunk_id, chunk_size = struct.unpack_from(">4sI", head, position)
+        if chunk_id == b"COMM" and position + 26 <= len(head):
+            _, frames, _, exponent, mantissa = struct.unpack_from(">hIhHQ", head, position + 8)
+            sample_rate = mantissa * 2.0 ** ((exponent & 0x7FFF) - 16383 - 63)
+            if sample_rate <= 0:
+                raise ProbeError("AIFF header has no sample rate.")
+            return ProbeResult("aiff", "pcm", frames / sample_rate)
+        position += 8 + chunk_size + (chunk_size & 1)
+    raise ProbeError("AIFF file has no COMM chunk.")
+
+# [_flac] reads the STREAMINFO block that must follow the fLaC marker
+def _flac(head: bytes) -> ProbeResult:
+    if len(head) < 26 or head[4] & 0x7F != 0:
+        raise ProbeError("FLAC file is missing its STREAMINFO block.")
+    sample_rate = int.from_bytes(head[18:21], "big") >> 4
+    total_samples = int.from_bytes(head[21:26], "big") & 0xFFFFFFFFF
+    if sample_rate == 0:
+        raise ProbeError("FLAC header has no sample rate.")
+    return ProbeResult("flac", "flac", total_samples / sample_rate if total_samples else None)
+
+# [_mp3] finds the first MPEG audio frame (after any ID3v2 tag) and estimates the duration from the
+# Xing/Info frame count (VBR) or from the bitrate and file size (CBR)
+def _mp3(head: bytes, total_size: int | None) -> ProbeResult | None:
+    start = 0
+    if head.startswith(b"ID3") and len(head) >= 10:
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        start = 10 + tag_size
+        if start + 4 > len(head):
+            # tag (e.g. embedded cover art) is larger than the probe window
+            return ProbeResult("mp3", "mp3", None)
+
+    for position in range(start, min(len(head) - 4, start + 4096)):
+        if head[position] != 0xFF or head[position + 1] & 0xE0 != 0xE0:
+            continue
+        header = int.from_bytes(head[position:position + 4], "big")
+        version = (header >> 19) & 3
+        layer = 4 - ((header >> 17) & 3)
+        bitrate_index = (header >> 12) & 0xF
+        rate_index = (header >> 10) & 3
+        if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+            continue
+        mpeg1 = version == 3
+        bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+        sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+        samples_per_frame = 384 if layer == 1 else (1152 if mpeg1 or layer == 2 else 576)
+
+        xing = head.find(b"Xing", position, position + 64)
+        if xing == -1:
+            xing = head.find(b"Info", position, position + 64)
+        if xing != -1 and xing + 12 <= len(head) and head[xing + 7] & 1:
+            frames = int.from_bytes(head[xing + 8:xing + 12], "big")
+            return ProbeResult("mp3", f"mpeg-layer{layer}", frames * samples_per_frame / sample_rate)
+        duration = (total_size - position) * 8 / bitrate if total_size else None
+        return ProbeResult("mp3", f"mpeg-layer{layer}", duration)
+    return None
+
+# [_mp4] reads the movie header (mvhd) when the moov atom is at the front of the file
+def _mp4(head: bytes) -> ProbeResult:
+    brand = head[8:12].decode("latin-1").strip()
+    mvhd = head.find(b"mvhd")
+    if mvhd == -1 or mvhd + 36 > len(head):
+        return ProbeResult("mp4", brand, None)
+    if head[mvhd + 4] == 1:
+        timescale, duration = struct.unpack_from(">IQ", head, mvhd + 24)
+    else:
+        timescale, duration = struct.unpack_from(">II", head, mvhd + 16)
+    if timescale == 0:
+        raise ProbeError("MP4 header has no timescale.")
+    return ProbeResult("mp4", brand, duration / timescale)
+
+# [_asf] reads the play duration from the File Properties object of an ASF (WMA) header. The duration is in 100ns
+# units and includes the preroll (in ms).
+def _asf(head: bytes) -> ProbeResult:
+    if len(head) < 30:
+        raise ProbeError("ASF header is truncated.")
+    position = 30
+    while position + 24 <= len(head):
+        object_id, object_size = struct.unpack_from("<16sQ", head, position)
+        if object_size < 24:
+            raise ProbeError("ASF header has a malformed object.")
+        if object_id == _ASF_FILE_PROPERTIES:
+            if position + 88 > len(head):
+                break
+            play_duration, _, preroll = struct.unpack_from("<QQQ", head, position + 64)
+            return ProbeResult("asf", "wma", max(play_duration / 10_000_000 - preroll / 1000, 0) or None)
+        position += object_size
+    return ProbeResult("asf", "wma", None)
+
+# [_caf] reads the desc chunk of a Core Audio Format file and the duration from the size of its data chunk (constant
+# packet size) or from its pakt chunk (valid frames)
+def _caf(head: bytes, total_size: int | None) -> ProbeResult:
+    position, sample_rate, codec, bytes_per_packet, frames_per_packet = 8, None, None, 0, 0
+    while position + 12 <= len(head):
+        chunk_type, chunk_size = struct.unpack_from(">4sq", head, position)
+        body = position + 12
+        if chunk_type == b"desc":
+            if body + 32 > len(head):
+                break
+            sample_rate, format_id, _, bytes_per_packet, frames_per_packet = struct.unpack_from(">d4sIII", head, body)
+            if sample_rate <= 0:
+                raise ProbeError("CAF header has no sample rate.")
+            codec = format_id.decode("latin-1").strip()
+        elif codec is None:
+            raise ProbeError("CAF file does not start with a desc chunk.")
+        elif chunk_type == b"pakt" and body + 16 <= len(head):
+            valid_frames = struct.unpack_from(">q", head, body + 8)[0]
+            return ProbeResult("caf", codec, valid_frames / sample_rate)
+        elif chunk_type == b"data":
+            # the data chunk may run to the end of the file (size -1); it starts with a 4-byte edit count
+            size = chunk_size if chunk_size != -1 else (total_size - body if total_size else 0)
+            if bytes_per_packet and frames_per_packet and size > 4:
+                packets = (size - 4) / bytes_per_packet
+                return ProbeResult("caf", codec, packets * frames_per_packet / sample_rate)
+            # variable-size packets: only a pakt chunk after the data (if it is in [head]) has the duration
+        if chunk_size < 0:
+            break
+        position = body + chunk_size
+    if codec is None:
+        raise ProbeError("CAF file has no desc chunk.")
+    return ProbeResult("caf", codec, None)
+
+# [_au] reads the fixed header of a Sun AU/NeXT SND file. The data size may be unknown (0xFFFFFFFF), in which case
+# the data runs to the end of the file.
+def _au(head: bytes, total_size: int | None) -> ProbeResult:
+    if len(head) < 24:
+        raise ProbeError("AU header is truncated.")
+    data_offset, data_size, encoding, sample_rate, channels = struct.unpack_from(">IIIII", head, 4)
+    if sample_rate == 0 or channels == 0:
+        raise ProbeError("AU header has no channels or sample rate.")
+    if encoding not in _AU_ENCODINGS:
+        return ProbeResult("au", f"au-encoding-{encoding}", None)
+    codec, sample_bytes = _AU_ENCODINGS[encoding]
+    if data_size == 0xFFFFFFFF:
+        data_size = total_size - data_offset if total_size else None
+    duration = data_size / (sample_bytes * channels * sample_rate) if data_size else None
+    return ProbeResult("au", codec, duration)
+
+# [_ogg] identifies the codec from the first Ogg page. Only Vorbis carries a nominal bitrate to estimate from.
+def _ogg(head: bytes, total_size: int | None) -> ProbeResult:
+    if b"OpusHead" in head[:64]:
+        return ProbeResult("ogg", "opus", None)
+    if b"\x7fFLAC" in head[:64]:
+        return ProbeResult("ogg", "flac", None)
+    vorbis = head.find(b"\x01vorbis", 0, 64)
+    if vorbis != -1 and vorbis + 28 <= len(head):
+        nominal_bitrate = struct.unpack_from("<i", head, vorbis + 20)[0]
+        duration = total_size * 8 / nominal_bitrate if total_size and nominal_bitrate > 0 else None
+        return ProbeResult("ogg", "vorbis", duration)
+    if b"Speex" in head[:64]:
+        return ProbeResult("ogg", "speex", None)
+    raise ProbeError("Ogg file does not contain an audio stream.")
+
+# [probe_audio] identifies the audio format of [head] (the first bytes of the file) and estimates its duration.
+# [total_size] is the full file size when known. Raises ProbeError if the bytes are not a supported audio format.
+def probe_audio(head: bytes, total_size: int | None = None) -> ProbeResult:
+    if len(head) < 12:
+        raise ProbeError("File is too short to be audio.")
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return _wav(head, total_size)
+    if head[:4] == b"FORM" and head[8:12] in (b"AIFF", b"AIFC"):
+        return _aiff(head)
+    if head[:4] == b"fLaC":
+        return _flac(head)
+    if head[:4] == b"OggS":
+        return _ogg(head, total_size)
+    if head[4:8] == b"ftyp":
+        return _mp4(head)
+    if head[:16] == _ASF_HEADER:
+        return _asf(head)
+    if head[:4] == b"caff":
+        return _caf(head, total_size)
+    if head[:4] == b".snd":
+        return _au(head, total_size)
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return ProbeResult("webm", "webm", None)
+    if head.startswith(b"#!AMR"):
+        return ProbeResult("amr", "amr", None)
+    # ADTS AAC: 12-bit sync with layer bits 00
+    if head[0] == 0xFF and head[1] & 0xF6 == 0xF0:
+        return ProbeResult("aac", "aac", None)
+    if head.startswith(b"ID3") or head[0] == 0xFF:
+        result = _mp3(head, total_size)
+        if result:
+            return result
+    raise ProbeError("File is not a recognized audio format.")
@@ -7,12 +7,14 @@ from datetime import timedelta
 from ..schemas import User, Token
 from ..auth import authenticate_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from ..storage import create_user
+from ..jobs import check_language
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 # Registration endpoint
 @router.post("/register", response_model=User)
 async def register(user: User):
+    check_language(user.default_language)
     try:
         new_user = create_user(user)
         # Return the original user data (not the database object)
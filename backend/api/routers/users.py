@@ -3,11 +3,41 @@ Use APIRouter for protected user endpoints
 """
 
 from typing import List
-from fastapi import APIRouter, Depends, File, UploadFile, status, Depends
-from ..schemas import User, Job
+from fastapi import APIRouter, Depends, File, Form, Query, UploadFile, Request, status, Depends
+from ..schemas import (
+    User,
+    Job,
+    UploadUrlRequest,
+    UploadUrl,
+    ResumableUploadRequest,
+    ResumableUpload,
+    BatchJobs,
+    BatchProgress,
+    JobSegments,
+    UserSettings,
+)
 from ..auth import get_current_active_user
 from backend.database.model import User as UserModel
-from ..jobs import create_job, list_jobs, get_job
+from ..jobs import (
+    create_job,
+    list_jobs,
+    get_job,
+    get_job_segments,
+    create_upload_url,
+    complete_upload,
+    create_batch,
+    get_batch_progress,
+    check_language,
+    run_db,
+)
+from ..uploads import (
+    create_upload_session,
+    get_upload_session,
+    upload_chunk,
+    complete_upload_session,
+    cancel_upload_session,
+)
+from ..storage import update_user_settings
 from backend.database.database import SessionLocal, get_db 
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -21,7 +51,21 @@ async def read_users_me(current_user: UserModel = Depends(get_current_active_use
     return User(
         username=current_user.username,
         password=current_user.password,
-        disabled=current_user.disabled
+        disabled=current_user.disabled,
+        default_language=current_user.default_language,
+    )
+
+# Update the current user's settings. [default_language] is used for uploads that don't name a language
+# (null goes back to detecting it).
+@router.patch("/me/", response_model=User)
+async def update_users_me(settings: UserSettings, current_user: UserModel = Depends(get_current_active_user)):
+    check_language(settings.default_language)
+    user = update_user_settings(current_user.id, settings.default_language)
+    return User(
+        username=user.username,
+        password=user.password,
+        disabled=user.disabled,
+        default_language=user.default_language,
     )
 
 @router.get("/me/jobs/", response_model=List[Job])
@@ -29,16 +73,142 @@ async def read_jobs(
     current_user: UserModel = Depends(get_current_active_user),
     db: SessionLocal = Depends(get_db)
 ):
-    return list_jobs(current_user.id, db)
+    return await run_db(list_jobs, current_user.id, db)
 
+# Uploads that don't name a [language] use the user's default_language (if that is unset too, it is detected)
 @router.post("/me/jobs/", response_model=Job, status_code=status.HTTP_201_CREATED)
 async def upload_job(
     file: UploadFile = File(...),
+    model_tier: str | None = Form(None),
+    vad_filter: bool | None = Form(None),
+    language: str | None = Form(None),
+    decoding_preset: str | None = Form(None),
+    current_user: UserModel = Depends(get_current_active_user),
+    db: SessionLocal = Depends(get_db)
+    ):
+    return await create_job(
+        current_user.id, file, db, model_tier, vad_filter, language or current_user.default_language, decoding_preset
+    )
+
+# Upload many files in one request; returns the batch id and the created jobs
+@router.post("/me/jobs/batch", response_model=BatchJobs, status_code=status.HTTP_201_CREATED)
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    model_tier: str | None = Form(None),
+    vad_filter: bool | None = Form(None),
+    language: str | None = Form(None),
+    decoding_preset: str | None = Form(None),
+    current_user: UserModel = Depends(get_current_active_user),
+    db: SessionLocal = Depends(get_db)
+    ):
+    return await create_batch(
+        current_user.id, files, db, model_tier, vad_filter, language or current_user.default_language, decoding_preset
+    )
+
+@router.get("/me/jobs/batch/{batch_id}", response_model=BatchProgress)
+async def read_batch_progress(
+    batch_id: str,
+    current_user: UserModel = Depends(get_current_active_user),
+    db: SessionLocal = Depends(get_db)
+    ):
+    return await run_db(get_batch_progress, current_user.id, batch_id, db)
+
+# Step one of a direct-to-bucket upload: returns a presigned URL and the pending job id
+@router.post("/me/jobs/upload-url", response_model=UploadUrl, status_code=status.HTTP_201_CREATED)
+async def request_upload_url(
+    request: UploadUrlRequest,
+    current_user: UserModel = Depends(get_current_active_user),
+    db: SessionLocal = Depends(get_db)
+    ):
+    return await create_upload_url(
+        current_user.id,
+        request.filename,
+        request.content_type,
+        db,
+        request.model_tier,
+        request.vad_filter,
+        request.language or current_user.default_language,
+        request.decoding_preset,
+    )
+
+# Step two: once the file has been PUT to the presigned URL, validate it and queue the job
+@router.post("/me/jobs/{job_id}/complete", response_model=Job, status_code=status.HTTP_201_CREATED)
+async def complete_job_upload(
+    job_id: str,
     current_user: UserModel = Depends(get_current_active_user),
     db: SessionLocal = Depends(get_db)
     ):
-    return await create_job(current_user.id, file, db)
+    return await complete_upload(current_user.id, job_id, db)
 
 @router.get("/me/jobs/{job_id}/", response_model=Job)
 async def return_job(job_id: str, current_user: UserModel = Depends(get_current_active_user)):
-    return get_job(job_id)
\ No newline at end of file
+    return await run_db(get_job, job_id)
+
+# Timed segments of a job's transcript, a page at a time. [start]/[end] (seconds) select the segments overlapping
+# that time range, e.g. what a player is currently showing.
+@router.get("/me/jobs/{job_id}/segments", response_model=JobSegments)
+async def read_job_segments(
+    job_id: str,
+    start: float | None = Query(None, ge=0),
+    end: float | None = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    current_user: UserModel = Depends(get_current_active_user),
+    db: SessionLocal = Depends(get_db)
+    ):
+    return await run_db(get_job_segments, current_user.id, job_id, start, end, limit, offset, db)
+
+# Resumable uploads: open a session, PUT chunks in order, then complete it to queue the job.
+# After a dropped connection, GET the session and continue from its offset.
+@router.post("/me/uploads/", response_model=ResumableUpload, status_code=status.HTTP_201_CREATED)
+async def open_upload_session(
+    request: ResumableUploadRequest,
+    current_user: UserModel = Depends(get_current_active_user),
+    db: SessionLocal = Depends(get_db)
+    ):
+    return await create_upload_session(
+        current_user.id,
+        request.filename,
+        request.content_type,
+        request.size,
+        db,
+        request.model_tier,
+        request.vad_filter,
+        request.language or current_user.default_language,
+        request.decoding_preset,
+    )
+
+@router.get("/me/uploads/{upload_id}", response_model=ResumableUpload)
+async def read_upload_session(
+    upload_id: str,
+    current_user: UserModel = Depends(get_current_active_user),
+    db: SessionLocal = Depends(get_db)
+    ):
+    return await run_db(get_upload_session, current_user.id, upload_id, db)
+
+# The request body is the raw chunk starting at [offset]
+@router.put("/me/uploads/{upload_id}", response_model=ResumableUpload)
+async def put_upload_chunk(
+    upload_id: str,
+    offset: int,
+    request: Request,
+    current_user: UserModel = Depends(get_current_active_user),
+    db: SessionLocal = Depends(get_db)
+    ):
+    return await upload_chunk(current_user.id, upload_id, offset, request, db)
+
+@router.post("/me/uploads/{upload_id}/complete", response_model=Job, status_code=status.HTTP_201_CREATED)
+async def finish_upload_session(
+    upload_id: str,
+    current_user: UserModel = Depends(get_current_active_user),
+    db: SessionLocal = Depends(get_db)
+    ):
+    return await complete_upload_session(current_user.id, upload_id, db)
+
+@router.delete("/me/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_upload_session(
+    upload_id: str,
+    current_user: UserModel = Depends(get_current_active_user),
+    db: SessionLocal = Depends(get_db)
+    ):
+    await cancel_upload_session(current_user.id, upload_id, db)
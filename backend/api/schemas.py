@@ -2,6 +2,7 @@
 Pydantic models for the API
 """
 
+from datetime import datetime
 from pydantic import BaseModel
 # from typing import Literal
 
@@ -17,6 +18,11 @@ class User(BaseModel):
     username: str
     password: str
     disabled: bool | None = None
+    default_language: str | None = None
+
+# Request body for updating the current user's settings
+class UserSettings(BaseModel):
+    default_language: str | None = None
 
 class UserInDB(User):
     hashed_password: str
@@ -29,4 +35,83 @@ class Job(BaseModel):
     transcript: str | None = None
     owner: str
     stored_filename: str
-    error_message: str | None = None
\ No newline at end of file
+    error_message: str | None = None
+    duration_seconds: float | None = None
+    model_tier: str | None = None
+    vad_filter: bool | None = None
+    vad_skipped_seconds: float | None = None
+    language: str | None = None
+    detected_language: str | None = None
+    language_probability: float | None = None
+    decoding_preset: str | None = None
+    # long recordings transcribed in parallel chunks: progress of the chunks
+    chunks_total: int | None = None
+    chunks_completed: int | None = None
+    progress: float | None = None # percent; transcript holds the partial text while the job is processing
+
+# Request body for starting a presigned (direct-to-bucket) upload
+class UploadUrlRequest(BaseModel):
+    filename: str
+    content_type: str
+    model_tier: str | None = None
+    vad_filter: bool | None = None
+    language: str | None = None
+    decoding_preset: str | None = None
+
+# Presigned upload target. The client sends the file to [upload_url] with [method] and [headers],
+# then calls the completion endpoint with [job_id].
+class UploadUrl(BaseModel):
+    job_id: str
+    upload_url: str
+    method: str
+    headers: dict[str, str]
+    expires_in: int
+
+
+# Request body for opening a resumable upload session
+class ResumableUploadRequest(BaseModel):
+    filename: str
+    content_type: str
+    size: int
+    model_tier: str | None = None
+    vad_filter: bool | None = None
+    language: str | None = None
+    decoding_preset: str | None = None
+
+# Progress of a resumable upload. The next chunk starts at [offset] and is [chunk_size] bytes (or the remainder).
+class ResumableUpload(BaseModel):
+    upload_id: str
+    filename: str
+    size: int
+    offset: int
+    chunk_size: int
+    expires_at: datetime
+
+
+# Jobs created by one batch upload
+class BatchJobs(BaseModel):
+    batch_id: str
+    jobs: list[Job]
+
+# Aggregate progress of a batch: job counts per status, and the fraction of jobs that finished
+class BatchProgress(BaseModel):
+    batch_id: str
+    total: int
+    uploaded: int
+    processing: int
+    completed: int
+    failed: int
+    progress: float
+
+# One timed piece of a transcript (seconds from the start of the recording)
+class Segment(BaseModel):
+    start: float
+    end: float
+    text: str
+    avg_logprob: float | None = None
+
+# A page of a job's segments. [next_offset] is the offset of the next page, or None after the last one.
+class JobSegments(BaseModel):
+    job_id: str
+    segments: list[Segment]
+    next_offset: int | None = None
@@ -7,7 +7,7 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from .schemas import User as UserSchema
 from backend.database.database import SessionLocal
 from backend.database.model import User
-__all__ = ["get_user", "create_user", "user_exists"]
+__all__ = ["get_user", "create_user", "user_exists", "update_user_settings"]
 
 # [get_user] retrieves the user from the database if they are registered.
 def get_user(username: str):
@@ -39,6 +39,7 @@ def create_user(user: UserSchema):
             username=user.username,
             password=user.password,
             disabled=disabled,
+            default_language=user.default_language,
             hashed_password=get_password_hash(user.password)
         )
         db.add(new_user)
@@ -79,6 +80,24 @@ def create_user(user: UserSchema):
         db.close()
     
 
+# [update_user_settings] sets the default language of user [user_id] and returns the updated user
+def update_user_settings(user_id, default_language: str | None):
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        user.default_language = default_language
+        db.commit()
+        db.refresh(user)
+        return user
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database connection error. Please try again later."
+        ) from e
+    finally:
+        db.close()
+
 def user_exists(username: str):
     """
     Check if a user exists in the database.
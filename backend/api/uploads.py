@@ -0,0 +1,273 @@
+"""
+Resumable chunked uploads
+
+A client opens an upload session with the file's name, type and size, then sends the file in
+RESUMABLE_CHUNK_SIZE_BYTES chunks at increasing offsets. Each chunk becomes one part of a multipart
+upload in the storage backend, so a dropped connection only loses the chunk in flight: the client asks for the session's
+offset and continues from there. Completing the session creates the Job and enqueues transcription.
+Sessions that see no activity for UPLOAD_SESSION_TTL_SECONDS are aborted by a periodic cleanup task.
+
+No row lock is held across a storage call: a request first claims the session (one conditional UPDATE, committed
+at once), then talks to storage, then records the result and clears the claim. A concurrent or retried request for a
+claimed session gets 409 instead of waiting. A claim left by a crashed request lapses after UPLOAD_CLAIM_SECONDS.
+Like storage calls, database calls run in worker threads (run_db), never on the event loop.
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from backend.database.model import Job, UploadSession
+from .jobs import (
+    storage,
+    MAX_FILE_SIZE_BYTES,
+    S3_MIN_PART_SIZE_BYTES,
+    run_storage,
+    run_db,
+    hash_stored,
+    save_job,
+    check_content_type,
+    check_model_tier,
+    check_language,
+    check_decoding_preset,
+    probe_or_reject,
+    stored_filename_for,
+    file_too_large,
+)
+
+RESUMABLE_CHUNK_SIZE_BYTES = max(int(os.getenv("RESUMABLE_CHUNK_SIZE_BYTES", 8 * 1024 * 1024)), S3_MIN_PART_SIZE_BYTES)
+UPLOAD_SESSION_TTL_SECONDS = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", 24 * 60 * 60))
+UPLOAD_CLAIM_SECONDS = int(os.getenv("UPLOAD_CLAIM_SECONDS", 5 * 60))
+
+# [session_to_dict] converts a resumable UploadSession row into the dict returned by the upload endpoints
+def session_to_dict(upload: UploadSession) -> dict:
+    return {
+        "upload_id": str(upload.id),
+        "filename": upload.filename,
+        "size": upload.size,
+        "offset": upload.offset,
+        "chunk_size": RESUMABLE_CHUNK_SIZE_BYTES,
+        "expires_at": upload.expires_at,
+    }
+
+# [_get_session] loads the owner's resumable session [upload_id]
+def _get_session(db: Session, owner: UUID, upload_id: str) -> UploadSession:
+    try:
+        upload_uuid = UUID(upload_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid upload ID format")
+
+    query = db.query(UploadSession).filter(
+        UploadSession.id == upload_uuid,
+        UploadSession.owner == owner,
+        UploadSession.upload_id.isnot(None),
+    )
+    upload = query.first()
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if upload.expires_at < datetime.now(timezone.utc):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Upload session has expired. Please start a new upload.")
+    return upload
+
+# [_claim] claims [upload] for this request if its offset is still [offset] and no other request holds it, and
+# commits, so the storage call that follows runs without a row lock. Raises 409 if the claim fails. The row is reloaded
+# here, so reading it afterwards doesn't query the database from the event loop.
+def _claim(db: Session, upload: UploadSession, offset: int):
+    claimed = db.execute(
+        update(UploadSession)
+        .where(
+            UploadSession.id == upload.id,
+            UploadSession.offset == offset,
+            or_(UploadSession.claimed_until.is_(None), UploadSession.claimed_until < func.now()),
+        )
+        .values(claimed_until=func.now() + timedelta(seconds=UPLOAD_CLAIM_SECONDS))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if not claimed:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Another request for this upload is in progress. Check the upload's offset and retry.",
+        )
+    db.refresh(upload)
+
+# [_unclaim] drops [upload]'s claim after a failed storage call, discarding anything uncommitted
+def _unclaim(db: Session, upload_id: UUID):
+    db.rollback()
+    db.query(UploadSession).filter(UploadSession.id == upload_id).update(
+        {UploadSession.claimed_until: None}, synchronize_session=False
+    )
+    db.commit()
+
+# [_delete] deletes [upload]'s session row
+def _delete(db: Session, upload: UploadSession):
+    db.delete(upload)
+    db.commit()
+
+# [_read_chunk] reads the request body, refusing anything larger than [limit] bytes
+async def _read_chunk(request: Request, limit: int) -> bytes:
+    body = bytearray()
+    async for piece in request.stream():
+        body.extend(piece)
+        if len(body) > limit:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Chunk is larger than the session's chunk size ({limit} bytes).",
+            )
+    return bytes(body)
+
+# [create_upload_session] opens a resumable upload for a file of [size] bytes
+async def create_upload_session(
+    owner: UUID,
+    filename: str,
+    content_type: str,
+    size: int,
+    db: Session,
+    model_tier: str | None = None,
+    vad_filter: bool | None = None,
+    language: str | None = None,
+    decoding_preset: str | None = None,
+) -> dict:
+    check_content_type(content_type)
+    check_model_tier(model_tier)
+    check_language(language)
+    check_decoding_preset(decoding_preset)
+    if size <= 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is empty.")
+    if size > MAX_FILE_SIZE_BYTES:
+        raise file_too_large()
+
+    upload = UploadSession(
+        id=uuid.uuid4(),
+        owner=owner,
+        filename=filename or "audio-file",
+        content_type=content_type,
+        size=size,
+        model_tier=model_tier,
+        vad_filter=vad_filter,
+        language=language,
+        decoding_preset=decoding_preset,
+        offset=0,
+        parts="[]",
+        expires_at=datetime.now(timezone.utc) + timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS),
+    )
+    upload.stored_filename = stored_filename_for(str(upload.id), upload.filename)
+
+    upload.upload_id = await run_storage(storage.create_multipart, upload.stored_filename, content_type)
+
+    response = session_to_dict(upload)
+    db.add(upload)
+    await run_db(db.commit)
+    return response
+
+# [get_upload_session] returns the session's progress, so a client can resume from [offset]
+def get_upload_session(owner: UUID, upload_id: str, db: Session) -> dict:
+    return session_to_dict(_get_session(db, owner, upload_id))
+
+# [upload_chunk] stores the request body as the chunk starting at [offset]. Every chunk except the last must be
+# exactly chunk_size bytes, and chunks must arrive in order.
+async def upload_chunk(owner: UUID, upload_id: str, offset: int, request: Request, db: Session) -> dict:
+    upload = await run_db(_get_session, db, owner, upload_id)
+    if offset != upload.offset:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Expected a chunk at offset {upload.offset}, got offset {offset}.",
+        )
+
+    chunk = await _read_chunk(request, RESUMABLE_CHUNK_SIZE_BYTES)
+    remaining = upload.size - upload.offset
+    if not chunk or len(chunk) > remaining:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Chunk must be 1-{remaining} bytes.")
+    if len(chunk) < RESUMABLE_CHUNK_SIZE_BYTES and len(chunk) != remaining:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Only the last chunk may be smaller than {RESUMABLE_CHUNK_SIZE_BYTES} bytes.",
+        )
+
+    # the first chunk holds the header: reject undecodable or over-long audio before accepting the rest
+    duration_seconds = upload.duration_seconds
+    if offset == 0:
+        try:
+            duration_seconds = probe_or_reject(chunk, upload.size).duration_seconds
+        except HTTPException:
+            await run_db(_claim, db, upload, offset)
+            await run_storage(storage.abort_multipart, upload.stored_filename, upload.upload_id)
+            await run_db(_delete, db, upload)
+            raise
+
+    await run_db(_claim, db, upload, offset)
+    upload_uuid = upload.id
+    part_number = offset // RESUMABLE_CHUNK_SIZE_BYTES + 1
+    try:
+        etag = await run_storage(storage.upload_part, upload.stored_filename, upload.upload_id, part_number, chunk)
+    except Exception:
+        await run_db(_unclaim, db, upload_uuid)
+        raise
+
+    def save() -> dict:
+        parts = json.loads(upload.parts)
+        parts.append({"PartNumber": part_number, "ETag": etag})
+        upload.parts = json.dumps(parts)
+        upload.offset = offset + len(chunk)
+        upload.duration_seconds = duration_seconds
+        # activity keeps the session alive
+        upload.expires_at = datetime.now(timezone.utc) + timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS)
+        upload.claimed_until = None
+        db.commit()
+        return session_to_dict(upload)
+
+    return await run_db(save)
+
+# [complete_upload_session] assembles the uploaded parts, then creates the Job and enqueues transcription (or completes
+# it from the transcript cache)
+async def complete_upload_session(owner: UUID, upload_id: str, db: Session) -> dict:
+    upload = await run_db(_get_session, db, owner, upload_id)
+    if upload.offset != upload.size:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload is incomplete: received {upload.offset} of {upload.size} bytes.",
+        )
+
+    await run_db(_claim, db, upload, upload.size)
+    upload_uuid = upload.id
+    try:
+        await run_storage(storage.complete_multipart, upload.stored_filename, upload.upload_id, json.loads(upload.parts))
+    except Exception:
+        await run_db(_unclaim, db, upload_uuid)
+        raise
+    audio_sha256 = await hash_stored(upload.stored_filename, upload.size)
+
+    job = Job(
+        id=upload.id,
+        filename=upload.filename,
+        status="uploaded",
+        transcript="Transcription pending…",
+        owner=owner,
+        stored_filename=upload.stored_filename,
+        audio_sha256=audio_sha256,
+        duration_seconds=upload.duration_seconds,
+        model_tier=upload.model_tier,
+        vad_filter=upload.vad_filter,
+        language=upload.language,
+        decoding_preset=upload.decoding_preset,
+    )
+    return await run_db(save_job, db, job, upload)
+
+# [cancel_upload_session] aborts the multipart upload and discards the session
+async def cancel_upload_session(owner: UUID, upload_id: str, db: Session):
+    upload = await run_db(_get_session, db, owner, upload_id)
+    await run_db(_claim, db, upload, upload.offset)
+    upload_uuid = upload.id
+    try:
+        await run_storage(storage.abort_multipart, upload.stored_filename, upload.upload_id)
+    except Exception:
+        await run_db(_unclaim, db, upload_uuid)
+        raise
+    await run_db(_delete, db, upload)
@@ -0,0 +1,76 @@
+"""
+Benchmark: sequential vs batched Whisper decoding on this machine.
+
+Long audio:   model.transcribe (one 30 s window at a time) vs BatchedInferencePipeline with --batch-size
+Short clips:  [--clips] copies of [--short] transcribed one by one vs in one batched call (the way batch_short_clips
+              runs them)
+
+Runs the model directly (no broker or database) and reports wall time and the real-time factor (audio seconds per
+second of compute) of each mode:
+
+    python -m backend.benchmarks.batched_inference --long long.mp3 --short short.mp3 --clips 16 --model tiny
+"""
+
+import argparse
+import time
+
+from backend.celery.whisper_config import decoding_preset
+
+SAMPLING_RATE = 16000
+
+
+# [timed] runs [func] and returns (seconds, result)
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+# [transcribe_text] runs one transcription and returns its text
+def transcribe_text(model, audio, **kwargs) -> str:
+    segments, _ = model.transcribe(audio, **decoding_preset(), **kwargs)
+    return "".join(segment.text for segment in segments)
+
+
+# [report] prints one result line
+def report(name: str, seconds: float, audio_seconds: float):
+    print(f"{name:<28}{seconds:>10.1f}{audio_seconds / seconds:>10.1f}x")
+
+
+def main(args):
+    from faster_whisper import BatchedInferencePipeline, WhisperModel
+    from faster_whisper.audio import decode_audio
+
+    from backend.celery.clip_batching import transcribe_clips
+
+    model = WhisperModel(args.model, device="cpu", compute_type=args.compute_type)
+    pipeline = BatchedInferencePipeline(model)
+    print(f"model {args.model} ({args.compute_type}), batch size {args.batch_size}")
+    print(f"{'mode':<28}{'seconds':>10}{'RTF':>11}")
+
+    if args.long:
+        audio = decode_audio(args.long)
+        audio_seconds = len(audio) / SAMPLING_RATE
+        transcribe_text(model, audio[: 30 * SAMPLING_RATE])  # warm-up, not timed
+        report("long sequential", timed(transcribe_text, model, audio)[0], audio_seconds)
+        report("long batched", timed(transcribe_text, pipeline, audio, batch_size=args.batch_size)[0], audio_seconds)
+
+    if args.short:
+        clip = decode_audio(args.short)[: 30 * SAMPLING_RATE]
+        clips = [clip] * args.clips
+        audio_seconds = len(clip) * args.clips / SAMPLING_RATE
+        transcribe_text(model, clip)
+        seconds, _ = timed(lambda: [transcribe_text(model, c) for c in clips])
+        report(f"{args.clips} clips one by one", seconds, audio_seconds)
+        report(f"{args.clips} clips batched", timed(transcribe_clips, model, clips)[0], audio_seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--long", help="long audio file (minutes)")
+    parser.add_argument("--short", help="short audio file (at most 30 s are used)")
+    parser.add_argument("--clips", type=int, default=16, help="short clips per run")
+    parser.add_argument("--batch-size", type=int, default=8, help="batch size for long audio (clips use INFERENCE_BATCH_SIZE)")
+    parser.add_argument("--model", default="tiny")
+    parser.add_argument("--compute-type", default="int8")
+    main(parser.parse_args())
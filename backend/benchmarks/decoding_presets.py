@@ -0,0 +1,71 @@
+"""
+Benchmark: real-time factor of each decoding preset on this machine.
+
+Transcribes one file with every preset in DECODING_PRESETS (or those named with --presets) and prints a table of wall
+time, real-time factor (audio seconds per second of compute) and segment count. With --reference (a text file holding
+the correct transcript), the word error rate of each preset is reported too:
+
+    python -m backend.benchmarks.decoding_presets --audio talk.mp3 --model base --reference talk.txt
+"""
+
+import argparse
+import re
+import time
+
+from backend.celery.whisper_config import DECODING_PRESETS, decoding_preset
+
+SAMPLING_RATE = 16000
+
+
+# [words] splits [text] into lower-case words without punctuation
+def words(text: str) -> list[str]:
+    return re.findall(r"[\w']+", text.lower())
+
+
+# [word_error_rate] returns the word-level edit distance between [hypothesis] and [reference], per reference word
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    ref, hyp = words(reference), words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / max(1, len(ref))
+
+
+def main(args):
+    from faster_whisper import WhisperModel
+    from faster_whisper.audio import decode_audio
+
+    model = WhisperModel(args.model, device="cpu", compute_type=args.compute_type)
+    audio = decode_audio(args.audio)
+    audio_seconds = len(audio) / SAMPLING_RATE
+    reference = open(args.reference).read() if args.reference else None
+    presets = args.presets or list(DECODING_PRESETS)
+
+    # warm-up, not timed
+    segments, _ = model.transcribe(audio[: 30 * SAMPLING_RATE], **decoding_preset(presets[0]))
+    list(segments)
+
+    print(f"model {args.model} ({args.compute_type}), {audio_seconds:.0f}s of audio")
+    print(f"{'preset':<12}{'seconds':>10}{'RTF':>11}{'segments':>10}" + (f"{'WER':>8}" if reference else ""))
+    for name in presets:
+        start = time.perf_counter()
+        segments, _ = model.transcribe(audio, **decoding_preset(name))
+        segments = list(segments)  # decoding runs while the generator is consumed
+        seconds = time.perf_counter() - start
+        line = f"{name:<12}{seconds:>10.1f}{audio_seconds / seconds:>10.1f}x{len(segments):>10}"
+        if reference:
+            line += f"{word_error_rate(reference, ''.join(segment.text for segment in segments)):>8.1%}"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", required=True, help="audio file to transcribe")
+    parser.add_argument("--presets", nargs="+", choices=list(DECODING_PRESETS), help="presets to run (default: all)")
+    parser.add_argument("--reference", help="text file with the correct transcript, to report word error rates")
+    parser.add_argument("--model", default="tiny")
+    parser.add_argument("--compute-type", default="int8")
+    main(parser.parse_args())
@@ -0,0 +1,70 @@
+"""
+Benchmark: Redis memory held by Celery task results under each result-handling mode.
+
+Stores [--jobs] task results in the Redis result backend the way a worker would, measures the growth of Redis
+used_memory, and removes them again:
+
+    full transcript   what transcribe_audio used to return: {"job_id", "transcript"}
+    status only       a minimal result: {"job_id", "status"} (IGNORE_TASK_RESULTS=false)
+    ignored           task_ignore_result (the default): nothing is stored
+
+The steady-state column estimates the memory held at [--jobs-per-hour] with results kept for [--expires] seconds
+(RESULT_EXPIRES_SECONDS). Point it at a scratch Redis database:
+
+    python -m backend.benchmarks.result_backend_memory --redis redis://localhost:6379/15 --jobs 2000
+"""
+
+import argparse
+import uuid
+
+import redis
+from celery import Celery
+
+
+# [used_memory] returns the bytes Redis reports in use
+def used_memory(client: redis.Redis) -> int:
+    return client.info("memory")["used_memory"]
+
+
+# [measure] stores [jobs] results built by [payload] and returns the bytes they added to Redis
+def measure(backend, client: redis.Redis, jobs: int, payload) -> int:
+    task_ids = [str(uuid.uuid4()) for _ in range(jobs)]
+    before = used_memory(client)
+    if payload is not None:
+        for task_id in task_ids:
+            backend.store_result(task_id, payload(task_id), "SUCCESS")
+    grown = used_memory(client) - before
+    for task_id in task_ids:
+        backend.forget(task_id)
+    return max(0, grown)
+
+
+def main(args):
+    app = Celery("result_backend_memory", backend=args.redis)
+    app.conf.result_expires = args.expires
+    backend = app.backend
+    client = redis.Redis.from_url(args.redis)
+    transcript = ("lorem ipsum dolor sit amet " * (args.transcript_chars // 27 + 1))[: args.transcript_chars]
+
+    modes = {
+        "full transcript": lambda job_id: {"job_id": job_id, "transcript": transcript},
+        "status only": lambda job_id: {"job_id": job_id, "status": "completed"},
+        "ignored": None,
+    }
+    print(f"{args.jobs} results, {args.transcript_chars}-character transcripts, kept {args.expires}s")
+    print(f"{'mode':<18}{'total MB':>10}{'bytes/job':>11}{'steady MB':>11}")
+    for name, payload in modes.items():
+        grown = measure(backend, client, args.jobs, payload)
+        per_job = grown / args.jobs
+        steady = per_job * args.jobs_per_hour * args.expires / 3600
+        print(f"{name:<18}{grown / 1e6:>10.1f}{per_job:>11.0f}{steady / 1e6:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis", required=True, help="Redis URL of the result backend (use a scratch database)")
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--transcript-chars", type=int, default=60000, help="about one hour of speech")
+    parser.add_argument("--jobs-per-hour", type=int, default=1000)
+    parser.add_argument("--expires", type=int, default=24 * 60 * 60, help="result expiry in seconds (Celery's default is a day)")
+    main(parser.parse_args())
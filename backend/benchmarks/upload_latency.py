@@ -0,0 +1,94 @@
+"""
+Benchmark: latency of GET /users/me/jobs/ while N uploads are in flight.
+
+Measures p50/p99 of the job-list endpoint on an idle API, then again while [--uploads] concurrent
+uploads of [--file] are running. With S3 calls off the event loop both runs should be roughly flat.
+
+Run against a live API (uvicorn + Postgres + S3/MinIO):
+
+    python -m backend.benchmarks.upload_latency --file sample.mp3 --uploads 8
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+# [percentile] returns the [p]th percentile of [samples] (nearest-rank)
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+# [login] registers the benchmark user if needed and returns auth headers
+async def login(client: httpx.AsyncClient, username: str, password: str) -> dict:
+    await client.post("/auth/register", json={"username": username, "password": password})
+    response = await client.post("/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+# [poll_jobs] requests the job list until [stop] is set and returns each request's latency in ms
+async def poll_jobs(client: httpx.AsyncClient, headers: dict, stop: asyncio.Event) -> list[float]:
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/users/me/jobs/", headers=headers)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.02)
+    return latencies
+
+
+# [upload] posts [path] as a new job
+async def upload(client: httpx.AsyncClient, headers: dict, path: str, content_type: str):
+    with open(path, "rb") as f:
+        response = await client.post(
+            "/users/me/jobs/", headers=headers, files={"file": (path, f, content_type)}
+        )
+    response.raise_for_status()
+
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=None) as client:
+        headers = await login(client, args.username, args.password)
+
+        # baseline: no uploads running
+        stop = asyncio.Event()
+        poller = asyncio.create_task(poll_jobs(client, headers, stop))
+        await asyncio.sleep(args.baseline_seconds)
+        stop.set()
+        idle = await poller
+
+        # under load: N concurrent uploads
+        stop = asyncio.Event()
+        poller = asyncio.create_task(poll_jobs(client, headers, stop))
+        start = time.perf_counter()
+        await asyncio.gather(*(upload(client, headers, args.file, args.content_type) for _ in range(args.uploads)))
+        upload_seconds = time.perf_counter() - start
+        stop.set()
+        loaded = await poller
+
+    print(f"{'scenario':<24}{'requests':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, samples in (("idle", idle), (f"{args.uploads} uploads", loaded)):
+        print(
+            f"{name:<24}{len(samples):>10}{statistics.median(samples):>10.1f}"
+            f"{percentile(samples, 99):>10.1f}{max(samples):>10.1f}"
+        )
+    print(f"{args.uploads} uploads finished in {upload_seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", default="benchmark")
+    parser.add_argument("--password", default="benchmark")
+    parser.add_argument("--file", required=True, help="audio file to upload")
+    parser.add_argument("--content-type", default="audio/mpeg")
+    parser.add_argument("--uploads", type=int, default=8, help="number of concurrent uploads")
+    parser.add_argument("--baseline-seconds", type=float, default=5.0)
+    asyncio.run(run(parser.parse_args()))
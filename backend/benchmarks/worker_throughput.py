@@ -0,0 +1,109 @@
+"""
+Benchmark: transcription throughput (jobs/hour) of the worker execution models on this machine.
+
+Transcribes [--jobs] copies of [--file] under each configuration and reports wall time and jobs/hour:
+
+    solo          1 process, 1 job at a time, the model uses every core
+    prefork PxT   P processes, each with its own model using T CTranslate2 threads (P * T = cores)
+    threads WxT   1 process, one model shared by W threads (num_workers=W), T threads each
+
+Runs the model directly (no broker), so it measures the execution model and not queueing:
+
+    python -m backend.benchmarks.worker_throughput --file sample.mp3 --jobs 24 --model tiny
+"""
+
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.celery.whisper_config import available_cpus
+
+
+# [transcribe_all] transcribes [count] copies of [audio] with [model] and returns nothing (the text is discarded)
+def transcribe_all(model, audio, count: int):
+    for _ in range(count):
+        segments, _ = model.transcribe(audio, beam_size=5)
+        for _ in segments:
+            pass
+
+
+# [prefork_child] loads its own model and transcribes jobs from [queue] until it receives None
+def prefork_child(args, cpu_threads: int, queue, ready):
+    from faster_whisper import WhisperModel
+    from faster_whisper.audio import decode_audio
+
+    model = WhisperModel(args.model, device="cpu", compute_type=args.compute_type, cpu_threads=cpu_threads)
+    audio = decode_audio(args.file)
+    transcribe_all(model, audio, 1)  # warm-up, not timed
+    ready.release()
+    while queue.get() is not None:
+        transcribe_all(model, audio, 1)
+
+
+# [run_prefork] times [args.jobs] jobs spread over [processes] processes with [cpu_threads] threads each
+def run_prefork(args, processes: int, cpu_threads: int) -> float:
+    context = multiprocessing.get_context("spawn")
+    queue, ready = context.Queue(), context.Semaphore(0)
+    children = [context.Process(target=prefork_child, args=(args, cpu_threads, queue, ready)) for _ in range(processes)]
+    for child in children:
+        child.start()
+    for _ in children:
+        ready.acquire()  # time only the transcriptions, like a warmed-up worker
+
+    start = time.perf_counter()
+    for _ in range(args.jobs):
+        queue.put(1)
+    for _ in children:
+        queue.put(None)
+    for child in children:
+        child.join()
+    return time.perf_counter() - start
+
+
+# [run_threads] times [args.jobs] jobs on one model shared by [workers] threads
+def run_threads(args, workers: int, cpu_threads: int) -> float:
+    from faster_whisper import WhisperModel
+    from faster_whisper.audio import decode_audio
+
+    model = WhisperModel(
+        args.model, device="cpu", compute_type=args.compute_type, cpu_threads=cpu_threads, num_workers=workers
+    )
+    audio = decode_audio(args.file)
+    transcribe_all(model, audio, 1)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        for _ in pool.map(lambda _: transcribe_all(model, audio, 1), range(args.jobs)):
+            pass
+    return time.perf_counter() - start
+
+
+# [configurations] lists (name, runner, parallelism, cpu_threads) for every split of [cores]
+def configurations(cores: int) -> list[tuple]:
+    configs = [("solo", run_prefork, 1, cores)]
+    for threads in sorted({1, 2, 4, cores}):
+        if threads < cores and cores // threads > 1:
+            processes = cores // threads
+            configs.append((f"prefork {processes}x{threads}", run_prefork, processes, threads))
+            configs.append((f"threads {processes}x{threads}", run_threads, processes, threads))
+    return configs
+
+
+def main(args):
+    cores = args.cores or available_cpus()
+    print(f"{cores} cores, {args.jobs} jobs of {args.file}, model {args.model} ({args.compute_type})")
+    print(f"{'configuration':<20}{'seconds':>10}{'jobs/hour':>12}")
+    for name, runner, parallelism, cpu_threads in configurations(cores):
+        seconds = runner(args, parallelism, cpu_threads)
+        print(f"{name:<20}{seconds:>10.1f}{args.jobs / seconds * 3600:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", required=True, help="audio file to transcribe")
+    parser.add_argument("--jobs", type=int, default=24, help="jobs per configuration")
+    parser.add_argument("--model", default="tiny")
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--cores", type=int, default=None, help="cores to size the splits for (default: all available)")
+    main(parser.parse_args())
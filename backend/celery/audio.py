@@ -0,0 +1,51 @@
+"""
+Audio decoding and normalization for the worker.
+
+Whisper works on 16 kHz mono PCM. Audio is decoded (and resampled) once into that form and handed to the
+model as a numpy array. When NORMALIZE_AUDIO is enabled, the same PCM is also encoded into a compact
+canonical artifact (FLAC or Opus) that is stored next to the original, so retries and re-runs download and
+decode the small file instead of the original upload.
+"""
+
+import os
+import subprocess
+import tempfile
+
+import numpy as np
+from faster_whisper.audio import decode_audio
+
+SAMPLING_RATE = 16000
+NORMALIZE_AUDIO = os.getenv("NORMALIZE_AUDIO", "false").lower() in ("1", "true", "yes")
+NORMALIZED_AUDIO_FORMAT = os.getenv("NORMALIZED_AUDIO_FORMAT", "flac")  # flac (lossless) | opus (smaller)
+
+# ffmpeg output arguments and file extension per normalized format
+_ENCODERS = {
+    "flac": (["-c:a", "flac", "-f", "flac"], ".16k.flac"),
+    "opus": (["-c:a", "libopus", "-b:a", "32k", "-f", "ogg"], ".16k.opus"),
+}
+
+# [decode] decodes any input ffmpeg understands into 16 kHz mono float32 PCM
+def decode(audio_file) -> np.ndarray:
+    return decode_audio(audio_file, sampling_rate=SAMPLING_RATE)
+
+# [normalized_key] returns the storage key of the canonical artifact for the original object [key]
+def normalized_key(key: str) -> str:
+    return os.path.splitext(key)[0] + _ENCODERS[NORMALIZED_AUDIO_FORMAT][1]
+
+# [encode_normalized] encodes 16 kHz mono PCM into NORMALIZED_AUDIO_FORMAT and returns the path of a temp file
+# holding it. The caller removes the file.
+def encode_normalized(audio: np.ndarray) -> str:
+    output_args, suffix = _ENCODERS[NORMALIZED_AUDIO_FORMAT]
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        output_path = tmp.name
+    command = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+        "-f", "f32le", "-ar", str(SAMPLING_RATE), "-ac", "1", "-i", "pipe:0",
+        *output_args, output_path,
+    ]
+    try:
+        subprocess.run(command, input=audio.astype(np.float32).tobytes(), check=True, capture_output=True)
+    except subprocess.CalledProcessError as e:
+        os.remove(output_path)
+        raise RuntimeError(f"Audio normalization failed: {e.stderr.decode(errors='replace')}") from e
+    return output_path
@@ -1,14 +1,35 @@
 from celery import Celery
+from kombu import Queue
 import os
+from .whisper_config import WORKER_POOL, WORKER_CONCURRENCY
+from .queues import DEFAULT_QUEUE, SHORT_QUEUE, TRANSCRIBE_QUEUES
+
+TRANSCRIPT_CACHE_EVICT_INTERVAL_SECONDS = int(os.getenv("TRANSCRIPT_CACHE_EVICT_INTERVAL_SECONDS", 60 * 60))
+UPLOAD_SESSION_CLEANUP_INTERVAL_SECONDS = int(os.getenv("UPLOAD_SESSION_CLEANUP_INTERVAL_SECONDS", 15 * 60))
+OUTBOX_PURGE_INTERVAL_SECONDS = int(os.getenv("OUTBOX_PURGE_INTERVAL_SECONDS", 60 * 60))
+CLIP_BATCH_RECOVERY_INTERVAL_SECONDS = int(os.getenv("CLIP_BATCH_RECOVERY_INTERVAL_SECONDS", 60))
+# prefork children load and warm up the model before reporting for work (see whisper_model.py); Celery's 4s default
+# would kill and respawn any child whose load takes longer
+WORKER_PROC_ALIVE_TIMEOUT_SECONDS = float(os.getenv("WORKER_PROC_ALIVE_TIMEOUT_SECONDS", 5 * 60))
 
 broker_url = os.getenv("REDIS_BROKER_URL")
 result_backend = os.getenv("REDIS_BACKEND_URL")
+# Job state and transcripts live in Postgres, so by default tasks keep no Celery result (only chord header tasks do,
+# since the chord counts them). Results that are kept expire after RESULT_EXPIRES_SECONDS.
+IGNORE_TASK_RESULTS = os.getenv("IGNORE_TASK_RESULTS", "true").lower() in ("1", "true", "yes")
+RESULT_EXPIRES_SECONDS = int(os.getenv("RESULT_EXPIRES_SECONDS", 60 * 60))
+# Transcription tasks are acknowledged only once they finish (acks_late), so a task whose worker dies is delivered
+# again and resumes from the job's last flush. A child process that dies is requeued at once; if the whole worker
+# goes away, Redis hands its unacknowledged tasks out again after the visibility timeout. That timeout must be longer
+# than the longest single task (a whole recording, or one chunk of a long one) or running tasks are delivered twice;
+# it is always far longer than JOB_LEASE_SECONDS, so the dead worker's job lease has lapsed by then.
+BROKER_VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("BROKER_VISIBILITY_TIMEOUT_SECONDS", 6 * 60 * 60))
 
 celery_app = Celery(
     "worker",
     broker=broker_url,
     backend=result_backend,
-    include=["backend.celery.transcribe"]
+    include=["backend.celery.transcribe", "backend.celery.clip_batching", "backend.celery.chunking", "backend.celery.maintenance"]
 )
 
 # Configure Celery to use JSON for serialization and deserialization
@@ -16,5 +37,42 @@ celery_app.conf.update(
     task_serializer="json",
     result_serializer="json",
     accept_content=["json"],
-    # result_expires=timedelta(hours=2) # backend result expiration time, default is 1 day
+    # multi-core execution: see the worker sizing settings in whisper_config.py
+    worker_pool=WORKER_POOL,
+    worker_concurrency=WORKER_CONCURRENCY,
+    # transcriptions are long, so a child reserves one task at a time instead of hoarding jobs an idle sibling could run
+    worker_prefetch_multiplier=1,
+    worker_proc_alive_timeout=WORKER_PROC_ALIVE_TIMEOUT_SECONDS,
+    broker_transport_options={"visibility_timeout": BROKER_VISIBILITY_TIMEOUT_SECONDS},
+    # duration-based routing (see queues.py). A worker started without -Q consumes every queue, so a single pool still
+    # runs everything; dedicated pools pick their queue with -Q.
+    task_default_queue=DEFAULT_QUEUE,
+    task_queues=[Queue(name) for name in [*TRANSCRIBE_QUEUES, DEFAULT_QUEUE]],
+    task_routes={
+        # transcribe_audio and transcribe_chunk are routed by duration when they are published
+        "backend.celery.clip_batching.batch_short_clips": {"queue": SHORT_QUEUE},
+        # stitching is quick, and a long job is only complete once it has run
+        "backend.celery.chunking.stitch_chunks": {"queue": SHORT_QUEUE},
+    },
+    task_ignore_result=IGNORE_TASK_RESULTS,
+    result_expires=RESULT_EXPIRES_SECONDS,
+    # periodic tasks, run by `celery -A backend.celery.celery_app beat`
+    beat_schedule={
+        "evict-transcript-cache": {
+            "task": "backend.celery.maintenance.evict_transcript_cache",
+            "schedule": TRANSCRIPT_CACHE_EVICT_INTERVAL_SECONDS,
+        },
+        "cleanup-upload-sessions": {
+            "task": "backend.celery.maintenance.cleanup_upload_sessions",
+            "schedule": UPLOAD_SESSION_CLEANUP_INTERVAL_SECONDS,
+        },
+        "purge-job-outbox": {
+            "task": "backend.celery.maintenance.purge_job_outbox",
+            "schedule": OUTBOX_PURGE_INTERVAL_SECONDS,
+        },
+        "recover-short-clips": {
+            "task": "backend.celery.clip_batching.recover_short_clips",
+            "schedule": CLIP_BATCH_RECOVERY_INTERVAL_SECONDS,
+        },
+    },
 )
\ No newline at end of file
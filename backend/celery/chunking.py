@@ -0,0 +1,262 @@
+"""
+Fan-out of long recordings across the worker pool.
+
+transcribe_audio hands audio of at least CHUNKED_MIN_SECONDS to fan_out, which cuts it about every CHUNK_SECONDS at
+the quietest 100 ms frame near the target, stores each chunk (plus CHUNK_OVERLAP_SECONDS on both sides) as 16 kHz
+audio and dispatches a Celery chord: one transcribe_chunk task per chunk, then stitch_chunks once they have all
+finished. The chunk rows are committed before the chord is sent and Job.chunks_dispatched_at after, so a redelivered
+transcribe_audio whose worker died in between sends the chord again (dispatch_chunks). Chunk segments are kept in recording time; stitching keeps the segments centred in each chunk's own range
+and drops words repeated across a cut. The parent Job counts finished chunks in chunks_completed and ends up
+completed, or failed if any chunk failed.
+"""
+
+import json
+import os
+import re
+import uuid
+
+import numpy as np
+from celery import chord
+from sqlalchemy.sql import func
+
+from .celery_app import celery_app
+from backend import metrics, scheduler
+from backend.database.database import SessionLocal
+from backend.database.model import Job, JobChunk
+from backend.database import transcript_cache
+from backend.database import segments as job_segments
+from backend.database import leases
+from backend.objectstore import get_storage
+from .whisper_config import CHUNK_SECONDS, CHUNK_SEARCH_SECONDS, CHUNK_OVERLAP_SECONDS, transcription_params, uses_vad
+from .whisper_model import get_model
+from .queues import queue_for
+from .transcribe import segment_dict, start_decode, vad_skipped_seconds
+from .streaming import StreamingDownload
+from . import audio
+
+storage = get_storage()
+
+FRAME_SAMPLES = audio.SAMPLING_RATE // 10
+# longest run of words compared when removing text repeated across a cut
+MAX_REPEATED_WORDS = 8
+
+# [split_ranges] cuts [pcm] into [(start, end)] sample ranges of about CHUNK_SECONDS, each cut placed at the quietest
+# frame within CHUNK_SEARCH_SECONDS of its target. A remainder shorter than half a chunk stays with the last chunk.
+def split_ranges(pcm: np.ndarray) -> list[tuple[int, int]]:
+    chunk = int(CHUNK_SECONDS * audio.SAMPLING_RATE)
+    search = int(CHUNK_SEARCH_SECONDS * audio.SAMPLING_RATE)
+    ranges, start = [], 0
+    while len(pcm) - start > chunk * 3 // 2:
+        target = start + chunk
+        low, high = max(start + chunk // 2, target - search), min(len(pcm), target + search)
+        frames = (high - low) // FRAME_SAMPLES
+        window = pcm[low:low + frames * FRAME_SAMPLES].reshape(frames, FRAME_SAMPLES)
+        cut = low + int(np.argmin(np.mean(window * window, axis=1))) * FRAME_SAMPLES + FRAME_SAMPLES // 2
+        ranges.append((start, cut))
+        start = cut
+    ranges.append((start, len(pcm)))
+    return ranges
+
+# [fan_out] stores the chunks of [job]'s audio [pcm], records them as JobChunk rows and dispatches the chord that
+# transcribes and stitches them. Returns the number of chunks, or 0 if the audio doesn't split (transcribe it whole).
+# Unless the job names its language, it is detected once here and every chunk is decoded in it.
+def fan_out(db, job: Job, model, pcm: np.ndarray) -> int:
+    ranges = split_ranges(pcm)
+    if len(ranges) < 2:
+        return 0
+    if job.language:
+        job.detected_language, job.language_probability = job.language, 1.0
+    else:
+        job.detected_language, job.language_probability, _ = model.detect_language(pcm)
+
+    overlap = int(CHUNK_OVERLAP_SECONDS * audio.SAMPLING_RATE)
+    # a redelivered task starts over
+    db.query(JobChunk).filter(JobChunk.job_id == job.id).delete()
+    chunks = []
+    for index, (start, end) in enumerate(ranges):
+        audio_start, audio_end = max(0, start - overlap), min(len(pcm), end + overlap)
+        chunk_path = audio.encode_normalized(pcm[audio_start:audio_end])
+        try:
+            key = audio.normalized_key(f"chunks/{job.id}/{index:04d}")
+            storage.upload_from(chunk_path, key)
+        finally:
+            os.remove(chunk_path)
+        chunks.append(JobChunk(
+            id=uuid.uuid4(),
+            job_id=job.id,
+            index=index,
+            start_seconds=start / audio.SAMPLING_RATE,
+            end_seconds=end / audio.SAMPLING_RATE,
+            offset_seconds=audio_start / audio.SAMPLING_RATE,
+            stored_filename=key,
+            status="pending",
+        ))
+    db.add_all(chunks)
+    job.chunks_total = len(chunks)
+    job.chunks_completed = 0
+    job.chunks_dispatched_at = None
+    db.commit()
+
+    print(f"Job {job.id}: split {len(pcm) / audio.SAMPLING_RATE:.0f}s into {len(chunks)} chunks")
+    metrics.observe("job_chunks", len(chunks))
+    return dispatch_chunks(db, job)
+
+# [dispatch_chunks] sends the chord that transcribes the chunks of [job] and stitches them, then records that it was
+# sent. Returns the number of chunks. Sending it twice (the worker died before recording it) is harmless: chunks that
+# are done or running skip the duplicate, and stitch_chunks settles the job once.
+def dispatch_chunks(db, job: Job) -> int:
+    chunks = db.query(JobChunk).filter(JobChunk.job_id == job.id).order_by(JobChunk.index).all()
+    header = [
+        transcribe_chunk.s(str(chunk.id)).set(queue=queue_for(chunk.end_seconds - chunk.start_seconds))
+        for chunk in chunks
+    ]
+    chord(header)(stitch_chunks.s(str(job.id)))
+    job.chunks_dispatched_at = func.now()
+    db.commit()
+    return len(chunks)
+
+# [decode_key] decodes the stored audio [key] into 16 kHz mono PCM
+def decode_key(key: str) -> np.ndarray:
+    path = storage.local_path(key)
+    if path is not None:
+        return audio.decode(path)
+    download = StreamingDownload(storage, key)
+    try:
+        pcm = audio.decode(download)
+        download.wait()
+    finally:
+        download.close()
+    return pcm
+
+# [_words] splits [text] into lower-case words without punctuation, for comparing text across a cut
+def _words(text: str) -> list[str]:
+    return [re.sub(r"[^\w']", "", word.lower()) for word in text.split()]
+
+# [drop_repeated_words] removes the words at the start of [text] that repeat the end of [previous] (up to
+# MAX_REPEATED_WORDS), as happens when both chunks decoded the overlap around a cut
+def drop_repeated_words(previous: str, text: str) -> str:
+    previous_words, words = _words(previous), _words(text)
+    for count in range(min(MAX_REPEATED_WORDS, len(previous_words), len(words)), 0, -1):
+        if previous_words[-count:] == words[:count]:
+            rest = text.split()[count:]
+            return " " + " ".join(rest) if rest else ""
+    return text
+
+# [stitch] merges the segments of [chunks] (ordered by index) into one list in recording time. Each chunk contributes
+# the segments centred in its own range; the first segment after a cut loses any words repeated from before it.
+def stitch(chunks: list[JobChunk]) -> list[dict]:
+    stitched = []
+    for position, chunk in enumerate(chunks):
+        # the last chunk also keeps anything decoded past its end (rounding at the end of the audio)
+        end = chunk.end_seconds if position < len(chunks) - 1 else float("inf")
+        kept = [
+            segment for segment in json.loads(chunk.segments or "[]")
+            if chunk.start_seconds <= (segment["start"] + segment["end"]) / 2 < end
+        ]
+        if kept and stitched:
+            kept[0] = {**kept[0], "text": drop_repeated_words(stitched[-1]["text"], kept[0]["text"])}
+        stitched += [segment for segment in kept if segment["text"]]
+    return stitched
+
+# [transcribe_chunk] transcribes one chunk and stores its segments. Failures are recorded on the chunk instead of
+# raised, so the chord callback always runs and can settle the parent job. The (small) result is kept even when
+# IGNORE_TASK_RESULTS is set, since the chord counts finished header tasks through the result backend. A duplicate
+# delivery of a chunk that is finished exits without decoding (or counting) it again; one of a chunk that is running
+# (or whose worker just died) is handled like transcribe_audio's (see leases.defer_duplicate). Like transcribe_audio,
+# it is acknowledged when it finishes.
+@celery_app.task(bind=True, ignore_result=False, acks_late=True, reject_on_worker_lost=True)
+def transcribe_chunk(self, chunk_id: str, lease_seen: float | None = None):
+    db = SessionLocal()
+    token = leases.new_token()
+    leased = False
+    heartbeat = None
+    try:
+        chunk = db.query(JobChunk).filter(JobChunk.id == chunk_id).first()
+        if not chunk:
+            return {"chunk_id": chunk_id, "error": "Chunk not found"}
+        if not leases.acquire(db, JobChunk, [chunk.id], token):
+            leases.defer_duplicate(self, db, JobChunk, chunk.id, chunk.status != "pending", lease_seen)
+            print(f"Chunk {chunk_id} is {chunk.status} under another lease, skipping duplicate delivery")
+            return {"chunk_id": chunk_id, "status": chunk.status}
+        leased = True
+        if chunk.status != "pending":
+            return {"chunk_id": chunk_id, "status": chunk.status}
+        job = db.query(Job).filter(Job.id == chunk.job_id).first()
+        # a running chunk keeps its job's scheduler slot alive
+        owner, job_id = job.owner, str(job.id)
+        renew_slot = lambda: scheduler.renew(owner, job_id, scheduler.FAIR_SHARE_SLOT_TTL_SECONDS)
+        heartbeat = leases.Heartbeat(JobChunk, [chunk.id], token, on_beat=renew_slot)
+        try:
+            model = get_model(job.model_tier)
+            pcm = decode_key(chunk.stored_filename)
+            segments, info = start_decode(
+                model, pcm, uses_vad(job.vad_filter), job.language or job.detected_language, job.decoding_preset
+            )
+            chunk.segments = json.dumps([segment_dict(segment, chunk.offset_seconds) for segment in segments])
+            chunk.vad_skipped_seconds = vad_skipped_seconds(info)
+            chunk.status = "completed"
+        except Exception as exc:
+            print(f"Chunk {chunk.index} of job {chunk.job_id} failed: {exc}")
+            db.rollback()
+            chunk.status = "failed"
+            chunk.error_message = str(exc)
+        if heartbeat.lost:
+            # the execution that took the chunk over decodes and counts it
+            db.rollback()
+            print(f"Chunk {chunk.index} of job {chunk.job_id}: lost the lease, leaving it to the new execution")
+            return {"chunk_id": chunk_id, "error": "Lease lost"}
+        # counted in SQL, since chunks of the same job finish concurrently
+        db.query(Job).filter(Job.id == chunk.job_id).update(
+            {Job.chunks_completed: Job.chunks_completed + 1}, synchronize_session=False
+        )
+        db.commit()
+        return {"chunk_id": chunk_id, "status": chunk.status}
+    finally:
+        if heartbeat:
+            heartbeat.stop()
+        if leased:
+            leases.release(db, JobChunk, [chunk_id], token)
+        db.close()
+
+# [stitch_chunks] chord callback: stitches the chunks of job [job_id] into its transcript, or fails the job if any
+# chunk failed, then deletes the chunk audio and releases the job's scheduler slot. The job row stays locked until it
+# is settled, so a duplicate delivery waits and then finds it completed or failed, and only repeats the (idempotent)
+# cleanup. Like transcribe_chunk, it is acknowledged when it finishes, so one whose worker died is delivered again.
+# (The job lease may still be held by the transcribe_audio that fanned it out, which is why this doesn't take it.)
+@celery_app.task(acks_late=True, reject_on_worker_lost=True)
+def stitch_chunks(results: list, job_id: str):
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).with_for_update().first()
+        if not job:
+            return {"job_id": job_id, "error": "Job not found"}
+        chunks = db.query(JobChunk).filter(JobChunk.job_id == job.id).order_by(JobChunk.index).all()
+
+        failed = [chunk for chunk in chunks if chunk.status != "completed"]
+        if job.status != "processing":
+            print(f"Job {job_id} is already {job.status}, finishing its cleanup")
+        elif failed:
+            job.status = "failed"
+            job.error_message = f"Chunk {failed[0].index} of {len(chunks)} failed: {failed[0].error_message}"
+            result = None
+        else:
+            stitched = stitch(chunks)
+            job_segments.delete(db, job.id)
+            job_segments.store(db, job.id, stitched)
+            result = "".join(segment["text"] for segment in stitched)
+            params = transcription_params(job.model_tier, job.vad_filter, job.language, job.decoding_preset, "chunked")
+            transcript_cache.store(db, transcript_cache.cache_key(job.audio_sha256, params), job.audio_sha256, params, result)
+            job.status = "completed"
+            job.transcript = result
+            job.vad_skipped_seconds = sum(chunk.vad_skipped_seconds or 0 for chunk in chunks)
+        db.commit()
+
+        for chunk in chunks:
+            try:
+                storage.delete(chunk.stored_filename)
+            except Exception as exc:
+                print(f"Failed to delete chunk audio {chunk.stored_filename}: {exc}")
+        scheduler.release(job.owner, job_id)
+        return {"job_id": job_id, "status": job.status}
+    finally:
+        db.close()
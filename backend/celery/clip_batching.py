@@ -0,0 +1,332 @@
+"""
+Cross-job batching of short clips.
+
+Short jobs (see batches_clip in whisper_config.py) are enqueued as batch_short_clips tasks instead of
+transcribe_audio. Each task pushes its job onto a per-tier Redis list. The task that wins the per-tier leader key moves
+up to CLIP_BATCH_MAX_SIZE jobs from the list to an in-flight list of its own (blocking for at most
+CLIP_BATCH_MAX_WAIT_SECONDS while the batch fills), and transcribes every clip in one BatchedInferencePipeline call:
+the clips are laid end to end and passed as clip_timestamps, so each clip is one item of the batch. Tasks that don't
+win the leader key return at once; their jobs are picked up by the leader.
+
+The in-flight list is deleted once the batch is done. If the leader dies first, its list outlives the deadline
+registered for it (CLIP_BATCH_INFLIGHT_SECONDS after the batch was taken) and its jobs go back to the front of the
+queue, either when the next leader starts or in the recover_short_clips periodic task. Jobs a slow leader still holds
+when that happens are protected by their job leases (see backend/database/leases.py).
+
+Jobs with VAD enabled contribute only their speech regions (found with Silero VAD) to the batch.
+
+Language is detected (or set) once per batched call: clips of jobs that name different languages go in separate calls,
+and clips without a language share one detection, so batching works best for single-language traffic. Likewise, jobs
+with different decoding presets are transcribed in separate calls.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+import redis
+from faster_whisper import BatchedInferencePipeline
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+from .celery_app import celery_app
+from backend import metrics, scheduler
+from backend.database.database import SessionLocal
+from backend.database.model import Job
+from backend.database import transcript_cache
+from backend.database import segments as job_segments
+from backend.database import leases
+from .whisper_config import (
+    MODEL_TIERS,
+    INFERENCE_BATCH_SIZE,
+    VAD_PARAMETERS,
+    CLIP_BATCH_MAX_SIZE,
+    CLIP_BATCH_MAX_WAIT_SECONDS,
+    DEFAULT_MODEL_TIER,
+    DEFAULT_DECODING_PRESET,
+    decode_options,
+    transcription_params,
+    uses_vad,
+)
+from .whisper_model import get_model
+from .transcribe import load_pcm, segment_dict, store_normalized
+from . import audio
+
+CLIP_BATCH_REDIS_URL = os.getenv("CLIP_BATCH_REDIS_URL") or os.getenv("REDIS_BROKER_URL", "redis://localhost:6379/0")
+# how long a leader may take to transcribe the batch it took before its jobs are requeued
+CLIP_BATCH_INFLIGHT_SECONDS = int(os.getenv("CLIP_BATCH_INFLIGHT_SECONDS", 15 * 60))
+
+# KEYS: in-flight index, queue. ARGV: now, in-flight list key prefix. Moves the jobs of every in-flight list whose
+# deadline has passed back to the front of the queue, in their original order, and returns how many it moved.
+_REQUEUE_ORPHANS = """
+local moved = 0
+for _, token in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])) do
+    while redis.call('LMOVE', ARGV[2] .. token, KEYS[2], 'RIGHT', 'LEFT') do
+        moved = moved + 1
+    end
+    redis.call('ZREM', KEYS[1], token)
+end
+return moved
+"""
+
+_client: redis.Redis | None = None
+_scripts: dict = {}
+
+def _redis() -> redis.Redis:
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(CLIP_BATCH_REDIS_URL, decode_responses=True)
+        _scripts["requeue_orphans"] = _client.register_script(_REQUEUE_ORPHANS)
+    return _client
+
+def _queue_key(tier: str) -> str:
+    return f"short_clips:{tier}"
+
+def _leader_key(tier: str) -> str:
+    return f"short_clips:{tier}:leader"
+
+# sorted set of the leaders holding in-flight batches of [tier], scored by the time their batch is given up on
+def _inflight_index(tier: str) -> str:
+    return f"short_clips:{tier}:inflight"
+
+def _inflight_key(tier: str, token: str) -> str:
+    return f"short_clips:{tier}:inflight:{token}"
+
+# [transcribe_clips] transcribes several short PCM clips in one batched call with decoding [preset]. Clips whose [vad]
+# flag is set are reduced to their speech regions first; [language], if given, skips language detection. Returns one
+# (segments, seconds skipped by VAD) pair per clip, with segment times relative to the start of the clip, and the
+# TranscriptionInfo of the call (None if no clip had speech).
+def transcribe_clips(
+    model,
+    clips: list[np.ndarray],
+    vad: list[bool] | None = None,
+    language: str | None = None,
+    preset: str | None = None,
+) -> tuple[list[tuple[list[dict], float]], object]:
+    vad = vad or [False] * len(clips)
+    bounds, regions, skipped, offset = [], [], [], 0
+    for clip, clip_vad in zip(clips, vad):
+        bounds.append((offset, offset + len(clip)))
+        if clip_vad:
+            speech = get_speech_timestamps(clip, VadOptions(**VAD_PARAMETERS))
+        else:
+            speech = [{"start": 0, "end": len(clip)}]
+        # clip_timestamps are in seconds of the concatenated audio
+        regions += [
+            {"start": (offset + r["start"]) / audio.SAMPLING_RATE, "end": (offset + r["end"]) / audio.SAMPLING_RATE}
+            for r in speech
+        ]
+        skipped.append((len(clip) - sum(r["end"] - r["start"] for r in speech)) / audio.SAMPLING_RATE)
+        offset += len(clip)
+    if not regions:
+        return [([], seconds) for seconds in skipped], None
+
+    pipeline = BatchedInferencePipeline(model)
+    segments, info = pipeline.transcribe(
+        np.concatenate(clips),
+        clip_timestamps=regions,
+        batch_size=min(len(regions), INFERENCE_BATCH_SIZE),
+        **decode_options(False, language, preset),
+    )
+    print("Detected language '%s'" % (info.language))
+
+    # segment times are absolute positions in the concatenated audio; assign each segment to the clip holding its middle
+    clip_segments = [[] for _ in clips]
+    for segment in segments:
+        middle = (segment.start + segment.end) / 2 * audio.SAMPLING_RATE
+        index = next((i for i, (_, end) in enumerate(bounds) if middle < end), len(clips) - 1)
+        clip_segments[index].append(segment_dict(segment, -bounds[index][0] / audio.SAMPLING_RATE))
+    return list(zip(clip_segments, skipped)), info
+
+# [_requeue_orphans] returns the jobs of [tier]'s in-flight batches whose leader gave out to the queue, and returns how
+# many it requeued
+def _requeue_orphans(tier: str) -> int:
+    _redis()
+    moved = _scripts["requeue_orphans"](
+        keys=[_inflight_index(tier), _queue_key(tier)], args=[time.time(), _inflight_key(tier, "")]
+    )
+    if moved:
+        print(f"Requeued {moved} short clips of tier '{tier}' from a batch whose leader gave out")
+    return moved
+
+# [_take_batch] moves up to CLIP_BATCH_MAX_SIZE clips from [tier]'s list to the in-flight list of leader [token],
+# blocking for new clips until CLIP_BATCH_MAX_WAIT_SECONDS have passed. Returns [(job_id, s3_key)].
+def _take_batch(tier: str, token: str) -> list[tuple[str, str]]:
+    client = _redis()
+    inflight = _inflight_key(tier, token)
+    # registered before anything is moved, so the batch is requeued even if this process dies mid-way
+    client.zadd(
+        _inflight_index(tier), {token: time.time() + CLIP_BATCH_MAX_WAIT_SECONDS + CLIP_BATCH_INFLIGHT_SECONDS}
+    )
+    deadline = time.monotonic() + CLIP_BATCH_MAX_WAIT_SECONDS
+    items = []
+    while len(items) < CLIP_BATCH_MAX_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining > 0:
+            item = client.blmove(_queue_key(tier), inflight, remaining, "LEFT", "RIGHT")
+        else:
+            item = client.lmove(_queue_key(tier), inflight, "LEFT", "RIGHT")
+        if item is None:
+            break
+        items.append(tuple(json.loads(item)))
+    return items
+
+# [_finish_batch] drops leader [token]'s in-flight list once its batch is done
+def _finish_batch(tier: str, token: str):
+    client = _redis()
+    client.delete(_inflight_key(tier, token))
+    client.zrem(_inflight_index(tier), token)
+
+# [_fail] marks [job] failed with [exc]
+def _fail(db, job: Job, exc: Exception):
+    db.rollback()
+    job.status = "failed"
+    job.error_message = str(exc)
+    db.commit()
+
+# [_transcribe_group] transcribes the [pending] clips, which share [language] and decoding [preset], in one batched call
+# and completes their jobs (or fails them all if the call fails). Jobs whose lease [heartbeat] lost are left alone.
+def _transcribe_group(
+    db, model, tier: str, language: str | None, preset: str | None, pending: list[tuple], heartbeat: leases.Heartbeat
+):
+    print(
+        f"Transcribing {len(pending)} short clips in one batch "
+        f"(tier '{tier}', language {language or 'detected'}, preset '{preset or DEFAULT_DECODING_PRESET}')"
+    )
+    metrics.observe("clip_batch_size", len(pending))
+    try:
+        results, info = transcribe_clips(
+            model, [pcm for *_, pcm in pending], [uses_vad(job.vad_filter) for job, *_ in pending], language, preset
+        )
+    except Exception as exc:
+        print(f"Batch of {len(pending)} short clips failed: {exc}")
+        for job, *_ in pending:
+            if heartbeat.holds(job.id):
+                _fail(db, job, exc)
+        return
+    for (job, params, cache_key, _), (clip_segments, skipped_seconds) in zip(pending, results):
+        if not heartbeat.holds(job.id):
+            print(f"Job {job.id}: lost the lease, leaving it to the new execution")
+            continue
+        result = "".join(segment["text"] for segment in clip_segments)
+        job_segments.delete(db, job.id)
+        job_segments.store(db, job.id, clip_segments)
+        transcript_cache.store(db, cache_key, job.audio_sha256, params, result)
+        metrics.observe("vad_skipped_seconds", skipped_seconds)
+        job.status = "completed"
+        job.transcript = result
+        job.vad_skipped_seconds = skipped_seconds
+        if info is not None:
+            job.detected_language, job.language_probability = info.language, info.language_probability
+    db.commit()
+
+# [_run_batch] transcribes the jobs in [items] (cache hits complete without inference) and releases their scheduler
+# slots. Jobs leased by another execution, finished already or listed twice (duplicate deliveries) are skipped.
+def _run_batch(tier: str, items: list[tuple[str, str]]) -> list[str]:
+    db = SessionLocal()
+    owners = {}
+    token = leases.new_token()
+    leased, heartbeat = [], None
+    try:
+        model = get_model(tier)
+        leased = leases.acquire(db, Job, [job_id for job_id, _ in items], token)
+        # running jobs keep their scheduler slots alive along with their leases
+        def renew_slots():
+            for job_id, owner in list(owners.items()):
+                scheduler.renew(owner, job_id)
+        heartbeat = leases.Heartbeat(Job, leased, token, on_beat=renew_slots)
+        held = {str(job_id) for job_id in leased}
+        pending = []  # (job, params, cache_key, pcm) for the cache misses
+        for job_id, s3_key in items:
+            if job_id not in held:
+                continue
+            held.discard(job_id)
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if not job or job.status in ("completed", "failed"):
+                continue
+            owners[job_id] = job.owner
+            scheduler.renew(job.owner, job_id)
+            try:
+                job.status = "processing"
+                job.error_message = None
+                db.commit()
+                params = transcription_params(tier, job.vad_filter, job.language, job.decoding_preset, "clip_batched")
+                result = None
+                if job.audio_sha256:
+                    result = transcript_cache.lookup(db, transcript_cache.cache_key(job.audio_sha256, params))
+                pcm = None
+                if result is None:
+                    pcm = load_pcm(job, s3_key)
+                    cache_key = transcript_cache.cache_key(job.audio_sha256, params)
+                    result = transcript_cache.lookup(db, cache_key)
+                if result is not None:
+                    print(f"Transcript cache hit for job {job_id}")
+                    heartbeat.check(job_id)
+                    job.status = "completed"
+                    job.transcript = result
+                    db.commit()
+                    continue
+                store_normalized(db, job, pcm, s3_key)
+                pending.append((job, params, cache_key, pcm))
+            except leases.LeaseLost as exc:
+                print(f"Job {job_id}: {exc}, leaving it to the new execution")
+                db.rollback()
+            except Exception as exc:
+                print(f"Job {job_id} failed before batching: {exc}")
+                if heartbeat.holds(job_id):
+                    _fail(db, job, exc)
+
+        # one batched call per requested language and decoding preset
+        groups = {}
+        for entry in pending:
+            groups.setdefault((entry[0].language, entry[0].decoding_preset), []).append(entry)
+        for (language, preset), group in groups.items():
+            _transcribe_group(db, model, tier, language, preset, group, heartbeat)
+        return [job_id for job_id, _ in items]
+    finally:
+        if heartbeat:
+            heartbeat.stop()
+        if leased:
+            leases.release(db, Job, leased, token)
+        db.close()
+        # jobs whose lease was taken over keep their slots for the new execution
+        for job_id, owner in owners.items():
+            if heartbeat.holds(job_id):
+                scheduler.release(owner, job_id)
+
+# [batch_short_clips] queues short job [job_id] (if given) for [tier] and, if no other task is collecting a batch for
+# that tier, collects and transcribes one
+@celery_app.task
+def batch_short_clips(tier: str | None, job_id: str | None = None, s3_key: str | None = None):
+    tier = tier or DEFAULT_MODEL_TIER
+    client = _redis()
+    if job_id:
+        client.rpush(_queue_key(tier), json.dumps([job_id, s3_key]))
+
+    # the leader key expires on its own if the leader dies while collecting
+    token = leases.new_token()
+    if not client.set(_leader_key(tier), token, nx=True, ex=int(CLIP_BATCH_MAX_WAIT_SECONDS) + 30):
+        return {"job_id": job_id, "queued": True}
+    try:
+        _requeue_orphans(tier)
+        items = _take_batch(tier, token)
+    finally:
+        client.delete(_leader_key(tier))
+
+    # clips queued while this task held the leader key (and returned early) need a new leader
+    if client.llen(_queue_key(tier)):
+        batch_short_clips.delay(tier)
+
+    job_ids = _run_batch(tier, items) if items else []
+    _finish_batch(tier, token)
+    return {"job_ids": job_ids}
+
+# [recover_short_clips] periodic task: requeues the clips of batches whose leader gave out and starts a leader for any
+# tier with clips waiting, so they don't wait for the next short job to arrive
+@celery_app.task
+def recover_short_clips():
+    client = _redis()
+    for tier in MODEL_TIERS:
+        _requeue_orphans(tier)
+        if client.llen(_queue_key(tier)) and not client.exists(_leader_key(tier)):
+            batch_short_clips.delay(tier)
@@ -0,0 +1,89 @@
+"""
+Periodic housekeeping tasks, scheduled by Celery beat (see beat_schedule in celery_app.py).
+"""
+
+import os
+from datetime import timedelta
+from sqlalchemy import or_, update
+from sqlalchemy.sql import func
+from .celery_app import celery_app
+from backend.database.database import SessionLocal
+from backend.database.model import UploadSession
+from backend.database import outbox, transcript_cache
+from backend.objectstore import get_storage
+
+# how long the cleanup holds a session it is removing; matches the upload API's claims
+UPLOAD_CLAIM_SECONDS = int(os.getenv("UPLOAD_CLAIM_SECONDS", 5 * 60))
+
+# [evict_transcript_cache] applies the transcript cache TTL and size limit
+@celery_app.task
+def evict_transcript_cache():
+    db = SessionLocal()
+    try:
+        evicted = transcript_cache.evict(db)
+        print(f"Evicted {evicted} transcript cache entries")
+        return evicted
+    finally:
+        db.close()
+
+# [cleanup_upload_sessions] removes expired upload sessions along with what they left in storage: multipart parts of
+# abandoned resumable uploads, and objects PUT to a presigned URL but never completed. Each session is claimed the way
+# the upload API claims one (see backend/api/uploads.py) and the claim committed, so no row lock is held across the
+# storage call; a session whose storage call fails is unclaimed, logged and tried again on the next run.
+@celery_app.task
+def cleanup_upload_sessions():
+    storage = get_storage()
+    db = SessionLocal()
+    removed = 0
+    try:
+        expired = [
+            upload_id for (upload_id,) in db.query(UploadSession.id).filter(UploadSession.expires_at < func.now()).all()
+        ]
+        db.rollback()
+        for upload_id in expired:
+            # a request still working on the session finishes first
+            upload = db.execute(
+                update(UploadSession)
+                .where(
+                    UploadSession.id == upload_id,
+                    UploadSession.expires_at < func.now(),
+                    or_(UploadSession.claimed_until.is_(None), UploadSession.claimed_until < func.now()),
+                )
+                .values(claimed_until=func.now() + timedelta(seconds=UPLOAD_CLAIM_SECONDS))
+                .returning(UploadSession.stored_filename, UploadSession.upload_id)
+                .execution_options(synchronize_session=False)
+            ).first()
+            db.commit()
+            if upload is None:
+                continue
+            try:
+                if upload.upload_id:
+                    storage.abort_multipart(upload.stored_filename, upload.upload_id)
+                else:
+                    storage.delete(upload.stored_filename)
+                db.query(UploadSession).filter(UploadSession.id == upload_id).delete(synchronize_session=False)
+                db.commit()
+                removed += 1
+            except Exception as exc:
+                print(f"Failed to remove expired upload session {upload_id}: {exc}")
+                db.rollback()
+                db.query(UploadSession).filter(UploadSession.id == upload_id).update(
+                    {UploadSession.claimed_until: None}, synchronize_session=False
+                )
+                db.commit()
+        print(f"Removed {removed} expired upload sessions")
+        return removed
+    finally:
+        db.close()
+
+# [purge_job_outbox] deletes outbox rows the dispatcher published more than OUTBOX_RETENTION_SECONDS ago
+@celery_app.task
+def purge_job_outbox():
+    db = SessionLocal()
+    try:
+        purged = outbox.purge(db)
+        db.commit()
+        print(f"Purged {purged} sent job outbox rows")
+        return purged
+    finally:
+        db.close()
@@ -0,0 +1,56 @@
+"""
+Duration-based queue routing.
+
+Transcriptions are published to one of three queues by the probed duration of their audio, so a short voice memo
+never waits behind hour-long recordings: each queue gets its own worker pool (`celery worker -Q transcribe_short`).
+Audio up to SHORT_QUEUE_MAX_SECONDS goes to the short queue, up to MEDIUM_QUEUE_MAX_SECONDS to the medium queue, and
+the rest (or audio whose duration is unknown until it is decoded) to the long queue. Housekeeping tasks stay on
+Celery's default queue.
+
+Every published task carries the time it was queued; when a worker starts it, the wait is recorded per queue as
+queue_wait_seconds_<queue> (see backend/metrics.py). The API's and the workers' clocks are assumed to be in sync.
+"""
+
+import os
+import time
+
+from celery.signals import before_task_publish, task_prerun
+
+from backend import metrics
+
+SHORT_QUEUE = "transcribe_short"
+MEDIUM_QUEUE = "transcribe_medium"
+LONG_QUEUE = "transcribe_long"
+DEFAULT_QUEUE = "celery"
+TRANSCRIBE_QUEUES = [SHORT_QUEUE, MEDIUM_QUEUE, LONG_QUEUE]
+
+SHORT_QUEUE_MAX_SECONDS = float(os.getenv("SHORT_QUEUE_MAX_SECONDS", 120))
+MEDIUM_QUEUE_MAX_SECONDS = float(os.getenv("MEDIUM_QUEUE_MAX_SECONDS", 20 * 60))
+if MEDIUM_QUEUE_MAX_SECONDS < SHORT_QUEUE_MAX_SECONDS:
+    raise RuntimeError("MEDIUM_QUEUE_MAX_SECONDS must not be below SHORT_QUEUE_MAX_SECONDS")
+
+# [queue_for] returns the queue for transcribing audio of [duration_seconds] (None when it isn't known yet)
+def queue_for(duration_seconds: float | None) -> str:
+    if duration_seconds is None:
+        return LONG_QUEUE
+    if duration_seconds <= SHORT_QUEUE_MAX_SECONDS:
+        return SHORT_QUEUE
+    if duration_seconds <= MEDIUM_QUEUE_MAX_SECONDS:
+        return MEDIUM_QUEUE
+    return LONG_QUEUE
+
+# [_stamp_queued_at] adds the publish time to every task message
+@before_task_publish.connect
+def _stamp_queued_at(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault("queued_at", time.time())
+
+# [_observe_queue_wait] records how long a task waited in its queue before a worker started it
+@task_prerun.connect
+def _observe_queue_wait(task=None, **kwargs):
+    queued_at = task.request.get("queued_at")
+    # eagerly applied tasks never went through a queue
+    if queued_at is None or task.request.is_eager:
+        return
+    queue = (task.request.delivery_info or {}).get("routing_key") or DEFAULT_QUEUE
+    metrics.observe(f"queue_wait_seconds_{queue}", max(0.0, time.time() - queued_at))
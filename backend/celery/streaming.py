@@ -0,0 +1,127 @@
+"""
+Streaming audio input for the worker.
+
+StreamingDownload fetches an object with sequential ranged reads in a background thread and exposes it as a
+seekable file-like object, so the decoder starts on the first bytes while the rest is still downloading. Fetched
+bytes are spilled to a temp file in DOWNLOAD_SPILL_DIR (point it at a tmpfs such as /dev/shm to keep them in
+memory); reads past the downloaded prefix block until the bytes arrive. The file is hashed as it streams in.
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+
+from backend.objectstore import StorageDriver
+
+DOWNLOAD_RANGE_BYTES = int(os.getenv("DOWNLOAD_RANGE_BYTES", 4 * 1024 * 1024))
+DOWNLOAD_SPILL_DIR = os.getenv("DOWNLOAD_SPILL_DIR") or None  # e.g. /dev/shm; default is the system temp dir
+
+
+class StreamingDownload(io.RawIOBase):
+    # starts downloading [key] from [storage] immediately
+    def __init__(self, storage: StorageDriver, key: str):
+        super().__init__()
+        head = storage.head(key)
+        if head is None:
+            raise FileNotFoundError(f"Object not found in storage: {key}")
+        self.size = head["size"]
+        self.download_seconds: float | None = None
+        self._storage = storage
+        self._key = key
+        self._digest = hashlib.sha256()
+        self._downloaded = 0
+        self._error: BaseException | None = None
+        self._closing = False
+        self._ready = threading.Condition()
+
+        spill = tempfile.NamedTemporaryFile(
+            dir=DOWNLOAD_SPILL_DIR, suffix=os.path.splitext(key)[1], delete=False
+        )
+        self.spill_path = spill.name
+        self._writer = spill
+        self._reader = open(self.spill_path, "rb")
+        self._position = 0
+
+        self._thread = threading.Thread(target=self._download, name=f"download-{key}", daemon=True)
+        self._thread.start()
+
+    # [_download] fetches the object range by range, appending to the spill file and waking blocked readers
+    def _download(self):
+        start = time.perf_counter()
+        try:
+            while self._downloaded < self.size and not self._closing:
+                length = min(DOWNLOAD_RANGE_BYTES, self.size - self._downloaded)
+                data = self._storage.read_range(self._key, self._downloaded, length)
+                if not data:
+                    raise IOError(f"Download of {self._key} ended early at {self._downloaded} of {self.size} bytes")
+                self._writer.write(data)
+                self._writer.flush()
+                self._digest.update(data)
+                with self._ready:
+                    self._downloaded += len(data)
+                    self._ready.notify_all()
+        except BaseException as e:
+            with self._ready:
+                self._error = e
+                self._ready.notify_all()
+        finally:
+            self._writer.close()
+            self.download_seconds = time.perf_counter() - start
+
+    # [_wait_for] blocks until the first [end] bytes are on disk (or the download failed)
+    def _wait_for(self, end: int):
+        end = min(end, self.size)
+        with self._ready:
+            while self._downloaded < end and self._error is None:
+                self._ready.wait()
+            if self._error is not None:
+                raise IOError(f"Download of {self._key} failed: {self._error}") from self._error
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = self.size + offset
+        else:
+            raise ValueError(f"Unsupported whence: {whence}")
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        if self._position >= self.size:
+            return 0
+        self._wait_for(self._position + len(buffer))
+        self._reader.seek(self._position)
+        count = self._reader.readinto(buffer)
+        self._position += count
+        return count
+
+    # [wait] blocks until the whole object is downloaded and returns its sha256 hex digest
+    def wait(self) -> str:
+        self._wait_for(self.size)
+        self._thread.join()
+        return self._digest.hexdigest()
+
+    # [close] stops the download and removes the spill file
+    def close(self):
+        if self.closed:
+            return
+        self._closing = True
+        self._thread.join()
+        self._reader.close()
+        if os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+        super().close()
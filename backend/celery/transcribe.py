@@ -1,71 +1,269 @@
 from .celery_app import celery_app
 import time, os
-import tempfile
-import boto3
-from faster_whisper import WhisperModel
+import hashlib
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel
 from backend.database.database import SessionLocal
 from backend.database.model import Job
+from backend.database import transcript_cache
+from backend.database import segments as job_segments
+from backend.database import leases
+from backend.objectstore import get_storage
+from backend import metrics, scheduler
+from .whisper_config import (
+    INFERENCE_BATCH_SIZE,
+    batches_audio,
+    chunks_audio,
+    decode_options,
+    decode_path,
+    transcription_params,
+    uses_vad,
+)
+from .whisper_model import get_model
+from . import audio
+from .streaming import StreamingDownload
 
-s3 = boto3.client("s3")
-S3_BUCKET = os.environ["S3_BUCKET"]
+storage = get_storage()
 
-# If loading here, then model will be loaded every time this script is loaded. Better to load only when the worker is initialized
-_model : WhisperModel | None = None
+# While a job is decoded, the text so far and job.decoded_seconds are written to the job every SEGMENT_FLUSH_SEGMENTS
+# segments or SEGMENT_FLUSH_SECONDS, whichever comes first
+SEGMENT_FLUSH_SEGMENTS = int(os.getenv("SEGMENT_FLUSH_SEGMENTS", 20))
+SEGMENT_FLUSH_SECONDS = float(os.getenv("SEGMENT_FLUSH_SECONDS", 5))
 
-# @celery_app.task decorator binds the function to the celery app. Set bind=True so the task object is passed to the function
-@celery_app.task(bind=True)
-def transcribe_audio(self, job_id: str, s3_key: str):
-    """Download audio from S3, transcribe it, and update the job status."""
+# [sha256_file] hashes a file on disk in 1MB blocks
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# [load_pcm] fetches [job]'s audio and decodes it into 16 kHz mono PCM. Fills in job.audio_sha256 if it is missing
+# (presigned uploads bypass the API, so their hash is computed here).
+def load_pcm(job: Job, s3_key: str) -> np.ndarray:
+    # Once a normalized artifact exists, fetch that (much smaller) file instead of the original
+    source_key = job.normalized_filename or s3_key
+    # a shared-volume driver exposes the file directly; otherwise decode while the object streams in
+    audio_path = storage.local_path(source_key)
+    download = StreamingDownload(storage, source_key) if audio_path is None else None
+    try:
+        # decode/resample once; the model gets the PCM directly instead of decoding the file itself
+        decode_start = time.perf_counter()
+        pcm = audio.decode(audio_path or download)
+        decode_seconds = time.perf_counter() - decode_start
+        metrics.observe("decode_seconds", decode_seconds)
+        if download:
+            audio_sha256 = download.wait()
+            metrics.observe("download_seconds", download.download_seconds)
+            print(
+                f"Job {job.id}: downloaded {download.size} bytes in {download.download_seconds:.2f}s, "
+                f"decoded in {decode_seconds:.2f}s (overlapping the download)"
+            )
+        else:
+            audio_sha256 = None
+            print(f"Job {job.id}: decoded {audio_path} in place in {decode_seconds:.2f}s")
+
+        if not job.audio_sha256:
+            job.audio_sha256 = audio_sha256 or sha256_file(audio_path)
+    finally:
+        if download:
+            download.close()
+    return pcm
+
+# [store_normalized] stores the canonical 16 kHz artifact of [job]'s audio when NORMALIZE_AUDIO is enabled
+def store_normalized(db, job: Job, pcm: np.ndarray, s3_key: str):
+    if not audio.NORMALIZE_AUDIO or job.normalized_filename:
+        return
+    normalized_path = audio.encode_normalized(pcm)
+    try:
+        normalized_key = audio.normalized_key(s3_key)
+        storage.upload_from(normalized_path, normalized_key)
+        job.normalized_filename = normalized_key
+        db.commit()
+    finally:
+        os.remove(normalized_path)
+
+# [start_decode] starts transcribing [pcm] and returns the segments generator and the TranscriptionInfo. Audio of at
+# least BATCHED_MIN_SECONDS is split at speech boundaries and decoded INFERENCE_BATCH_SIZE windows at a time (the
+# batched pipeline always runs VAD); shorter audio is decoded window by window, skipping non-speech only if [vad] is set.
+# Language detection runs only when [language] is None; [preset] names the decoding preset (None for the default).
+def start_decode(
+    model: WhisperModel, pcm: np.ndarray, vad: bool, language: str | None = None, preset: str | None = None
+):
+    if batches_audio(len(pcm) / audio.SAMPLING_RATE):
+        pipeline = BatchedInferencePipeline(model)
+        return pipeline.transcribe(pcm, batch_size=INFERENCE_BATCH_SIZE, **decode_options(vad, language, preset))
+    return model.transcribe(pcm, **decode_options(vad, language, preset)) # segments is a generator so the transcription only starts when you iterate over it
+
+# [vad_skipped_seconds] returns the seconds of non-speech VAD kept out of the decoder, from a TranscriptionInfo
+def vad_skipped_seconds(info) -> float:
+    return max(0.0, info.duration - info.duration_after_vad)
+
+# [segment_dict] converts a faster-whisper segment into the dict stored per segment, shifted by [offset] seconds
+def segment_dict(segment, offset: float = 0.0) -> dict:
+    return {
+        "start": round(offset + segment.start, 3),
+        "end": round(offset + segment.end, 3),
+        "text": segment.text,
+        "avg_logprob": segment.avg_logprob,
+    }
+
+# [run_model] transcribes [job]'s [pcm] and returns the text and the seconds of non-speech that VAD skipped. As
+# segments come out of the decoder they are flushed to job_segments_table, along with the text so far (job.transcript)
+# and job.decoded_seconds. If job.decoded_seconds is already set (a redelivered task whose worker died mid-run),
+# decoding resumes there after the flushed segments (in the language detected before). Each flush first checks
+# [heartbeat], so a worker whose lease was taken over raises LeaseLost instead of writing.
+def run_model(
+    db, job: Job, model: WhisperModel, pcm: np.ndarray, vad: bool, heartbeat: leases.Heartbeat
+) -> tuple[str, float]:
+    resume_seconds = job.decoded_seconds or 0.0
+    texts = [job.transcript] if resume_seconds else []
+    language = job.language
+    if resume_seconds:
+        print(f"Job {job.id}: resuming at {resume_seconds:.1f}s")
+        language = language or job.detected_language
+    segments, info = start_decode(
+        model, pcm[int(resume_seconds * audio.SAMPLING_RATE):], vad, language, job.decoding_preset
+    )
+    if not language or not job.detected_language:
+        job.detected_language, job.language_probability = info.language, info.language_probability
+    skipped_seconds = vad_skipped_seconds(info)
+    print("Detected language '%s', VAD skipped %.1fs of %.1fs" % (info.language, skipped_seconds, info.duration))
+
+    unflushed, last_flush = [], time.monotonic()
+    for segment in segments:
+        texts.append(segment.text)
+        unflushed.append(segment_dict(segment, resume_seconds))
+        if len(unflushed) >= SEGMENT_FLUSH_SEGMENTS or time.monotonic() - last_flush >= SEGMENT_FLUSH_SECONDS:
+            heartbeat.check()
+            job_segments.store(db, job.id, unflushed)
+            job.transcript = "".join(texts)
+            job.decoded_seconds = unflushed[-1]["end"]
+            db.commit()
+            unflushed, last_flush = [], time.monotonic()
+    job_segments.store(db, job.id, unflushed)
+    job.decoded_seconds = len(pcm) / audio.SAMPLING_RATE
+    return "".join(texts), skipped_seconds
+
+# @celery_app.task decorator binds the function to the celery app. Set bind=True so the task object is passed to the function.
+# The task is acknowledged when it finishes, so one whose worker dies is delivered again (see celery_app.py).
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def transcribe_audio(self, job_id: str, s3_key: str, lease_seen: float | None = None):
+    """Fetch audio from storage, transcribe it, and update the job status."""
     db = SessionLocal()
     job = None
     result = None
-    temp_file_path = None
+    owner = None
+    fanned_out = False
+    token = leases.new_token()
+    leased = False
+    heartbeat = None
     try:
         job = db.query(Job).filter(Job.id == job_id).first()
         if not job:
             return {"job_id": job_id, "error": "Job not found"}
-    
-        global _model
-        if not _model:
-            print("Loading model...")
-            model_size="tiny"
-            _model = WhisperModel(model_size, device="cpu", compute_type="int8")
-            print("Model loaded")
-        model = _model
-
-        print(f"Processing job {job_id}, downloading from S3: {s3_key}")
+        # a duplicate delivery finds the job leased by the execution running it, or already finished (or fanned out).
+        # The lease may also belong to a worker that just died, so unless it is renewed, look again once it lapses.
+        if not leases.acquire(db, Job, [job.id], token):
+            finished = job.status in ("completed", "failed") or job.chunks_dispatched_at is not None
+            leases.defer_duplicate(self, db, Job, job.id, finished, lease_seen)
+            print(f"Job {job_id} is {job.status} under another lease, skipping duplicate delivery")
+            return {"job_id": job_id, "status": job.status}
+        leased = True
+        if job.status == "processing" and job.chunks_total and job.chunks_dispatched_at is None:
+            # the worker that split the job died before sending its chunks
+            from .chunking import dispatch_chunks
+            print(f"Job {job_id} was split but its chunks were never dispatched, dispatching them")
+            scheduler.renew(job.owner, job_id, scheduler.FAIR_SHARE_SLOT_TTL_SECONDS)
+            return {"job_id": job_id, "chunks": dispatch_chunks(db, job)}
+        if job.status in ("completed", "failed") or (job.status == "processing" and job.chunks_total):
+            print(f"Job {job_id} is already {job.status}, skipping duplicate delivery")
+            return {"job_id": job_id, "status": job.status}
+        owner = job.owner
+        # the job's scheduler slot now lapses soon after the lease, unless this worker keeps both alive
+        scheduler.renew(owner, job_id)
+        heartbeat = leases.Heartbeat(Job, [job.id], token, on_beat=lambda: scheduler.renew(owner, job_id))
+
+        # the default tier is preloaded at worker startup; other tiers are loaded on demand (see whisper_model.py)
+        model = get_model(job.model_tier)
+
+        print(f"Processing job {job_id}, fetching from storage: {s3_key}")
+        # only a job that was still processing (its worker died) resumes from its last flush
+        if job.status != "processing":
+            job.decoded_seconds = None
+            job_segments.delete(db, job.id)
         job.status = "processing"
         job.error_message = None
         db.commit()
 
-        # Download file from S3 to a temp file
-        extension = os.path.splitext(s3_key)[1]
-        with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as tmp:
-            temp_file_path = tmp.name
-            s3.download_fileobj(S3_BUCKET, s3_key, tmp)
-        
-        # transcribe with Whisper
-        segments, info = model.transcribe(temp_file_path, best_of=5) # segments is a generator so the transcription only starts when you iterate over it
-        print("Detected language '%s'" % (info.language))
-        result = "".join([segment.text for segment in segments]) # The transcription will actually run here
+        # jobs uploaded through the API are already hashed, so a cache hit skips fetching the audio entirely
+        settings = (job.model_tier, job.vad_filter, job.language, job.decoding_preset)
+        cache_key = None
+        if job.audio_sha256:
+            params = transcription_params(*settings, decode_path(job.duration_seconds))
+            cache_key = transcript_cache.cache_key(job.audio_sha256, params)
+        result = transcript_cache.lookup(db, cache_key) if cache_key else None
+
+        if result is None:
+            pcm = load_pcm(job, s3_key)
+            if job.duration_seconds is None:
+                job.duration_seconds = len(pcm) / audio.SAMPLING_RATE
+            if cache_key is None:
+                params = transcription_params(*settings, decode_path(len(pcm) / audio.SAMPLING_RATE))
+                result = transcript_cache.lookup(db, transcript_cache.cache_key(job.audio_sha256, params))
+
+        if result is None:
+            store_normalized(db, job, pcm, s3_key)
+            # long recordings are split and transcribed across the pool; stitch_chunks completes the job
+            if chunks_audio(len(pcm) / audio.SAMPLING_RATE):
+                from .chunking import fan_out
+                heartbeat.check()
+                chunks = fan_out(db, job, model, pcm)
+                if chunks:
+                    fanned_out = True
+                    # the chunks may wait in their queues; transcribe_chunk renews the slot once they run
+                    scheduler.renew(owner, job_id, scheduler.FAIR_SHARE_SLOT_TTL_SECONDS)
+                    return {"job_id": job_id, "chunks": chunks}
+            # transcribe with Whisper
+            result, job.vad_skipped_seconds = run_model(db, job, model, pcm, uses_vad(job.vad_filter), heartbeat)
+            metrics.observe("vad_skipped_seconds", job.vad_skipped_seconds)
+            # cached under the path the audio actually took (see start_decode)
+            path = "batched" if batches_audio(len(pcm) / audio.SAMPLING_RATE) else None
+            params = transcription_params(*settings, path)
+            cache_key = transcript_cache.cache_key(job.audio_sha256, params)
+            transcript_cache.store(db, cache_key, job.audio_sha256, params, result)
+        else:
+            print(f"Transcript cache hit for job {job_id}")
 
         # update DB job status to "completed" and store the transcription result
+        heartbeat.check()
         job.status = "completed"
         job.transcript = result
         db.commit()
+    except leases.LeaseLost as exc:
+        # the execution that took the job over finishes it
+        print(f"Job {job_id}: {exc}, leaving it to the new execution")
+        return {"job_id": job_id, "error": "Lease lost"}
     except Exception as exc:
-        if job:
+        # only the lease holder writes to the job
+        if leased and not (heartbeat and heartbeat.lost):
             job.status = "failed"
             job.error_message = str(exc)
             db.commit()
         raise
     finally:
+        if heartbeat:
+            heartbeat.stop()
+        if leased:
+            leases.release(db, Job, [job_id], token)
         db.close()
-        # Clean up temp file
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-        
+        # a fanned-out job keeps its scheduler slot until stitch_chunks completes it (duplicates never took one), and
+        # one whose lease was taken over leaves it to the new execution
+        if not fanned_out and not (heartbeat and heartbeat.lost):
+            scheduler.release(owner, job_id)
+
+    # the transcript is in the database; the task result (if kept at all) only says how the job ended
     return {
         "job_id": job_id,
-        "transcript": result,
-    }
\ No newline at end of file
+        "status": "completed",
+    }
@@ -0,0 +1,196 @@
+"""
+Model and decoding settings for transcription.
+
+Kept free of faster_whisper imports so the API can build transcript cache keys without loading the model stack.
+"""
+
+import json
+import os
+
+# Model tiers a job can ask for (Job.model_tier). Each tier names a Whisper model and how to run it; [memory_mb],
+# if given, is the expected resident size used by the worker's model cache before loading it, and [cpu_threads] /
+# [num_workers] override the worker-wide defaults below.
+# MODEL_TIERS replaces this table with a JSON object of the same shape.
+DEFAULT_MODEL_TIERS = {
+    "standard": {"model": "tiny", "device": "cpu", "compute_type": "int8"},
+    "enhanced": {"model": "base", "device": "cpu", "compute_type": "int8"},
+    "premium": {"model": "small", "device": "cpu", "compute_type": "int8"},
+}
+MODEL_TIERS: dict[str, dict] = json.loads(os.getenv("MODEL_TIERS") or "null") or DEFAULT_MODEL_TIERS
+DEFAULT_MODEL_TIER = os.getenv("DEFAULT_MODEL_TIER", "standard")
+if DEFAULT_MODEL_TIER not in MODEL_TIERS:
+    raise RuntimeError(f"DEFAULT_MODEL_TIER {DEFAULT_MODEL_TIER!r} is not one of the MODEL_TIERS: {', '.join(MODEL_TIERS)}")
+
+# Decoding presets a job can ask for (Job.decoding_preset), trading accuracy for speed. [temperature] is the fallback
+# schedule: a window whose text looks wrong (too repetitive or too unlikely) is decoded again at the next temperature,
+# sampling [best_of] candidates. fast decodes each window once, greedily and without timestamp tokens (one segment per
+# 30 s window); accurate widens the beam. DECODING_PRESETS replaces this table with a JSON object of the same shape.
+DEFAULT_DECODING_PRESETS = {
+    "fast": {
+        "beam_size": 1,
+        "best_of": 1,
+        "temperature": [0.0],
+        "condition_on_previous_text": False,
+        "without_timestamps": True,
+    },
+    "balanced": {
+        "beam_size": 5,
+        "best_of": 5,
+        "temperature": [0.0, 0.2, 0.4, 0.6, 0.8, 1.0],
+        "condition_on_previous_text": True,
+        "without_timestamps": False,
+    },
+    "accurate": {
+        "beam_size": 10,
+        "best_of": 10,
+        "temperature": [0.0, 0.2, 0.4, 0.6, 0.8, 1.0],
+        "condition_on_previous_text": True,
+        "without_timestamps": False,
+    },
+}
+DECODING_PRESETS: dict[str, dict] = json.loads(os.getenv("DECODING_PRESETS") or "null") or DEFAULT_DECODING_PRESETS
+DEFAULT_DECODING_PRESET = os.getenv("DEFAULT_DECODING_PRESET", "balanced")
+if DEFAULT_DECODING_PRESET not in DECODING_PRESETS:
+    raise RuntimeError(
+        f"DEFAULT_DECODING_PRESET {DEFAULT_DECODING_PRESET!r} is not one of the DECODING_PRESETS: "
+        f"{', '.join(DECODING_PRESETS)}"
+    )
+
+# Batched inference. Audio at least BATCHED_MIN_SECONDS long goes through faster-whisper's BatchedInferencePipeline,
+# which splits it at speech boundaries and decodes up to INFERENCE_BATCH_SIZE windows per forward pass (0 disables it).
+BATCHED_MIN_SECONDS = float(os.getenv("BATCHED_MIN_SECONDS", 0))
+INFERENCE_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", 8))
+# Cross-job batching. Jobs no longer than SHORT_CLIP_MAX_SECONDS (at most one 30 s window) are collected for up to
+# CLIP_BATCH_MAX_WAIT_SECONDS into batches of up to CLIP_BATCH_MAX_SIZE clips, which are transcribed in one batched call.
+CLIP_BATCHING = os.getenv("CLIP_BATCHING", "false").lower() in ("1", "true", "yes")
+SHORT_CLIP_MAX_SECONDS = min(float(os.getenv("SHORT_CLIP_MAX_SECONDS", 30)), 30)
+CLIP_BATCH_MAX_SIZE = int(os.getenv("CLIP_BATCH_MAX_SIZE", 8))
+CLIP_BATCH_MAX_WAIT_SECONDS = float(os.getenv("CLIP_BATCH_MAX_WAIT_SECONDS", 2))
+
+# Fan-out of long recordings. Audio at least CHUNKED_MIN_SECONDS long (0 disables it) is cut about every CHUNK_SECONDS,
+# at the quietest point within CHUNK_SEARCH_SECONDS of the target, and the chunks are transcribed in parallel across the
+# worker pool, then stitched back together. Chunks overlap their neighbours by CHUNK_OVERLAP_SECONDS, so words at a cut
+# are decoded with context on both sides.
+CHUNKED_MIN_SECONDS = float(os.getenv("CHUNKED_MIN_SECONDS", 0))
+CHUNK_SECONDS = float(os.getenv("CHUNK_SECONDS", 600))
+CHUNK_SEARCH_SECONDS = float(os.getenv("CHUNK_SEARCH_SECONDS", 30))
+CHUNK_OVERLAP_SECONDS = float(os.getenv("CHUNK_OVERLAP_SECONDS", 1))
+
+# Voice activity detection. Silero VAD drops the non-speech parts of the audio before decoding. VAD_FILTER is the
+# deployment default; a job can turn it on or off with Job.vad_filter. VAD_PARAMETERS is a JSON object of
+# faster_whisper.vad.VadOptions fields, e.g. {"min_silence_duration_ms": 500, "speech_pad_ms": 200}.
+VAD_FILTER = os.getenv("VAD_FILTER", "false").lower() in ("1", "true", "yes")
+VAD_PARAMETERS: dict = json.loads(os.getenv("VAD_PARAMETERS") or "{}")
+
+# [available_cpus] counts the cores this process may use: its CPU affinity, capped by a cgroup v2 CPU quota
+# (docker --cpus) when one is set
+def available_cpus() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+# Worker sizing. Celery pool (prefork | threads | solo) and how the cores are split between processes and the
+# CTranslate2 threads of each model. A single decode stops scaling after a few threads, so by default each model gets
+# up to 4 threads and the remaining cores go to more prefork children, each owning its own model. The solo pool runs
+# one task at a time, so its model gets every core.
+WORKER_POOL = os.getenv("WORKER_POOL", "prefork")
+CPU_COUNT = available_cpus()
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS") or (CPU_COUNT if WORKER_POOL == "solo" else min(4, CPU_COUNT)))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY") or max(1, CPU_COUNT // WHISPER_CPU_THREADS))
+# parallel transcriptions one model can run: the threads pool shares one model between WORKER_CONCURRENCY threads
+WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS") or (WORKER_CONCURRENCY if WORKER_POOL == "threads" else 1))
+
+# [model_tier] returns the settings of tier [name] (the default tier when None). Raises ValueError for unknown tiers.
+def model_tier(name: str | None = None) -> dict:
+    config = MODEL_TIERS.get(name or DEFAULT_MODEL_TIER)
+    if config is None:
+        raise ValueError(f"Unknown model tier: {name}. Available tiers: {', '.join(MODEL_TIERS)}.")
+    return config
+
+# [decoding_preset] returns the decoding options of preset [name] (the default preset when None). Raises ValueError for
+# unknown presets.
+def decoding_preset(name: str | None = None) -> dict:
+    options = DECODING_PRESETS.get(name or DEFAULT_DECODING_PRESET)
+    if options is None:
+        raise ValueError(f"Unknown decoding preset: {name}. Available presets: {', '.join(DECODING_PRESETS)}.")
+    return options
+
+# [uses_vad] resolves a job's vad_filter flag (None means the deployment default)
+def uses_vad(vad_filter: bool | None = None) -> bool:
+    return VAD_FILTER if vad_filter is None else vad_filter
+
+# [supported_language] tells whether Whisper knows language code [code] (e.g. "en", "fr")
+def supported_language(code: str) -> bool:
+    # imported here so the API doesn't load faster_whisper just to import this module
+    from faster_whisper.tokenizer import _LANGUAGE_CODES
+    return code in _LANGUAGE_CODES
+
+# [decode_options] returns the keyword arguments for model.transcribe: the options of decoding [preset], with VAD if
+# [vad] is set. A known [language] skips language detection.
+def decode_options(vad: bool, language: str | None = None, preset: str | None = None) -> dict:
+    options = dict(decoding_preset(preset))
+    if vad:
+        # copied: faster-whisper edits the dict it is given
+        options.update(vad_filter=True, vad_parameters=dict(VAD_PARAMETERS))
+    if language:
+        options["language"] = language
+    return options
+
+# [transcription_params] returns every setting that affects the transcript text for [tier] and a job's [vad_filter]
+# flag, requested [language] and decoding [preset], transcribed the [path] way (see decode_path). Part of the
+# transcript cache key.
+def transcription_params(
+    tier: str | None = None,
+    vad_filter: bool | None = None,
+    language: str | None = None,
+    preset: str | None = None,
+    path: str | None = None,
+) -> dict:
+    config = model_tier(tier)
+    params = {"model": config["model"], "compute_type": config["compute_type"], **decoding_preset(preset)}
+    if language:
+        params["language"] = language
+    if uses_vad(vad_filter):
+        params["vad_parameters"] = VAD_PARAMETERS
+    # batched and chunked decoding segment audio differently, so their transcripts are cached separately. Only the path
+    # the job takes counts, not the deployment's thresholds, so turning a path on leaves other jobs' keys alone.
+    if path:
+        params["path"] = path
+    if path == "chunked":
+        params["chunk_seconds"] = CHUNK_SECONDS
+    return params
+
+# [decode_path] names the way audio of [duration_seconds] is transcribed: "clip_batched" (cross-job clip batching),
+# "chunked" (fanned out across the pool), "batched" (batched inference) or None (window by window, also when the
+# duration is unknown)
+def decode_path(duration_seconds: float | None) -> str | None:
+    if duration_seconds is None:
+        return None
+    if batches_clip(duration_seconds):
+        return "clip_batched"
+    if chunks_audio(duration_seconds):
+        return "chunked"
+    if batches_audio(duration_seconds):
+        return "batched"
+    return None
+
+# [batches_audio] tells whether audio of [duration_seconds] is decoded through the batched inference pipeline
+def batches_audio(duration_seconds: float) -> bool:
+    return bool(BATCHED_MIN_SECONDS) and duration_seconds >= BATCHED_MIN_SECONDS
+
+# [batches_clip] tells whether a job of [duration_seconds] is transcribed through cross-job clip batching
+def batches_clip(duration_seconds: float | None) -> bool:
+    return CLIP_BATCHING and duration_seconds is not None and duration_seconds <= SHORT_CLIP_MAX_SECONDS
+
+# [chunks_audio] tells whether audio of [duration_seconds] is split into chunks and transcribed in parallel
+def chunks_audio(duration_seconds: float) -> bool:
+    return bool(CHUNKED_MIN_SECONDS) and duration_seconds >= CHUNKED_MIN_SECONDS
@@ -0,0 +1,216 @@
+"""
+Whisper model lifecycle for the worker.
+
+Each worker process keeps an LRU of loaded models, one per model tier (see MODEL_TIERS in whisper_config.py),
+bounded by MODEL_MEMORY_BUDGET_MB of resident memory: loading a tier that wouldn't fit evicts the least recently
+used models first. Loads, evictions and the number of processes holding each tier are recorded in the metrics hash.
+
+The default tier is loaded and warmed up when a worker process starts, not inside the first task, so the first job
+after a deploy or restart runs at full speed. Prefork children load it in worker_process_init (the pool only hands a
+child tasks once that returns); the parent downloads the model files before forking, so children only read them from
+disk, and worker_proc_alive_timeout (WORKER_PROC_ALIVE_TIMEOUT_SECONDS in celery_app.py) gives them time to load.
+Solo/threads pools run tasks in the main process, so it is loaded in worker_init, before the consumer starts.
+
+Each process that has warmed up leaves a marker, WORKER_READY_FILE.<pid>; WORKER_READY_FILE itself is written once
+every process of the pool has one, so a container health check testing for it only passes when the whole pool is
+ready.
+"""
+
+import gc
+import glob
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import psutil
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
+from faster_whisper import WhisperModel
+from faster_whisper.utils import download_model
+
+from backend import metrics
+from .whisper_config import (
+    DEFAULT_MODEL_TIER,
+    CPU_COUNT,
+    WHISPER_CPU_THREADS,
+    WHISPER_NUM_WORKERS,
+    model_tier,
+)
+from . import audio
+
+PRELOAD_MODEL = os.getenv("PRELOAD_MODEL", "true").lower() in ("1", "true", "yes")
+# audio used for the warm-up inference; a short synthesized clip is used when unset
+MODEL_WARMUP_CLIP = os.getenv("MODEL_WARMUP_CLIP") or None
+MODEL_WARMUP_SECONDS = float(os.getenv("MODEL_WARMUP_SECONDS", 2))
+WORKER_READY_FILE = os.getenv("WORKER_READY_FILE", "/tmp/transcribe-worker-ready")
+# resident memory one worker process may spend on loaded models
+MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", 4096))
+
+# tier -> (model, resident bytes), least recently used first
+_models: "OrderedDict[str, tuple[WhisperModel, int]]" = OrderedDict()
+# measured resident size per model name, reused as the estimate when that model is loaded again
+_footprints: dict[str, int] = {}
+_lock = threading.Lock()
+# processes in the pool that must be warmed up before the worker is ready (set in the parent before it forks)
+_pool_size = 1
+
+# [_warmup_audio] returns the clip for the warm-up inference as 16 kHz mono PCM: MODEL_WARMUP_CLIP if set, otherwise
+# MODEL_WARMUP_SECONDS of a quiet tone (enough to run the encoder and one decoding pass)
+def _warmup_audio() -> np.ndarray:
+    if MODEL_WARMUP_CLIP:
+        return audio.decode(MODEL_WARMUP_CLIP)
+    t = np.arange(int(MODEL_WARMUP_SECONDS * audio.SAMPLING_RATE), dtype=np.float32) / audio.SAMPLING_RATE
+    return (0.1 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+def _rss() -> int:
+    return psutil.Process().memory_info().rss
+
+# [_model_path] resolves a tier's model to a local directory, downloading it if needed
+def _model_path(model: str) -> str:
+    return model if os.path.isdir(model) else download_model(model)
+
+# [_estimate_bytes] guesses how much memory a tier will take before it is loaded: the tier's memory_mb, the size
+# measured the last time this model was loaded, or the size of the model files on disk
+def _estimate_bytes(config: dict, path: str) -> int:
+    if config.get("memory_mb"):
+        return int(config["memory_mb"]) * 1024 * 1024
+    if config["model"] in _footprints:
+        return _footprints[config["model"]]
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+def resident_bytes() -> int:
+    return sum(size for _, size in _models.values())
+
+# [_unload_oldest] drops the least recently used model and returns its tier and size
+def _unload_oldest() -> tuple[str, int]:
+    tier, (model, size) = _models.popitem(last=False)
+    del model
+    gc.collect()
+    metrics.incr(f"model_resident_{tier}", -1)
+    metrics.incr("model_resident_bytes", -size)
+    return tier, size
+
+# [_evict] unloads the least recently used model to make room for another
+def _evict():
+    tier, size = _unload_oldest()
+    metrics.incr("model_evictions")
+    print(f"Evicted model tier '{tier}' ({size / 2**20:.0f}MB), {len(_models)} model(s) still loaded")
+
+# [_load] loads tier [tier] into the cache, evicting models as needed to stay within MODEL_MEMORY_BUDGET_MB,
+# and runs one warm-up inference on it
+def _load(tier: str) -> WhisperModel:
+    config = model_tier(tier)
+    path = _model_path(config["model"])
+    budget = MODEL_MEMORY_BUDGET_MB * 1024 * 1024
+    estimate = _estimate_bytes(config, path)
+    while _models and resident_bytes() + estimate > budget:
+        _evict()
+    if estimate > budget:
+        print(f"Model tier '{tier}' (~{estimate / 2**20:.0f}MB) exceeds MODEL_MEMORY_BUDGET_MB; loading it alone")
+
+    print(f"Loading model tier '{tier}' ({config['model']})...")
+    rss_before = _rss()
+    start = time.perf_counter()
+    model = WhisperModel(
+        path,
+        device=config["device"],
+        compute_type=config["compute_type"],
+        cpu_threads=config.get("cpu_threads", WHISPER_CPU_THREADS),
+        num_workers=config.get("num_workers", WHISPER_NUM_WORKERS),
+    )
+    load_seconds = time.perf_counter() - start
+    metrics.observe("model_load_seconds", load_seconds)
+
+    # the first inference pays for allocator and kernel setup; do it here instead of in a real job
+    start = time.perf_counter()
+    segments, _ = model.transcribe(_warmup_audio(), beam_size=1)
+    for _ in segments:  # segments is a generator, so iterating runs the inference
+        pass
+    warmup_seconds = time.perf_counter() - start
+    metrics.observe("model_warmup_seconds", warmup_seconds)
+
+    size = max(_rss() - rss_before, 0) or estimate
+    _footprints[config["model"]] = size
+    _models[tier] = (model, size)
+    metrics.incr("model_loads")
+    metrics.incr(f"model_resident_{tier}")
+    metrics.incr("model_resident_bytes", size)
+    print(
+        f"Model tier '{tier}' loaded in {load_seconds:.2f}s, warmed up in {warmup_seconds:.2f}s, "
+        f"~{size / 2**20:.0f}MB; {len(_models)} model(s) loaded, {resident_bytes() / 2**20:.0f}MB resident"
+    )
+    return model
+
+# [get_model] returns the model for [tier] (the default tier when None), loading it on first use
+def get_model(tier: str | None = None) -> WhisperModel:
+    tier = tier or DEFAULT_MODEL_TIER
+    with _lock:
+        if tier in _models:
+            _models.move_to_end(tier)
+            return _models[tier][0]
+        return _load(tier)
+
+# [_ready_markers] returns the markers of the processes that have warmed up
+def _ready_markers() -> list[str]:
+    return glob.glob(f"{glob.escape(WORKER_READY_FILE)}.*")
+
+# [preload] loads and warms up the default tier, then marks the process ready; the last process of the pool to get
+# there marks the worker ready
+def preload():
+    get_model()
+    with open(f"{WORKER_READY_FILE}.{os.getpid()}", "w") as f:
+        f.write(str(os.getpid()))
+    # each process writes its marker before counting, so the last one to finish sees them all
+    if len(_ready_markers()) >= _pool_size:
+        with open(WORKER_READY_FILE, "w") as f:
+            f.write(str(os.getpid()))
+
+# [_clear_ready] removes the readiness file and markers left behind by a previous run
+def _clear_ready(**kwargs):
+    for path in [WORKER_READY_FILE, *_ready_markers()]:
+        if os.path.exists(path):
+            os.remove(path)
+
+# [_clear_marker] removes the marker of a pool process that exits (e.g. when it is replaced)
+def _clear_marker(**kwargs):
+    marker = f"{WORKER_READY_FILE}.{os.getpid()}"
+    if os.path.exists(marker):
+        os.remove(marker)
+
+@worker_init.connect
+def _preload_main_process(sender=None, **kwargs):
+    from celery.concurrency import get_implementation
+    from celery.concurrency.prefork import TaskPool as PreforkPool
+
+    _clear_ready()
+    pool = get_implementation(sender.pool_cls)
+    print(
+        f"Worker sizing: {CPU_COUNT} cores, pool={pool.__module__.rsplit('.', 1)[-1]}, concurrency={sender.concurrency}, "
+        f"cpu_threads={WHISPER_CPU_THREADS}, num_workers={WHISPER_NUM_WORKERS}"
+    )
+    if not PRELOAD_MODEL:
+        return
+    if issubclass(pool, PreforkPool):
+        global _pool_size
+        _pool_size = sender.concurrency
+        # children load their own copy in worker_process_init; loading in the parent as well would waste memory (and
+        # CTranslate2 models don't survive a fork), but downloading here keeps the download out of every child's start
+        _model_path(model_tier()["model"])
+    else:
+        preload()
+
+@worker_process_init.connect
+def _preload_child_process(**kwargs):
+    if PRELOAD_MODEL:
+        preload()
+
+# [_unload_all] releases the process's models (and their residency counts) on shutdown
+def _unload_all(**kwargs):
+    while _models:
+        _unload_oldest()
+
+worker_process_shutdown.connect(_unload_all)
+worker_process_shutdown.connect(_clear_marker)
+worker_shutdown.connect(_unload_all)
+worker_shutdown.connect(_clear_ready)
@@ -0,0 +1,28 @@
+"""add normalized audio filename to jobs
+
+Revision ID: 008dcc177069
+Revises: d77308ea2768
+Create Date: 2026-10-18 15:41:52.338170
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008dcc177069'
+down_revision: Union[str, Sequence[str], None] = 'd77308ea2768'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs_table', sa.Column('normalized_filename', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('jobs_table', 'normalized_filename')
@@ -0,0 +1,30 @@
+"""add probed audio duration to jobs and upload sessions
+
+Revision ID: 09aefbe4b385
+Revises: 008dcc177069
+Create Date: 2026-10-18 17:08:25.603442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '09aefbe4b385'
+down_revision: Union[str, Sequence[str], None] = '008dcc177069'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs_table', sa.Column('duration_seconds', sa.Float(), nullable=True))
+    op.add_column('upload_sessions_table', sa.Column('duration_seconds', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('upload_sessions_table', 'duration_seconds')
+    op.drop_column('jobs_table', 'duration_seconds')
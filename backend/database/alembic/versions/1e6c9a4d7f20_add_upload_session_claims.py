@@ -0,0 +1,28 @@
+"""add upload session claims
+
+Revision ID: 1e6c9a4d7f20
+Revises: f3b9d1e7a285
+Create Date: 2026-10-24 11:02:45.613902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1e6c9a4d7f20'
+down_revision: Union[str, Sequence[str], None] = 'f3b9d1e7a285'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('upload_sessions_table', sa.Column('claimed_until', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('upload_sessions_table', 'claimed_until')
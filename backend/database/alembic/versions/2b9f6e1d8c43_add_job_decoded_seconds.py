@@ -0,0 +1,28 @@
+"""add decoded seconds to jobs
+
+Revision ID: 2b9f6e1d8c43
+Revises: e41c8a5d9f07
+Create Date: 2026-10-20 10:12:58.641207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b9f6e1d8c43'
+down_revision: Union[str, Sequence[str], None] = 'e41c8a5d9f07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs_table', sa.Column('decoded_seconds', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('jobs_table', 'decoded_seconds')
@@ -0,0 +1,30 @@
+"""add decoding preset
+
+Revision ID: 3f7c1b9e6d52
+Revises: 5a8e2f4c7b19
+Create Date: 2026-10-21 10:12:37.504119
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f7c1b9e6d52'
+down_revision: Union[str, Sequence[str], None] = '5a8e2f4c7b19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs_table', sa.Column('decoding_preset', sa.String(), nullable=True))
+    op.add_column('upload_sessions_table', sa.Column('decoding_preset', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('upload_sessions_table', 'decoding_preset')
+    op.drop_column('jobs_table', 'decoding_preset')
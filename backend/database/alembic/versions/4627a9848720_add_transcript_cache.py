@@ -0,0 +1,44 @@
+"""add transcript cache table and job audio hash
+
+Revision ID: 4627a9848720
+Revises: c945d464c937
+Create Date: 2026-10-18 11:03:47.219864
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4627a9848720'
+down_revision: Union[str, Sequence[str], None] = 'c945d464c937'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs_table', sa.Column('audio_sha256', sa.String(), nullable=True))
+
+    op.create_table('transcript_cache_table',
+    sa.Column('cache_key', sa.String(), nullable=False),
+    sa.Column('audio_sha256', sa.String(), nullable=False),
+    sa.Column('params', sa.Text(), nullable=False),
+    sa.Column('transcript', sa.Text(), nullable=False),
+    sa.Column('hit_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_used_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('cache_key')
+    )
+    op.create_index(op.f('ix_transcript_cache_table_audio_sha256'), 'transcript_cache_table', ['audio_sha256'], unique=False)
+    op.create_index(op.f('ix_transcript_cache_table_last_used_at'), 'transcript_cache_table', ['last_used_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_transcript_cache_table_last_used_at'), table_name='transcript_cache_table')
+    op.drop_index(op.f('ix_transcript_cache_table_audio_sha256'), table_name='transcript_cache_table')
+    op.drop_table('transcript_cache_table')
+    op.drop_column('jobs_table', 'audio_sha256')
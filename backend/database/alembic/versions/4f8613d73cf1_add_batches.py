@@ -0,0 +1,41 @@
+"""add batches table and job batch id
+
+Revision ID: 4f8613d73cf1
+Revises: 09aefbe4b385
+Create Date: 2026-10-19 09:22:14.770391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f8613d73cf1'
+down_revision: Union[str, Sequence[str], None] = '09aefbe4b385'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('batches_table',
+    sa.Column('id', UUID(as_uuid=True), nullable=False),
+    sa.Column('owner', UUID(as_uuid=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.ForeignKeyConstraint(['owner'], ['users_table.id'])
+    )
+    op.add_column('jobs_table', sa.Column('batch_id', UUID(as_uuid=True), nullable=True))
+    op.create_foreign_key('jobs_table_batch_id_fkey', 'jobs_table', 'batches_table', ['batch_id'], ['id'])
+    op.create_index(op.f('ix_jobs_table_batch_id'), 'jobs_table', ['batch_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_jobs_table_batch_id'), table_name='jobs_table')
+    op.drop_constraint('jobs_table_batch_id_fkey', 'jobs_table', type_='foreignkey')
+    op.drop_column('jobs_table', 'batch_id')
+    op.drop_table('batches_table')
@@ -0,0 +1,36 @@
+"""add requested and detected language
+
+Revision ID: 5a8e2f4c7b19
+Revises: 9c05d7b3a6e2
+Create Date: 2026-10-20 16:05:44.092318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a8e2f4c7b19'
+down_revision: Union[str, Sequence[str], None] = '9c05d7b3a6e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs_table', sa.Column('language', sa.String(), nullable=True))
+    op.add_column('jobs_table', sa.Column('detected_language', sa.String(), nullable=True))
+    op.add_column('jobs_table', sa.Column('language_probability', sa.Float(), nullable=True))
+    op.add_column('upload_sessions_table', sa.Column('language', sa.String(), nullable=True))
+    op.add_column('users_table', sa.Column('default_language', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users_table', 'default_language')
+    op.drop_column('upload_sessions_table', 'language')
+    op.drop_column('jobs_table', 'language_probability')
+    op.drop_column('jobs_table', 'detected_language')
+    op.drop_column('jobs_table', 'language')
@@ -0,0 +1,30 @@
+"""add job chunks dispatched at
+
+Revision ID: 5d2b8e7f3a16
+Revises: 7a4e2c9d1b63
+Create Date: 2026-10-26 14:12:08.519347
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2b8e7f3a16'
+down_revision: Union[str, Sequence[str], None] = '7a4e2c9d1b63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs_table', sa.Column('chunks_dispatched_at', sa.DateTime(timezone=True), nullable=True))
+    # jobs split before this column existed had their chunks sent along with the split
+    op.execute('UPDATE jobs_table SET chunks_dispatched_at = COALESCE(updated_at, now()) WHERE chunks_total IS NOT NULL')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('jobs_table', 'chunks_dispatched_at')
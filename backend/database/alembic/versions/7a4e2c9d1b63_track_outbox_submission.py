@@ -0,0 +1,35 @@
+"""track outbox submission
+
+Revision ID: 7a4e2c9d1b63
+Revises: 1e6c9a4d7f20
+Create Date: 2026-10-25 09:41:17.208355
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a4e2c9d1b63'
+down_revision: Union[str, Sequence[str], None] = '1e6c9a4d7f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('job_outbox_table', sa.Column('submitted_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute('UPDATE job_outbox_table SET submitted_at = sent_at')
+    op.drop_index('ix_job_outbox_pending', table_name='job_outbox_table', postgresql_where=sa.text('sent_at IS NULL'))
+    op.create_index('ix_job_outbox_pending', 'job_outbox_table', ['id'], unique=False, postgresql_where=sa.text('submitted_at IS NULL'))
+    op.create_index('ix_job_outbox_unsent', 'job_outbox_table', ['submitted_at'], unique=False, postgresql_where=sa.text('sent_at IS NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_job_outbox_unsent', table_name='job_outbox_table', postgresql_where=sa.text('sent_at IS NULL'))
+    op.drop_index('ix_job_outbox_pending', table_name='job_outbox_table', postgresql_where=sa.text('submitted_at IS NULL'))
+    op.create_index('ix_job_outbox_pending', 'job_outbox_table', ['id'], unique=False, postgresql_where=sa.text('sent_at IS NULL'))
+    op.drop_column('job_outbox_table', 'submitted_at')
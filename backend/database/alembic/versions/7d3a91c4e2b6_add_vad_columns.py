@@ -0,0 +1,32 @@
+"""add vad filter flag and skipped seconds
+
+Revision ID: 7d3a91c4e2b6
+Revises: b5e2c07a91d4
+Create Date: 2026-10-19 16:22:10.384512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3a91c4e2b6'
+down_revision: Union[str, Sequence[str], None] = 'b5e2c07a91d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs_table', sa.Column('vad_filter', sa.Boolean(), nullable=True))
+    op.add_column('jobs_table', sa.Column('vad_skipped_seconds', sa.Float(), nullable=True))
+    op.add_column('upload_sessions_table', sa.Column('vad_filter', sa.Boolean(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('upload_sessions_table', 'vad_filter')
+    op.drop_column('jobs_table', 'vad_skipped_seconds')
+    op.drop_column('jobs_table', 'vad_filter')
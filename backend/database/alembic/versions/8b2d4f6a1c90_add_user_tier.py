@@ -0,0 +1,28 @@
+"""add user tier
+
+Revision ID: 8b2d4f6a1c90
+Revises: 3f7c1b9e6d52
+Create Date: 2026-10-21 15:48:02.731846
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2d4f6a1c90'
+down_revision: Union[str, Sequence[str], None] = '3f7c1b9e6d52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users_table', sa.Column('tier', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users_table', 'tier')
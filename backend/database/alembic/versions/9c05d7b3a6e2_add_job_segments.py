@@ -0,0 +1,37 @@
+"""add job segments table
+
+Revision ID: 9c05d7b3a6e2
+Revises: 2b9f6e1d8c43
+Create Date: 2026-10-20 13:40:21.517960
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c05d7b3a6e2'
+down_revision: Union[str, Sequence[str], None] = '2b9f6e1d8c43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('job_segments_table',
+    sa.Column('job_id', UUID(as_uuid=True), nullable=False),
+    sa.Column('start_ms', sa.Integer(), nullable=False),
+    sa.Column('end_ms', sa.Integer(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('avg_logprob', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('job_id', 'start_ms'),
+    sa.ForeignKeyConstraint(['job_id'], ['jobs_table.id'])
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('job_segments_table')
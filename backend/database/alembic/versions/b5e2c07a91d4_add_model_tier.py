@@ -0,0 +1,30 @@
+"""add model tier to jobs and upload sessions
+
+Revision ID: b5e2c07a91d4
+Revises: 4f8613d73cf1
+Create Date: 2026-10-19 14:05:47.218630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e2c07a91d4'
+down_revision: Union[str, Sequence[str], None] = '4f8613d73cf1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs_table', sa.Column('model_tier', sa.String(), nullable=True))
+    op.add_column('upload_sessions_table', sa.Column('model_tier', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('upload_sessions_table', 'model_tier')
+    op.drop_column('jobs_table', 'model_tier')
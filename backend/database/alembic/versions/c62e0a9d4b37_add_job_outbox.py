@@ -0,0 +1,43 @@
+"""add job outbox table
+
+Revision ID: c62e0a9d4b37
+Revises: 8b2d4f6a1c90
+Create Date: 2026-10-22 09:26:14.380527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c62e0a9d4b37'
+down_revision: Union[str, Sequence[str], None] = '8b2d4f6a1c90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('job_outbox_table',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('job_id', UUID(as_uuid=True), nullable=False),
+    sa.Column('owner', UUID(as_uuid=True), nullable=False),
+    sa.Column('signature', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['jobs_table.id']),
+    sa.ForeignKeyConstraint(['owner'], ['users_table.id']),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_job_outbox_table_job_id'), 'job_outbox_table', ['job_id'], unique=False)
+    op.create_index('ix_job_outbox_pending', 'job_outbox_table', ['id'], unique=False, postgresql_where=sa.text('sent_at IS NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_job_outbox_pending', table_name='job_outbox_table', postgresql_where=sa.text('sent_at IS NULL'))
+    op.drop_index(op.f('ix_job_outbox_table_job_id'), table_name='job_outbox_table')
+    op.drop_table('job_outbox_table')
@@ -0,0 +1,39 @@
+"""add upload sessions table for presigned uploads
+
+Revision ID: c945d464c937
+Revises: a38ddbb3b29b
+Create Date: 2026-10-18 09:12:31.504118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c945d464c937'
+down_revision: Union[str, Sequence[str], None] = 'a38ddbb3b29b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('upload_sessions_table',
+    sa.Column('id', UUID(as_uuid=True), nullable=False),
+    sa.Column('owner', UUID(as_uuid=True), nullable=False),
+    sa.Column('filename', sa.String(), nullable=False),
+    sa.Column('stored_filename', sa.String(), nullable=False),
+    sa.Column('content_type', sa.String(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.ForeignKeyConstraint(['owner'], ['users_table.id'])
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('upload_sessions_table')
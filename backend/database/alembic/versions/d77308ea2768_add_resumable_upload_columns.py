@@ -0,0 +1,36 @@
+"""add resumable upload columns to upload sessions
+
+Revision ID: d77308ea2768
+Revises: 4627a9848720
+Create Date: 2026-10-18 13:26:09.870215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd77308ea2768'
+down_revision: Union[str, Sequence[str], None] = '4627a9848720'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('upload_sessions_table', sa.Column('upload_id', sa.String(), nullable=True))
+    op.add_column('upload_sessions_table', sa.Column('size', sa.BigInteger(), nullable=True))
+    op.add_column('upload_sessions_table', sa.Column('offset', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('upload_sessions_table', sa.Column('parts', sa.Text(), nullable=True))
+    op.create_index(op.f('ix_upload_sessions_table_expires_at'), 'upload_sessions_table', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_upload_sessions_table_expires_at'), table_name='upload_sessions_table')
+    op.drop_column('upload_sessions_table', 'parts')
+    op.drop_column('upload_sessions_table', 'offset')
+    op.drop_column('upload_sessions_table', 'size')
+    op.drop_column('upload_sessions_table', 'upload_id')
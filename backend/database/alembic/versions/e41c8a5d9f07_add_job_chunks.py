@@ -0,0 +1,52 @@
+"""add job chunks table and chunk progress
+
+Revision ID: e41c8a5d9f07
+Revises: 7d3a91c4e2b6
+Create Date: 2026-10-19 18:47:33.905126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41c8a5d9f07'
+down_revision: Union[str, Sequence[str], None] = '7d3a91c4e2b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('job_chunks_table',
+    sa.Column('id', UUID(as_uuid=True), nullable=False),
+    sa.Column('job_id', UUID(as_uuid=True), nullable=False),
+    sa.Column('index', sa.Integer(), nullable=False),
+    sa.Column('start_seconds', sa.Float(), nullable=False),
+    sa.Column('end_seconds', sa.Float(), nullable=False),
+    sa.Column('offset_seconds', sa.Float(), nullable=False),
+    sa.Column('stored_filename', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('segments', sa.Text(), nullable=True),
+    sa.Column('vad_skipped_seconds', sa.Float(), nullable=True),
+    sa.Column('error_message', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.ForeignKeyConstraint(['job_id'], ['jobs_table.id']),
+    sa.UniqueConstraint('job_id', 'index')
+    )
+    op.create_index(op.f('ix_job_chunks_table_job_id'), 'job_chunks_table', ['job_id'], unique=False)
+    op.add_column('jobs_table', sa.Column('chunks_total', sa.Integer(), nullable=True))
+    op.add_column('jobs_table', sa.Column('chunks_completed', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('jobs_table', 'chunks_completed')
+    op.drop_column('jobs_table', 'chunks_total')
+    op.drop_index(op.f('ix_job_chunks_table_job_id'), table_name='job_chunks_table')
+    op.drop_table('job_chunks_table')
@@ -0,0 +1,34 @@
+"""add execution leases
+
+Revision ID: f3b9d1e7a285
+Revises: c62e0a9d4b37
+Create Date: 2026-10-23 10:14:37.208519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9d1e7a285'
+down_revision: Union[str, Sequence[str], None] = 'c62e0a9d4b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs_table', sa.Column('lease_owner', sa.String(), nullable=True))
+    op.add_column('jobs_table', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('job_chunks_table', sa.Column('lease_owner', sa.String(), nullable=True))
+    op.add_column('job_chunks_table', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('job_chunks_table', 'lease_expires_at')
+    op.drop_column('job_chunks_table', 'lease_owner')
+    op.drop_column('jobs_table', 'lease_expires_at')
+    op.drop_column('jobs_table', 'lease_owner')
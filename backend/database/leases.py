@@ -0,0 +1,162 @@
+"""
+Execution leases on jobs and chunks.
+
+A task that transcribes a job (or a chunk of one) first takes the row's lease: one UPDATE that stamps lease_owner and
+lease_expires_at, and only matches while no other live lease is held. While the task runs, a Heartbeat thread pushes
+lease_expires_at forward every JOB_LEASE_SECONDS / 3, and the task clears the lease when it ends. A duplicate delivery
+of the same message (a redelivery after a visibility timeout, or a task published twice) finds the lease held and
+gives up its worker at once instead of decoding the audio a second time. If the row is finished it exits; otherwise it
+looks once more when the lease would have lapsed (see defer_duplicate), and exits if the lease was renewed meanwhile,
+since a live holder's own message is delivered again if it dies. If a worker dies, its lease lapses after
+JOB_LEASE_SECONDS and the task, which is only acknowledged when it finishes (acks_late), is delivered again and resumes
+the job. A
+worker that merely stalled past its lease finds out on its next heartbeat (Heartbeat.lost) and must stop without
+writing: the task checks its heartbeat before each write and gives up with LeaseLost.
+
+Lease times come from the database clock, so workers' clocks don't need to agree.
+"""
+
+import os
+import socket
+import threading
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from backend import metrics
+from backend.database.database import SessionLocal
+
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 60))
+# how many times a duplicate delivery looks again at a lease that wasn't renewed before giving up
+LEASE_RETRIES = int(os.getenv("LEASE_RETRIES", 3))
+
+
+class LeaseLost(Exception):
+    """Raised when another execution took over a leased row, so this one must not write to it."""
+
+
+# [new_token] returns a lease owner id unique to one task execution (a redelivered task shares the Celery task id)
+def new_token() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+
+# [_extend] sets the lease of the [model] rows in [ids] to [token] for another JOB_LEASE_SECONDS where [condition]
+# holds, commits and returns the ids it matched
+def _extend(db: Session, model, ids: list, token: str, condition) -> list:
+    matched = db.execute(
+        update(model)
+        .where(model.id.in_(ids), condition)
+        .values(lease_owner=token, lease_expires_at=func.now() + timedelta(seconds=JOB_LEASE_SECONDS))
+        .returning(model.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.commit()
+    return matched
+
+# [acquire] takes the lease of the [model] rows in [ids] (Job or JobChunk) for [token] and returns the ids it got.
+# Rows leased by another live execution are left out.
+def acquire(db: Session, model, ids: list, token: str) -> list:
+    acquired = _extend(
+        db, model, ids, token, or_(model.lease_expires_at.is_(None), model.lease_expires_at < func.now())
+    )
+    if len(acquired) < len(ids):
+        metrics.incr("duplicate_deliveries", len(ids) - len(acquired))
+    return acquired
+
+# [renew] extends the leases [token] still holds on the [model] rows in [ids] and returns their ids
+def renew(db: Session, model, ids: list, token: str) -> list:
+    return _extend(db, model, ids, token, model.lease_owner == token)
+
+# [release] clears the leases [token] holds on the [model] rows in [ids], discarding whatever [db] has not committed.
+# A failure is only logged: the leases then lapse after JOB_LEASE_SECONDS.
+def release(db: Session, model, ids: list, token: str):
+    try:
+        db.rollback()
+        db.execute(
+            update(model)
+            .where(model.id.in_(ids), model.lease_owner == token)
+            .values(lease_owner=None, lease_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception as exc:
+        print(f"Failed to release {len(ids)} {model.__tablename__} leases: {exc}")
+
+
+# [expiry] returns when the lease on the [model] row [id] expires (epoch seconds, None if it isn't leased) and how many
+# seconds are left on it, both by the database clock
+def expiry(db: Session, model, id) -> tuple[float | None, float]:
+    expires, left = db.query(
+        func.extract("epoch", model.lease_expires_at), func.extract("epoch", model.lease_expires_at - func.now())
+    ).filter(model.id == id).one()
+    return (float(expires) if expires is not None else None), float(left or 0)
+
+# [defer_duplicate] is called by [task] when the lease on the [model] row [id] is held by another execution. It returns
+# when the delivery should exit: the row is [finished], or its lease expiry moved past [seen] (what an earlier look at
+# it saw), so the holder is alive, and its own message is delivered again if it dies. Otherwise the holder may have
+# died, so it retries [task] once the lease would have lapsed, passing the expiry on as the lease_seen keyword, at most
+# LEASE_RETRIES times.
+def defer_duplicate(task, db: Session, model, id, finished: bool, seen: float | None):
+    if finished:
+        return
+    expires, left = expiry(db, model, id)
+    if seen is not None and expires is not None and expires > seen:
+        return
+    if task.request.retries >= LEASE_RETRIES:
+        print(f"{model.__tablename__} {id} is still leased after {LEASE_RETRIES} retries, giving up")
+        return
+    countdown = max(left, 0) + 1
+    print(f"{model.__tablename__} {id} is leased elsewhere, checking again in {countdown:.0f}s")
+    raise task.retry(
+        countdown=countdown, max_retries=LEASE_RETRIES, kwargs={**(task.request.kwargs or {}), "lease_seen": expires}
+    )
+
+
+class Heartbeat:
+    # renews [token]'s leases on the [model] rows in [ids] from a background thread until stopped, calling [on_beat]
+    # (if given) after each renewal
+    def __init__(self, model, ids: list, token: str, on_beat=None):
+        self.lost = False
+        self.lost_ids: set[str] = set()
+        self._on_beat = on_beat
+        self._model = model
+        self._ids = list(ids)
+        self._token = token
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{token}", daemon=True)
+        self._thread.start()
+
+    # [_run] renews the leases every JOB_LEASE_SECONDS / 3; a failed renewal is retried on the next beat
+    def _run(self):
+        while not self._stopped.wait(JOB_LEASE_SECONDS / 3):
+            db = SessionLocal()
+            try:
+                held = renew(db, self._model, self._ids, self._token)
+                if len(held) < len(self._ids):
+                    # another execution took over after a lease lapsed (e.g. this process stalled)
+                    print(f"Lost the lease on {len(self._ids) - len(held)} {self._model.__tablename__} rows")
+                    self.lost = True
+                    self.lost_ids.update(str(id) for id in set(self._ids) - set(held))
+                    self._ids = held
+            except Exception as exc:
+                print(f"Failed to renew leases: {exc}")
+            finally:
+                db.close()
+            if self._on_beat:
+                self._on_beat()
+
+    # [holds] tells whether the lease on row [id] is still this execution's
+    def holds(self, id) -> bool:
+        return str(id) not in self.lost_ids
+
+    # [check] raises LeaseLost if another execution took over the row [id], or any of the rows when [id] is None
+    def check(self, id=None):
+        if self.lost if id is None else not self.holds(id):
+            raise LeaseLost(f"Lost the lease on {self._model.__tablename__} {id or ', '.join(sorted(self.lost_ids))}")
+
+    # [stop] stops renewing and waits for the thread
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
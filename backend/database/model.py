@@ -1,9 +1,9 @@
 import uuid
-from sqlalchemy import Column, String, DateTime, Text, Boolean
+from sqlalchemy import Column, String, DateTime, Text, Boolean, Integer, BigInteger, Float
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from backend.database.database import Base
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index, UniqueConstraint, text
 
 class Job(Base):
     __tablename__ = "jobs_table"
@@ -15,12 +15,73 @@ class Job(Base):
     transcript = Column(Text, nullable=True)
     owner = Column(ForeignKey("users_table.id"))
     stored_filename = Column(String, nullable=False)
+    batch_id = Column(ForeignKey("batches_table.id"), nullable=True, index=True) # set for jobs uploaded as a batch
+    audio_sha256 = Column(String, nullable=True) # hex digest of the uploaded audio, used for the transcript cache
+    normalized_filename = Column(String, nullable=True) # 16 kHz mono FLAC/Opus copy of the audio, if normalized
+    duration_seconds = Column(Float, nullable=True) # probed at upload; None if the header doesn't carry it
+    model_tier = Column(String, nullable=True) # MODEL_TIERS entry to transcribe with; None means the default tier
+    vad_filter = Column(Boolean, nullable=True) # skip non-speech before decoding; None means the VAD_FILTER default
+    vad_skipped_seconds = Column(Float, nullable=True) # non-speech audio VAD kept out of the decoder (None on cache hits)
+    language = Column(String, nullable=True) # requested language code; None means detect it
+    detected_language = Column(String, nullable=True) # language the audio was transcribed in
+    language_probability = Column(Float, nullable=True) # confidence of detected_language (1.0 when requested)
+    decoding_preset = Column(String, nullable=True) # DECODING_PRESETS entry to decode with; None means the default preset
+    decoded_seconds = Column(Float, nullable=True) # audio decoded so far; transcript holds the text up to here
+    chunks_total = Column(Integer, nullable=True) # set when a long recording is split into chunks (see JobChunk)
+    chunks_completed = Column(Integer, nullable=True) # chunks finished so far, successfully or not
+    chunks_dispatched_at = Column(DateTime(timezone=True), nullable=True) # when the chunk tasks were sent
+    lease_owner = Column(String, nullable=True) # execution holding the job's lease (see backend/database/leases.py)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True) # lease is free again after this
 
     error_message = Column(Text, nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+# One piece of a long recording, transcribed as its own task and stitched into the parent job's transcript.
+# The chunk owns [start_seconds, end_seconds) of the recording; its audio starts at offset_seconds and overlaps
+# its neighbours by CHUNK_OVERLAP_SECONDS.
+class JobChunk(Base):
+    __tablename__ = "job_chunks_table"
+    __table_args__ = (UniqueConstraint("job_id", "index"),)
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    job_id = Column(ForeignKey("jobs_table.id"), nullable=False, index=True)
+    index = Column(Integer, nullable=False)
+    start_seconds = Column(Float, nullable=False)
+    end_seconds = Column(Float, nullable=False)
+    offset_seconds = Column(Float, nullable=False)
+    stored_filename = Column(String, nullable=False) # 16 kHz chunk audio
+    status = Column(String, nullable=False) # pending | completed | failed
+    segments = Column(Text, nullable=True) # JSON list of {"start", "end", "text", "avg_logprob"} in recording time
+    vad_skipped_seconds = Column(Float, nullable=True)
+    error_message = Column(Text, nullable=True)
+    lease_owner = Column(String, nullable=True) # execution holding the chunk's lease (see backend/database/leases.py)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+# One decoded segment of a job's transcript (see backend/database/segments.py). Times are in milliseconds.
+class JobSegment(Base):
+    __tablename__ = "job_segments_table"
+
+    job_id = Column(ForeignKey("jobs_table.id"), primary_key=True)
+    start_ms = Column(Integer, primary_key=True)
+    end_ms = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    avg_logprob = Column(Float, nullable=True)
+
+# A group of jobs uploaded together through the batch endpoint
+class Batch(Base):
+    __tablename__ = "batches_table"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    owner = Column(ForeignKey("users_table.id"), nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
 class User(Base):
     __tablename__ = "users_table"
 
@@ -29,8 +90,72 @@ class User(Base):
     username = Column(String, nullable=False)
     password = Column(String, nullable=False)
     disabled = Column(Boolean, nullable=True, default=False)
+    default_language = Column(String, nullable=True) # language of uploads that don't name one; None means detect it
+    tier = Column(String, nullable=True) # USER_TIERS entry capping the user's jobs in flight; None means the default
 
     hashed_password = Column(String, nullable=False)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+# A pending upload, either presigned (direct-to-bucket) or resumable (chunked through the API).
+# The session id becomes the Job id once the upload is completed.
+class UploadSession(Base):
+    __tablename__ = "upload_sessions_table"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    owner = Column(ForeignKey("users_table.id"), nullable=False)
+    filename = Column(String, nullable=False)
+    stored_filename = Column(String, nullable=False)
+    content_type = Column(String, nullable=False)
+    model_tier = Column(String, nullable=True) # copied onto the Job when the upload completes
+    vad_filter = Column(Boolean, nullable=True) # copied onto the Job when the upload completes
+    language = Column(String, nullable=True) # copied onto the Job when the upload completes
+    decoding_preset = Column(String, nullable=True) # copied onto the Job when the upload completes
+
+    # resumable uploads only: S3 multipart upload id, declared total size, bytes received so far and uploaded parts
+    upload_id = Column(String, nullable=True)
+    size = Column(BigInteger, nullable=True)
+    offset = Column(BigInteger, nullable=False, default=0)
+    parts = Column(Text, nullable=True) # JSON list of {"PartNumber", "ETag"}
+    duration_seconds = Column(Float, nullable=True) # probed from the first chunk
+    claimed_until = Column(DateTime(timezone=True), nullable=True) # a request is using the session until then
+
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+# Transcripts keyed by audio content + transcription parameters, so identical re-uploads skip Whisper
+class TranscriptCache(Base):
+    __tablename__ = "transcript_cache_table"
+
+    cache_key = Column(String, primary_key=True) # sha256 of (audio_sha256, params)
+
+    audio_sha256 = Column(String, nullable=False, index=True)
+    params = Column(Text, nullable=False) # JSON of the model/decoding parameters
+    transcript = Column(Text, nullable=False)
+    hit_count = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+# Transactional outbox of transcription tasks. The API writes a row in the same transaction as the Job it belongs to,
+# and the dispatcher (backend/dispatcher.py) submits pending rows to the fair scheduler in batches and stamps
+# submitted_at; sent_at is stamped once the task is actually published to Celery.
+class JobOutbox(Base):
+    __tablename__ = "job_outbox_table"
+    __table_args__ = (
+        Index("ix_job_outbox_pending", "id", postgresql_where=text("submitted_at IS NULL")),
+        Index("ix_job_outbox_unsent", "submitted_at", postgresql_where=text("sent_at IS NULL")),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True) # publishing order
+
+    job_id = Column(ForeignKey("jobs_table.id"), nullable=False, index=True)
+    owner = Column(ForeignKey("users_table.id"), nullable=False)
+    signature = Column(Text, nullable=False) # JSON of the Celery signature to publish
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    submitted_at = Column(DateTime(timezone=True), nullable=True) # handed to the fair scheduler
+    sent_at = Column(DateTime(timezone=True), nullable=True) # published to Celery
@@ -0,0 +1,82 @@
+"""
+Transactional outbox of transcription tasks.
+
+Instead of publishing to the broker, the API adds the job's Celery signature to job_outbox_table in the same
+transaction that creates the Job, so a job is never committed without its task (or the other way round) and an upload
+never waits on Redis. The dispatcher (backend/dispatcher.py) claims pending rows in batches, submits them to the fair
+scheduler (backend/scheduler.py) and stamps submitted_at; a NOTIFY on OUTBOX_CHANNEL, delivered when the transaction
+commits, wakes it at once. A row is stamped sent_at only when its task is actually published to Celery, which for a job
+waiting behind its owner's cap happens later, on a release or dispatch. Rows submitted more than
+OUTBOX_RESUBMIT_SECONDS ago that were never sent and are no longer waiting in the scheduler (its Redis lost them) are
+made pending again. Sent rows are purged by the purge_job_outbox periodic task after OUTBOX_RETENTION_SECONDS.
+"""
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from backend.database.model import Job, JobOutbox
+
+OUTBOX_CHANNEL = "job_outbox"
+OUTBOX_RETENTION_SECONDS = int(os.getenv("OUTBOX_RETENTION_SECONDS", 24 * 60 * 60))
+OUTBOX_RESUBMIT_SECONDS = int(os.getenv("OUTBOX_RESUBMIT_SECONDS", 60))
+
+# [add] stages [signature] (the Celery signature that transcribes [job]) in [db]'s transaction. The job must already
+# have its id (set it explicitly or flush first).
+def add(db: Session, job: Job, signature):
+    db.add(JobOutbox(job_id=job.id, owner=job.owner, signature=json.dumps(signature)))
+    db.execute(text(f"NOTIFY {OUTBOX_CHANNEL}"))
+
+# [claim] locks and returns up to [limit] pending (not yet submitted) rows, oldest first. Rows locked by another
+# dispatcher are skipped.
+def claim(db: Session, limit: int) -> list[JobOutbox]:
+    return (
+        db.query(JobOutbox)
+        .filter(JobOutbox.submitted_at.is_(None))
+        .order_by(JobOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+# [mark_submitted] stamps [rows] as handed to the scheduler, and those whose job id is in [published] as sent
+def mark_submitted(db: Session, rows: list[JobOutbox], published: set[str]):
+    now = datetime.now(timezone.utc)
+    for row in rows:
+        row.submitted_at = now
+        if str(row.job_id) in published:
+            row.sent_at = now
+
+# [mark_jobs_sent] stamps the unsent rows of jobs [job_ids] as published
+def mark_jobs_sent(db: Session, job_ids: list[str]):
+    (
+        db.query(JobOutbox)
+        .filter(JobOutbox.job_id.in_(job_ids), JobOutbox.sent_at.is_(None))
+        .update({JobOutbox.sent_at: func.now()}, synchronize_session=False)
+    )
+
+# [claim_unsent] locks and returns up to [limit] rows submitted more than OUTBOX_RESUBMIT_SECONDS ago and still not sent
+def claim_unsent(db: Session, limit: int) -> list[JobOutbox]:
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=OUTBOX_RESUBMIT_SECONDS)
+    return (
+        db.query(JobOutbox)
+        .filter(JobOutbox.sent_at.is_(None), JobOutbox.submitted_at < cutoff)
+        .order_by(JobOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+# [mark_pending] makes [rows] pending again, so the dispatcher submits them once more
+def mark_pending(db: Session, rows: list[JobOutbox]):
+    for row in rows:
+        row.submitted_at = None
+
+# [purge] deletes rows sent more than OUTBOX_RETENTION_SECONDS ago and returns how many
+def purge(db: Session) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=OUTBOX_RETENTION_SECONDS)
+    return db.query(JobOutbox).filter(JobOutbox.sent_at < cutoff).delete(synchronize_session=False)
@@ -0,0 +1,56 @@
+"""
+Segment-level transcripts.
+
+Workers store every decoded segment in job_segments_table, keyed by job and start time (in milliseconds), so clients
+can read a time range or a page of a transcript instead of the whole text. Job.transcript stays as the joined text of
+the segments for clients that want the whole thing.
+"""
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from backend.database.model import JobSegment
+
+# Whisper segments are at most one 30 s window long, which bounds how early a segment overlapping a range can start
+MAX_SEGMENT_MS = 30_000
+
+# [to_ms] converts seconds to whole milliseconds
+def to_ms(seconds: float) -> int:
+    return int(round(seconds * 1000))
+
+# [store] adds [segments] (dicts with "start" and "end" in seconds, "text" and optionally "avg_logprob") to [job_id].
+# A segment already stored at the same start time is kept, so a resumed task can't duplicate rows.
+def store(db: Session, job_id, segments: list[dict]):
+    if not segments:
+        return
+    db.execute(
+        insert(JobSegment)
+        .values([
+            {
+                "job_id": job_id,
+                "start_ms": to_ms(segment["start"]),
+                "end_ms": to_ms(segment["end"]),
+                "text": segment["text"],
+                "avg_logprob": segment.get("avg_logprob"),
+            }
+            for segment in segments
+        ])
+        .on_conflict_do_nothing(index_elements=["job_id", "start_ms"])
+    )
+
+# [delete] removes every segment of [job_id]
+def delete(db: Session, job_id):
+    db.query(JobSegment).filter(JobSegment.job_id == job_id).delete(synchronize_session=False)
+
+# [read] returns up to [limit] segments of [job_id] after skipping [offset], in time order. With [start] and/or [end]
+# (seconds), only segments overlapping [start, end) are returned.
+def read(
+    db: Session, job_id, start: float | None = None, end: float | None = None, limit: int = 100, offset: int = 0
+) -> list[JobSegment]:
+    query = db.query(JobSegment).filter(JobSegment.job_id == job_id)
+    if start is not None:
+        # the start_ms bound lets the primary key index skip everything well before the range
+        query = query.filter(JobSegment.start_ms >= to_ms(start) - MAX_SEGMENT_MS, JobSegment.end_ms > to_ms(start))
+    if end is not None:
+        query = query.filter(JobSegment.start_ms < to_ms(end))
+    return query.order_by(JobSegment.start_ms).offset(offset).limit(limit).all()
@@ -0,0 +1,91 @@
+"""
+Content-addressed transcript cache.
+
+A transcript is reused when the same audio (by sha256) is transcribed again with the same model/decoding
+parameters. Entries expire after TRANSCRIPT_CACHE_TTL_DAYS without a hit, and the table is trimmed to the
+TRANSCRIPT_CACHE_MAX_ENTRIES most recently used entries by the evict_transcript_cache periodic task.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from backend import metrics
+from backend.database.model import TranscriptCache
+
+TRANSCRIPT_CACHE_MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", 10000))
+TRANSCRIPT_CACHE_TTL_DAYS = int(os.getenv("TRANSCRIPT_CACHE_TTL_DAYS", 30))
+
+# [cache_key] combines the audio hash with the parameters that affect the transcript
+def cache_key(audio_sha256: str, params: dict) -> str:
+    payload = json.dumps({"audio": audio_sha256, "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+# [lookup] returns the cached transcript for [key] (and marks it as used), or None on a miss
+def lookup(db: Session, key: str) -> str | None:
+    entry = db.query(TranscriptCache).filter(TranscriptCache.cache_key == key).first()
+    if entry is None:
+        metrics.incr("transcript_cache_misses")
+        return None
+    entry.hit_count += 1
+    entry.last_used_at = datetime.now(timezone.utc)
+    metrics.incr("transcript_cache_hits")
+    return entry.transcript
+
+# [lookup_many] looks up several keys in one query. Returns {key: transcript} for the hits.
+def lookup_many(db: Session, keys: list[str]) -> dict[str, str]:
+    entries = db.query(TranscriptCache).filter(TranscriptCache.cache_key.in_(set(keys))).all()
+    now = datetime.now(timezone.utc)
+    for entry in entries:
+        entry.hit_count += 1
+        entry.last_used_at = now
+    hits = {entry.cache_key: entry.transcript for entry in entries}
+    hit_count = sum(1 for key in keys if key in hits)
+    if hit_count:
+        metrics.incr("transcript_cache_hits", hit_count)
+    if hit_count < len(keys):
+        metrics.incr("transcript_cache_misses", len(keys) - hit_count)
+    return hits
+
+# [store] adds a transcript to the cache. Concurrent workers may finish the same audio, so the first write wins.
+def store(db: Session, key: str, audio_sha256: str, params: dict, transcript: str):
+    db.execute(
+        insert(TranscriptCache)
+        .values(
+            cache_key=key,
+            audio_sha256=audio_sha256,
+            params=json.dumps(params, sort_keys=True),
+            transcript=transcript,
+            hit_count=0,
+        )
+        .on_conflict_do_nothing(index_elements=["cache_key"])
+    )
+
+# [evict] deletes expired entries, then the least recently used ones beyond the size limit. Returns the number deleted.
+def evict(db: Session) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=TRANSCRIPT_CACHE_TTL_DAYS)
+    expired = (
+        db.query(TranscriptCache)
+        .filter(TranscriptCache.last_used_at < cutoff)
+        .delete(synchronize_session=False)
+    )
+
+    overflow = (
+        db.query(TranscriptCache.cache_key)
+        .order_by(TranscriptCache.last_used_at.desc())
+        .offset(TRANSCRIPT_CACHE_MAX_ENTRIES)
+        .subquery()
+    )
+    trimmed = (
+        db.query(TranscriptCache)
+        .filter(TranscriptCache.cache_key.in_(db.query(overflow.c.cache_key)))
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+
+    metrics.incr("transcript_cache_evictions", expired + trimmed)
+    return expired + trimmed
@@ -0,0 +1,133 @@
+"""
+Outbox dispatcher: publishes the transcription tasks the API staged in job_outbox_table (see
+backend/database/outbox.py).
+
+Each pass claims up to OUTBOX_BATCH_SIZE pending rows, submits them per owner to the fair scheduler (which publishes
+what fits under the owner's cap, one Celery group per owner), and in the same transaction marks them submitted, and
+the ones that were published sent; the rest are marked sent by whichever release or dispatch publishes them later. If
+publishing fails the transaction rolls back and the rows are retried on the next pass, so a broker outage delays jobs
+instead of losing them. Owners submitted before the failure are submitted again, which the scheduler ignores for jobs
+still waiting or holding a slot (see scheduler.submit); only jobs published directly, without the scheduler, can go out
+twice, which the workers tolerate.
+Every OUTBOX_RESUBMIT_SECONDS the dispatcher also looks for rows submitted that long ago, never sent and no longer
+waiting in the scheduler, i.e. lost with the scheduler's Redis data, and makes them pending again.
+Between passes the dispatcher waits for a NOTIFY from a committed upload, or at most OUTBOX_POLL_SECONDS. Every pass
+also runs the scheduler's dispatch, so slots that expired (e.g. a worker died without releasing one) free up waiting
+jobs without waiting for the next submit or release.
+
+Run one (or more; rows are claimed with SKIP LOCKED) next to the API:
+
+    python -m backend.dispatcher
+"""
+
+import json
+import os
+import select
+import time
+from datetime import datetime, timezone
+
+from backend import metrics, scheduler
+from backend.database.database import SessionLocal, engine
+from backend.database.model import User
+from backend.database import outbox
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 100))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", 1))
+OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", 30))
+
+# [dispatch_pending] submits one batch of pending outbox rows and returns how many were submitted
+def dispatch_pending(limit: int = OUTBOX_BATCH_SIZE) -> int:
+    db = SessionLocal()
+    try:
+        rows = outbox.claim(db, limit)
+        if not rows:
+            db.rollback()
+            return 0
+        by_owner = {}
+        for row in rows:
+            by_owner.setdefault(row.owner, []).append((str(row.job_id), json.loads(row.signature)))
+        tiers = dict(db.query(User.id, User.tier).filter(User.id.in_(by_owner)).all())
+        published = set()
+        for owner, jobs in by_owner.items():
+            published.update(scheduler.submit(owner, tiers.get(owner), jobs))
+
+        now = datetime.now(timezone.utc)
+        metrics.observe("outbox_delay_seconds", max((now - row.created_at).total_seconds() for row in rows))
+        metrics.incr("outbox_published", len(published))
+        outbox.mark_submitted(db, rows, published)
+        db.commit()
+        return len(rows)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+# [resubmit_lost] makes submitted rows that were never sent and are no longer waiting in the scheduler pending again,
+# and returns how many
+def resubmit_lost(limit: int = OUTBOX_BATCH_SIZE) -> int:
+    db = SessionLocal()
+    try:
+        rows = outbox.claim_unsent(db, limit)
+        waiting = scheduler.waiting([str(row.job_id) for row in rows]) if rows else None
+        if waiting is None:
+            db.rollback()
+            return 0
+        lost = [row for row in rows if str(row.job_id) not in waiting]
+        outbox.mark_pending(db, lost)
+        db.commit()
+        if lost:
+            print(f"Resubmitting {len(lost)} outbox rows the scheduler lost")
+        return len(lost)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+# [listen] opens a dedicated connection subscribed to the outbox channel
+def listen():
+    connection = engine.raw_connection()
+    pg = connection.driver_connection
+    pg.autocommit = True
+    pg.cursor().execute(f"LISTEN {outbox.OUTBOX_CHANNEL}")
+    return connection, pg
+
+# [wait_for_notify] blocks until a NOTIFY arrives on [pg] or [timeout] seconds pass
+def wait_for_notify(pg, timeout: float):
+    if select.select([pg], [], [], timeout)[0]:
+        pg.poll()
+        pg.notifies.clear()
+
+# [run] dispatches forever: drains the outbox, then waits for the next NOTIFY (or the poll interval)
+def run():
+    connection, pg = None, None
+    backoff = OUTBOX_POLL_SECONDS
+    next_resubmit = 0.0
+    print(f"Outbox dispatcher started (batches of {OUTBOX_BATCH_SIZE}, polling every {OUTBOX_POLL_SECONDS}s)")
+    while True:
+        try:
+            if pg is None:
+                connection, pg = listen()
+            while dispatch_pending() == OUTBOX_BATCH_SIZE:
+                pass
+            scheduler.dispatch()
+            if time.monotonic() >= next_resubmit:
+                resubmit_lost()
+                next_resubmit = time.monotonic() + outbox.OUTBOX_RESUBMIT_SECONDS
+            backoff = OUTBOX_POLL_SECONDS
+            wait_for_notify(pg, OUTBOX_POLL_SECONDS)
+        except Exception as e:
+            print(f"Outbox dispatch failed, retrying in {backoff:.0f}s: {e}")
+            if connection is not None:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+            connection, pg = None, None
+            time.sleep(backoff)
+            backoff = min(backoff * 2, OUTBOX_MAX_BACKOFF_SECONDS)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,50 @@
+"""
+Counters, gauges and timings shared by the API and the Celery workers.
+
+Values live in one Redis hash so every API process and worker child reports to the same place.
+GET /metrics returns a snapshot of the hash.
+"""
+
+import os
+import redis
+
+METRICS_KEY = "metrics"
+# Broker Redis is always available to both the API and the workers, so it doubles as the metrics store
+METRICS_REDIS_URL = os.getenv("METRICS_REDIS_URL") or os.getenv("REDIS_BROKER_URL", "redis://localhost:6379/0")
+
+_client: redis.Redis | None = None
+
+def _redis() -> redis.Redis:
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(METRICS_REDIS_URL, decode_responses=True, socket_timeout=1)
+    return _client
+
+# [incr] adds [amount] to counter [name]. Metrics are best effort and never fail the caller.
+def incr(name: str, amount: float = 1):
+    try:
+        _redis().hincrbyfloat(METRICS_KEY, name, amount)
+    except redis.RedisError as e:
+        print(f"Failed to record metric {name}: {e}")
+
+# [observe] records one sample of [name] (e.g. a duration in seconds) as <name>_count, <name>_sum and <name>_last
+def observe(name: str, value: float):
+    try:
+        pipe = _redis().pipeline()
+        pipe.hincrbyfloat(METRICS_KEY, f"{name}_count", 1)
+        pipe.hincrbyfloat(METRICS_KEY, f"{name}_sum", value)
+        pipe.hset(METRICS_KEY, f"{name}_last", value)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"Failed to record metric {name}: {e}")
+
+# [set_gauge] sets gauge [name] to [value]
+def set_gauge(name: str, value: float):
+    try:
+        _redis().hset(METRICS_KEY, name, value)
+    except redis.RedisError as e:
+        print(f"Failed to record metric {name}: {e}")
+
+# [snapshot] returns every recorded metric
+def snapshot() -> dict[str, float]:
+    return {name: float(value) for name, value in _redis().hgetall(METRICS_KEY).items()}
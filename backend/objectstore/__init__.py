@@ -0,0 +1,29 @@
+"""
+Pluggable object storage for uploaded audio and derived artifacts.
+
+STORAGE_DRIVER selects the implementation: "s3" (default) or "local" (shared filesystem at LOCAL_STORAGE_DIR).
+"""
+
+import os
+
+from .base import StorageDriver, StorageNotSupported
+
+__all__ = ["StorageDriver", "StorageNotSupported", "get_storage"]
+
+STORAGE_DRIVER = os.getenv("STORAGE_DRIVER", "s3").lower()
+
+_storage: StorageDriver | None = None
+
+# [get_storage] returns the process-wide driver selected by STORAGE_DRIVER (created on first use)
+def get_storage() -> StorageDriver:
+    global _storage
+    if _storage is None:
+        if STORAGE_DRIVER == "s3":
+            from .s3 import S3Storage
+            _storage = S3Storage()
+        elif STORAGE_DRIVER == "local":
+            from .local import LocalStorage
+            _storage = LocalStorage()
+        else:
+            raise RuntimeError(f"Unknown STORAGE_DRIVER: {STORAGE_DRIVER}. Use 's3' or 'local'.")
+    return _storage
@@ -0,0 +1,77 @@
+"""
+Storage driver interface shared by the API and the workers.
+
+All methods are blocking; the API runs them in worker threads (see run_storage in backend/api/jobs.py).
+"""
+
+from abc import ABC, abstractmethod
+from typing import BinaryIO
+
+
+class StorageNotSupported(Exception):
+    """Raised when the configured driver can't perform an operation (e.g. presigned URLs on local disk)."""
+
+
+# Drivers must implement every abstract method; one that misses any fails when it is instantiated
+class StorageDriver(ABC):
+    # upper bound on concurrent calls the driver is sized for (connection pool / thread limiter)
+    max_concurrency: int = 16
+
+    # [put] stores [data] under [key]
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: str | None = None):
+        ...
+
+    # [create_multipart] starts a multipart upload for [key] and returns its upload id
+    @abstractmethod
+    def create_multipart(self, key: str, content_type: str | None = None) -> str:
+        ...
+
+    # [upload_part] stores part [part_number] (1-based) of a multipart upload and returns its ETag
+    @abstractmethod
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        ...
+
+    # [complete_multipart] assembles [parts] ([{"PartNumber", "ETag"}], in order) into the object [key]
+    @abstractmethod
+    def complete_multipart(self, key: str, upload_id: str, parts: list[dict]):
+        ...
+
+    # [abort_multipart] discards a multipart upload and its parts. Aborting an unknown upload is a no-op.
+    @abstractmethod
+    def abort_multipart(self, key: str, upload_id: str):
+        ...
+
+    # [head] returns {"size", "content_type"} for [key], or None if it doesn't exist
+    @abstractmethod
+    def head(self, key: str) -> dict | None:
+        ...
+
+    # [read_range] returns up to [length] bytes of [key] starting at [start]
+    @abstractmethod
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        ...
+
+    # [download_to] writes the whole object [key] into [fileobj]
+    @abstractmethod
+    def download_to(self, key: str, fileobj: BinaryIO):
+        ...
+
+    # [upload_from] stores the file at [path] under [key]
+    @abstractmethod
+    def upload_from(self, path: str, key: str):
+        ...
+
+    # [delete] removes [key]. Deleting a missing key is a no-op.
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    # [local_path] returns a filesystem path the object [key] can be read from in place, or None if the
+    # driver has to download it first
+    def local_path(self, key: str) -> str | None:
+        return None
+
+    # [presigned_put_url] returns a URL a client can PUT the object [key] to directly
+    def presigned_put_url(self, key: str, content_type: str, expires_in: int) -> str:
+        raise StorageNotSupported("Direct uploads are not supported by this storage driver.")
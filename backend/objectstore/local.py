@@ -0,0 +1,100 @@
+"""
+Local filesystem storage driver, for single-node and on-prem deployments where the API and the workers
+share a disk (LOCAL_STORAGE_DIR). Workers read stored files in place instead of downloading a copy.
+"""
+
+import os
+import shutil
+import uuid
+from typing import BinaryIO
+
+from .base import StorageDriver
+
+
+class LocalStorage(StorageDriver):
+    def __init__(self):
+        self.root = os.path.abspath(os.getenv("LOCAL_STORAGE_DIR", "storage"))
+        self.max_concurrency = int(os.getenv("LOCAL_STORAGE_MAX_CONCURRENCY", 16))
+        # parts of in-progress multipart uploads live under <root>/.multipart/<upload id>/
+        self.multipart_root = os.path.join(self.root, ".multipart")
+        os.makedirs(self.multipart_root, exist_ok=True)
+
+    # [_path] maps [key] to a path inside the storage root, refusing keys that would escape it
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def _part_dir(self, upload_id: str) -> str:
+        return os.path.join(self.multipart_root, str(uuid.UUID(upload_id)))
+
+    # [_write_atomic] writes via a temp file and rename, so readers never see a partial file
+    def _write_atomic(self, key: str, write):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                write(f)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def put(self, key: str, data: bytes, content_type: str | None = None):
+        self._write_atomic(key, lambda f: f.write(data))
+
+    def create_multipart(self, key: str, content_type: str | None = None) -> str:
+        upload_id = str(uuid.uuid4())
+        os.makedirs(self._part_dir(upload_id))
+        return upload_id
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        with open(os.path.join(self._part_dir(upload_id), str(part_number)), "wb") as f:
+            f.write(data)
+        return str(part_number)
+
+    def complete_multipart(self, key: str, upload_id: str, parts: list[dict]):
+        part_dir = self._part_dir(upload_id)
+
+        def write(f):
+            for part in parts:
+                with open(os.path.join(part_dir, str(part["PartNumber"])), "rb") as part_file:
+                    shutil.copyfileobj(part_file, f)
+
+        self._write_atomic(key, write)
+        shutil.rmtree(part_dir, ignore_errors=True)
+
+    def abort_multipart(self, key: str, upload_id: str):
+        shutil.rmtree(self._part_dir(upload_id), ignore_errors=True)
+
+    def head(self, key: str) -> dict | None:
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+        return {"size": os.path.getsize(path), "content_type": None}
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            return f.read(length)
+
+    def download_to(self, key: str, fileobj: BinaryIO):
+        with open(self._path(key), "rb") as f:
+            shutil.copyfileobj(f, fileobj)
+
+    def upload_from(self, path: str, key: str):
+        def write(f):
+            with open(path, "rb") as source:
+                shutil.copyfileobj(source, f)
+
+        self._write_atomic(key, write)
+
+    def delete(self, key: str):
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def local_path(self, key: str) -> str | None:
+        return self._path(key)
@@ -0,0 +1,84 @@
+"""
+S3 (or S3-compatible, via S3_ENDPOINT_URL) storage driver.
+"""
+
+import os
+from typing import BinaryIO
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from .base import StorageDriver
+
+_MISSING = ("404", "NoSuchKey", "NotFound")
+
+
+class S3Storage(StorageDriver):
+    def __init__(self):
+        self.bucket = os.environ["S3_BUCKET"]
+        # sizes the client's shared connection pool; the API's thread limiter uses the same bound
+        self.max_concurrency = int(os.getenv("S3_MAX_CONCURRENCY", 16))
+        # S3_ENDPOINT_URL points the client at an S3-compatible stand-in (e.g. MinIO) instead of AWS
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=os.getenv("S3_ENDPOINT_URL") or None,
+            config=Config(max_pool_connections=self.max_concurrency),
+        )
+
+    def put(self, key: str, data: bytes, content_type: str | None = None):
+        extra = {"ContentType": content_type} if content_type else {}
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, **extra)
+
+    def create_multipart(self, key: str, content_type: str | None = None) -> str:
+        extra = {"ContentType": content_type} if content_type else {}
+        return self.client.create_multipart_upload(Bucket=self.bucket, Key=key, **extra)["UploadId"]
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=key, PartNumber=part_number, UploadId=upload_id, Body=data
+        )
+        return response["ETag"]
+
+    def complete_multipart(self, key: str, upload_id: str, parts: list[dict]):
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+
+    def abort_multipart(self, key: str, upload_id: str):
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+        except ClientError as e:
+            # already aborted/completed elsewhere
+            if e.response["Error"]["Code"] != "NoSuchUpload":
+                raise
+
+    def head(self, key: str) -> dict | None:
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in _MISSING:
+                return None
+            raise
+        return {"size": response["ContentLength"], "content_type": response.get("ContentType")}
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        response = self.client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes={start}-{start + length - 1}")
+        return response["Body"].read()
+
+    def download_to(self, key: str, fileobj: BinaryIO):
+        self.client.download_fileobj(self.bucket, key, fileobj)
+
+    def upload_from(self, path: str, key: str):
+        self.client.upload_file(path, self.bucket, key)
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def presigned_put_url(self, key: str, content_type: str, expires_in: int) -> str:
+        # the signature covers ContentType, so the client must send the same Content-Type header with its PUT
+        return self.client.generate_presigned_url(
+            ClientMethod="put_object",
+            Params={"Bucket": self.bucket, "Key": key, "ContentType": content_type},
+            ExpiresIn=expires_in,
+        )
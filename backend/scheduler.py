@@ -0,0 +1,239 @@
+"""
+Per-user fair scheduling of transcription tasks.
+
+Transcription tasks don't go straight to Celery: the outbox dispatcher (backend/dispatcher.py) submits them here, keyed
+by the job's owner, and a task is only published while its owner has fewer than max_in_flight_jobs jobs dispatched and
+not yet finished (the cap of the user's tier, User.tier). Everything else waits in a per-user Redis list. Users with
+waiting jobs sit in a ring that is served round-robin, one job per user per turn, so one user's 500 uploads interleave
+with everyone else's instead of filling the queue ahead of them. When a worker finishes a job it releases the slot,
+which dispatches the next job.
+
+A job counts as sent (its outbox row's sent_at, see backend/database/outbox.py) only once its Celery message is
+published, whether that happens on submit or on a later release or dispatch. Jobs waiting here live only in Redis, so
+the outbox dispatcher resubmits submitted rows that were never sent and are no longer waiting (e.g. Redis restarted
+without its data); see waiting(). Submitting is idempotent per job id, so a dispatcher pass that rolls back after some
+owners were submitted can submit them again without queueing their jobs twice.
+
+Submitting and dispatching is one Lua script call, so an idle system publishes a new job right away. A dispatched job
+that hasn't started holds its slot for at most FAIR_SHARE_SLOT_TTL_SECONDS (e.g. the task was lost). Once a worker
+runs it, the slot is renewed along with the job's lease (see backend/database/leases.py) and lapses
+FAIR_SHARE_RUNNING_SLOT_TTL_SECONDS after the last renewal, so a worker that dies without releasing frees the user's
+slot within minutes. Expired slots are reclaimed whenever the scheduler dispatches, which the outbox dispatcher also
+does on every pass, so waiting jobs move even when nothing is submitted or released.
+"""
+
+import json
+import os
+import time
+
+import redis
+
+from backend.database import outbox
+from backend.database.database import SessionLocal
+from backend.database.leases import JOB_LEASE_SECONDS
+
+# Job caps per user tier (User.tier). USER_TIERS replaces this table with a JSON object of the same shape.
+DEFAULT_USER_TIERS = {
+    "free": {"max_in_flight_jobs": 2},
+    "pro": {"max_in_flight_jobs": 8},
+}
+USER_TIERS: dict[str, dict] = json.loads(os.getenv("USER_TIERS") or "null") or DEFAULT_USER_TIERS
+DEFAULT_USER_TIER = os.getenv("DEFAULT_USER_TIER", "free")
+if DEFAULT_USER_TIER not in USER_TIERS:
+    raise RuntimeError(f"DEFAULT_USER_TIER {DEFAULT_USER_TIER!r} is not one of the USER_TIERS: {', '.join(USER_TIERS)}")
+
+FAIR_SCHEDULING = os.getenv("FAIR_SCHEDULING", "true").lower() in ("1", "true", "yes")
+FAIR_SHARE_SLOT_TTL_SECONDS = int(os.getenv("FAIR_SHARE_SLOT_TTL_SECONDS", 6 * 60 * 60))
+FAIR_SHARE_RUNNING_SLOT_TTL_SECONDS = int(os.getenv("FAIR_SHARE_RUNNING_SLOT_TTL_SECONDS", 3 * JOB_LEASE_SECONDS))
+SCHEDULER_REDIS_URL = os.getenv("SCHEDULER_REDIS_URL") or os.getenv("REDIS_BROKER_URL", "redis://localhost:6379/0")
+
+# Keys (all under fair_share:): ring (list of users with waiting jobs, in serving order), active (set of the users in
+# the ring), pending:<user> (list of waiting job ids), running:<user> (sorted set of dispatched job ids, scored by slot
+# expiry), tasks (hash of job id -> serialized Celery signature) and caps (hash of user -> max_in_flight_jobs). The
+# scripts return the dispatched jobs as job id / signature pairs.
+_DISPATCH = """
+local function dispatch(now, ttl)
+    local out = {}
+    local idle = 0
+    while true do
+        local users = redis.call('LLEN', 'fair_share:ring')
+        if users == 0 or idle >= users then
+            break
+        end
+        local user = redis.call('LPOP', 'fair_share:ring')
+        local pending = 'fair_share:pending:' .. user
+        local running = 'fair_share:running:' .. user
+        redis.call('ZREMRANGEBYSCORE', running, '-inf', now)
+        local job_id = false
+        if redis.call('ZCARD', running) < tonumber(redis.call('HGET', 'fair_share:caps', user) or '1') then
+            job_id = redis.call('LPOP', pending)
+        end
+        if job_id then
+            redis.call('ZADD', running, now + ttl, job_id)
+            table.insert(out, job_id)
+            table.insert(out, redis.call('HGET', 'fair_share:tasks', job_id))
+            redis.call('HDEL', 'fair_share:tasks', job_id)
+            idle = 0
+        else
+            idle = idle + 1
+        end
+        if redis.call('LLEN', pending) > 0 then
+            redis.call('RPUSH', 'fair_share:ring', user)
+        else
+            redis.call('SREM', 'fair_share:active', user)
+        end
+    end
+    return out
+end
+"""
+
+# ARGV: user, cap, now, ttl, then job id / signature pairs. Jobs already waiting are skipped, and so are jobs that hold a
+# live slot, which are returned (after the dispatched pairs) as already published.
+_SUBMIT = _DISPATCH + """
+local user = ARGV[1]
+local now = tonumber(ARGV[3])
+local running = 'fair_share:running:' .. user
+local published = {}
+redis.call('HSET', 'fair_share:caps', user, ARGV[2])
+for i = 5, #ARGV, 2 do
+    local expires = redis.call('ZSCORE', running, ARGV[i])
+    if redis.call('HEXISTS', 'fair_share:tasks', ARGV[i]) == 1 then
+        -- already waiting
+    elseif expires and tonumber(expires) > now then
+        table.insert(published, ARGV[i])
+    else
+        redis.call('RPUSH', 'fair_share:pending:' .. user, ARGV[i])
+        redis.call('HSET', 'fair_share:tasks', ARGV[i], ARGV[i + 1])
+    end
+end
+if redis.call('LLEN', 'fair_share:pending:' .. user) > 0 and redis.call('SADD', 'fair_share:active', user) == 1 then
+    redis.call('RPUSH', 'fair_share:ring', user)
+end
+return {dispatch(now, tonumber(ARGV[4])), published}
+"""
+
+# ARGV: user, job id, now, ttl
+_RELEASE = _DISPATCH + """
+redis.call('ZREM', 'fair_share:running:' .. ARGV[1], ARGV[2])
+return dispatch(tonumber(ARGV[3]), tonumber(ARGV[4]))
+"""
+
+# ARGV: now, ttl
+_DISPATCH_ONLY = _DISPATCH + """
+return dispatch(tonumber(ARGV[1]), tonumber(ARGV[2]))
+"""
+
+_client: redis.Redis | None = None
+_scripts: dict = {}
+
+def _redis() -> redis.Redis:
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(SCHEDULER_REDIS_URL, decode_responses=True)
+        _scripts["submit"] = _client.register_script(_SUBMIT)
+        _scripts["release"] = _client.register_script(_RELEASE)
+        _scripts["dispatch"] = _client.register_script(_DISPATCH_ONLY)
+    return _client
+
+# [max_in_flight_jobs] returns the job cap of user tier [tier] (unknown tiers and None get the default tier's cap)
+def max_in_flight_jobs(tier: str | None) -> int:
+    return int(USER_TIERS.get(tier or DEFAULT_USER_TIER, USER_TIERS[DEFAULT_USER_TIER])["max_in_flight_jobs"])
+
+# [_publish] sends the serialized signatures of [dispatched] (job id / signature pairs) to Celery, as one group when
+# there are several, and returns the ids of the jobs it published
+def _publish(dispatched: list) -> list[str]:
+    # imported here so importing this module doesn't load the Celery app
+    from celery import group
+    from backend.celery.celery_app import celery_app
+    jobs = [(job_id, payload) for job_id, payload in zip(dispatched[0::2], dispatched[1::2]) if payload]
+    signatures = [celery_app.signature(json.loads(payload)) for _, payload in jobs]
+    if len(signatures) == 1:
+        signatures[0].apply_async()
+    elif signatures:
+        group(signatures).apply_async()
+    return [job_id for job_id, _ in jobs]
+
+# [_publish_and_mark] publishes [dispatched] (see _publish) and stamps the outbox rows of the published jobs as sent.
+# Used when jobs are dispatched outside the outbox dispatcher's transaction (release, dispatch).
+def _publish_and_mark(dispatched: list):
+    job_ids = _publish(dispatched)
+    if not job_ids:
+        return
+    db = SessionLocal()
+    try:
+        outbox.mark_jobs_sent(db, job_ids)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Failed to mark {len(job_ids)} published jobs as sent: {e}")
+    finally:
+        db.close()
+
+# [submit] queues [jobs] ([(job_id, Celery signature)]) of user [owner] with user tier [tier], publishes whatever fits
+# under the caps now and returns the ids of the jobs it published. Submitting a job again is a no-op: one still waiting
+# stays queued once, and one that holds a live slot isn't queued again and counts as published. Without FAIR_SCHEDULING
+# (or if Redis fails) the signatures are all published directly.
+def submit(owner, tier: str | None, jobs: list[tuple[str, object]]) -> list[str]:
+    if not jobs:
+        return []
+    args = [str(owner), max_in_flight_jobs(tier), time.time(), FAIR_SHARE_SLOT_TTL_SECONDS]
+    for job_id, signature in jobs:
+        args += [str(job_id), json.dumps(signature)]
+    if not FAIR_SCHEDULING:
+        return _publish(args[4:])
+    try:
+        _redis()
+        dispatched, published = _scripts["submit"](args=args)
+    except redis.RedisError as e:
+        print(f"Fair scheduler unavailable, publishing {len(jobs)} jobs directly: {e}")
+        return _publish(args[4:])
+    return _publish(dispatched) + published
+
+# [release] frees the slot job [job_id] of user [owner] held and publishes the jobs that can now run. Releasing a job
+# that holds no slot (e.g. a redelivered task that already released it) only dispatches.
+def release(owner, job_id):
+    if not FAIR_SCHEDULING or owner is None:
+        return
+    try:
+        _redis()
+        dispatched = _scripts["release"](args=[str(owner), str(job_id), time.time(), FAIR_SHARE_SLOT_TTL_SECONDS])
+    except redis.RedisError as e:
+        print(f"Failed to release the scheduler slot of job {job_id}: {e}")
+        return
+    _publish_and_mark(dispatched)
+
+# [renew] extends the slot job [job_id] of user [owner] holds to [ttl] seconds from now, while a worker runs it. A slot
+# that was already released is not taken again.
+def renew(owner, job_id, ttl: int = FAIR_SHARE_RUNNING_SLOT_TTL_SECONDS):
+    if not FAIR_SCHEDULING or owner is None:
+        return
+    try:
+        _redis().zadd(f"fair_share:running:{owner}", {str(job_id): time.time() + ttl}, xx=True)
+    except redis.RedisError as e:
+        print(f"Failed to renew the scheduler slot of job {job_id}: {e}")
+
+# [dispatch] reclaims expired slots and publishes the waiting jobs that now fit under their users' caps
+def dispatch():
+    if not FAIR_SCHEDULING:
+        return
+    try:
+        _redis()
+        dispatched = _scripts["dispatch"](args=[time.time(), FAIR_SHARE_SLOT_TTL_SECONDS])
+    except redis.RedisError as e:
+        print(f"Failed to dispatch waiting jobs: {e}")
+        return
+    _publish_and_mark(dispatched)
+
+# [waiting] returns which of [job_ids] are waiting in the scheduler, or None if Redis can't be asked. Without
+# FAIR_SCHEDULING nothing waits.
+def waiting(job_ids: list[str]) -> set[str] | None:
+    if not FAIR_SCHEDULING:
+        return set()
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.hexists("fair_share:tasks", job_id)
+        return {job_id for job_id, exists in zip(job_ids, pipe.execute()) if exists}
+    except redis.RedisError as e:
+        print(f"Failed to check the scheduler's waiting jobs: {e}")
+        return None
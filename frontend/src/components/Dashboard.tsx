@@ -8,8 +8,8 @@ import {fetchUserJobs, uploadJob, type UserJob} from '../api/jobs';
 import { useAuth } from './AuthProvider';
 import {Blockquote, ScrollArea} from "@radix-ui/themes";
 
-// 5MB is the maximum file size for audio uploads
-const MAX_UPLOAD_BYTES = 5 * 1024 * 1024;
+// 500MB is the maximum file size for audio uploads (matches MAX_FILE_SIZE_BYTES in the API)
+const MAX_UPLOAD_BYTES = 500 * 1024 * 1024;
 
 // Calculate scroll area height based on transcript length
 const calculateTranscriptHeight = (transcript: string | null | undefined): number => {
@@ -100,7 +100,7 @@ export const Dashboard = () => {
 
     // check if file is too large before trying to upload
     if (file.size > MAX_UPLOAD_BYTES) {
-      setUploadError('File is too large. Please select a file smaller than 5MB.');
+      setUploadError('File is too large. Please select a file smaller than 500MB.');
       setSelectedFile(null);
       return;
     }
@@ -156,7 +156,7 @@ export const Dashboard = () => {
         <section className="mt-8 rounded-2xl border border-rose-300/30 bg-rose-200/10 p-6 shadow-xl shadow-rose-300/20">
           <h2 className="text-xl font-semibold text-white">Upload audio</h2>
           <p className="mt-2 text-sm text-neutral-400">
-          Audio files only (MAX. 5MB)
+          Audio files only (MAX. 500MB)
           </p>
           <form
             onSubmit={handleUploadSubmit}